@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
-from pydantic import Field, field_validator
-from typing import List, Union
+from pydantic import Field, field_validator, model_validator
+from functools import lru_cache
+from typing import FrozenSet, Optional, Union
 
 
 class Settings(BaseSettings):
@@ -25,6 +26,11 @@ class Settings(BaseSettings):
         default="text-embedding-3-small", 
         env="OPENAI_EMBEDDING_MODEL"
     )
+    # Shared HTTP connection pool for the async client; HTTP/2 (needs the h2
+    # package) multiplexes concurrent requests over one connection
+    openai_http2: bool = Field(default=True, env="OPENAI_HTTP2")
+    openai_max_keepalive_connections: int = Field(default=32, env="OPENAI_MAX_KEEPALIVE_CONNECTIONS")
+    openai_keepalive_expiry: float = Field(default=60.0, env="OPENAI_KEEPALIVE_EXPIRY")  # seconds
     
     # Database Configuration
     database_url: str = Field(
@@ -37,10 +43,41 @@ class Settings(BaseSettings):
     db_user: str = Field(default="raguser", env="DB_USER")
     db_password: str = Field(default="ragpassword", env="DB_PASSWORD")
     
+    # Connection Pool Configuration
+    # Pre-ping defaults to off when DB_USE_PGBOUNCER is set (see below): behind
+    # PgBouncer in transaction mode its SELECT 1 leaves server connections
+    # "idle in transaction"; pair it with a short DB_POOL_RECYCLE (e.g. 60).
+    db_pool_pre_ping: bool = Field(default=True, env="DB_POOL_PRE_PING")
+    # Per engine: each worker process has a sync and an async engine, so it
+    # can open 2 x (size + overflow) connections; multiply by WEB_CONCURRENCY
+    # and keep the total under the server's max_connections
+    db_pool_size: int = Field(default=5, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=5, env="DB_MAX_OVERFLOW")  # absorbs search bursts
+    db_pool_timeout: int = Field(default=30, env="DB_POOL_TIMEOUT")  # seconds
+    db_pool_recycle: int = Field(default=300, env="DB_POOL_RECYCLE")  # seconds
+    db_pool_use_lifo: bool = Field(default=True, env="DB_POOL_USE_LIFO")
+    # Set when DATABASE_URL points at PgBouncer in transaction mode: disables
+    # asyncpg's server-side prepared statement caches, which don't survive
+    # connections being swapped between transactions.
+    db_use_pgbouncer: bool = Field(default=False, env="DB_USE_PGBOUNCER")
+    # Schema migrations (create_all, column/type changes, index builds) run
+    # over this direct PostgreSQL URL rather than through PgBouncer; defaults
+    # to DATABASE_URL. With DB_MIGRATE_ON_STARTUP=false, workers skip them
+    # (python main.py migrates once before starting its workers).
+    migration_database_url: Optional[str] = Field(default=None, env="MIGRATION_DATABASE_URL")
+    db_migrate_on_startup: bool = Field(default=True, env="DB_MIGRATE_ON_STARTUP")
+    
+    @model_validator(mode='after')
+    def default_pre_ping_for_pgbouncer(self):
+        # An explicit DB_POOL_PRE_PING always wins
+        if self.db_use_pgbouncer and 'db_pool_pre_ping' not in self.model_fields_set:
+            self.db_pool_pre_ping = False
+        return self
+    
     # Upload Configuration
     max_upload_size: int = Field(default=10485760, env="MAX_UPLOAD_SIZE")  # 10MB
-    allowed_extensions: Union[List[str], str] = Field(
-        default=[".txt", ".pdf"],
+    allowed_extensions: Union[FrozenSet[str], str] = Field(
+        default=frozenset({".txt", ".pdf"}),
         env="ALLOWED_EXTENSIONS"
     )
     upload_dir: str = Field(default="/app/uploads", env="UPLOAD_DIR")
@@ -48,13 +85,62 @@ class Settings(BaseSettings):
     @field_validator('allowed_extensions', mode='before')
     @classmethod
     def parse_allowed_extensions(cls, v):
+        # Frozen set for O(1) membership checks on every upload
         if isinstance(v, str):
-            return [ext.strip() for ext in v.split(',')]
-        return v
+            v = v.split(',')
+        return frozenset(ext.strip().lower() for ext in v)
     
     # Vector Search Configuration
     embedding_dimension: int = Field(default=1536, env="EMBEDDING_DIMENSION")
     top_k_results: int = Field(default=5, env="TOP_K_RESULTS")
+    hnsw_ef_search: int = Field(default=40, env="HNSW_EF_SEARCH")
+    
+    # Embedding API batching: inputs per request (OpenAI allows up to 2048 and
+    # 300k tokens; 512 x ~250-token chunks stays well under) and how many
+    # batch requests may be in flight at once
+    embedding_batch_size: int = Field(default=512, env="EMBEDDING_BATCH_SIZE")
+    embedding_max_concurrency: int = Field(default=4, env="EMBEDDING_MAX_CONCURRENCY")
+    # Chunks embedded and inserted per ingest window; each window's insert
+    # overlaps the next window's embedding request
+    ingest_window_size: int = Field(default=100, env="INGEST_WINDOW_SIZE")
+    # Query embeddings kept in memory (exact text match, LRU); 0 disables
+    query_embedding_cache_size: int = Field(default=10000, env="QUERY_EMBEDDING_CACHE_SIZE")
+    # Concurrent query embeddings are coalesced into one request: up to this
+    # many queries, or whatever arrives within the wait window
+    query_batch_max_size: int = Field(default=32, env="QUERY_BATCH_MAX_SIZE")
+    query_batch_wait_ms: float = Field(default=5.0, env="QUERY_BATCH_WAIT_MS")
+    
+    # Semantic Cache Configuration (RAG chat responses keyed by query embedding)
+    semantic_cache_enabled: bool = Field(default=True, env="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_size: int = Field(default=1024, env="SEMANTIC_CACHE_SIZE")
+    semantic_cache_threshold: float = Field(default=0.95, env="SEMANTIC_CACHE_THRESHOLD")
+    # Entries for the retrieval cache (search results / RAG context, same threshold)
+    retrieval_cache_size: int = Field(default=4096, env="RETRIEVAL_CACHE_SIZE")
+    # Seconds each worker reuses the corpus_state version that keys both
+    # caches; documents added or deleted by another worker invalidate cached
+    # answers and results here within this interval
+    corpus_version_ttl: float = Field(default=1.0, env="CORPUS_VERSION_TTL")
+    # Random-projection LSH prefilter for semantic lookups; worth enabling
+    # (e.g. 8 tables) for caches in the tens of thousands of entries. Fewer
+    # bits per table raise recall at high thresholds but widen buckets.
+    semantic_cache_lsh_tables: int = Field(default=0, env="SEMANTIC_CACHE_LSH_TABLES")
+    semantic_cache_lsh_bits: int = Field(default=8, env="SEMANTIC_CACHE_LSH_BITS")
+    # document_id -> filename/type/upload time for search results (entries
+    # expire after the TTL in seconds; deletes invalidate immediately)
+    document_cache_size: int = Field(default=10000, env="DOCUMENT_CACHE_SIZE")
+    document_cache_ttl: float = Field(default=300.0, env="DOCUMENT_CACHE_TTL")
+    
+    # Cross-encoder reranking (optional; needs onnxruntime + tokenizers and a
+    # directory with model.onnx and tokenizer.json)
+    reranker_model_dir: Optional[str] = Field(default=None, env="RERANKER_MODEL_DIR")
+    reranker_max_length: int = Field(default=512, env="RERANKER_MAX_LENGTH")
+    rerank_candidates: int = Field(default=50, env="RERANK_CANDIDATES")
+    
+    # Hybrid search query routing, when the caller doesn't set weights: long
+    # or question-style queries skip the keyword branch (full-text AND
+    # matching rarely hits them), and 1-3 word queries weight keyword
+    # matches above semantic ones
+    hybrid_query_routing: bool = Field(default=True, env="HYBRID_QUERY_ROUTING")
     
     # Chunking Configuration
     chunk_size: int = Field(default=1000, env="CHUNK_SIZE")
@@ -65,5 +151,18 @@ class Settings(BaseSettings):
         case_sensitive = False
 
 
-# Create global settings instance
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Get the application settings, parsed once on first call
+    
+    Usage in FastAPI:
+        @app.get("/info")
+        def info(settings: Settings = Depends(get_settings)):
+            pass
+    """
+    return Settings()
+
+
+# Global settings instance (kept for backwards compatibility; prefer get_settings())
+settings = get_settings()
\ No newline at end of file
@@ -1,11 +1,14 @@
-from .models import Base, Document, DocumentChunk
-from .connection import db_manager, get_db, DatabaseManager
+from .models import Base, Document, DocumentChunk, EmbeddingCache, CorpusState
+from .connection import db_manager, get_db, get_async_db, DatabaseManager
 
 __all__ = [
     "Base",
     "Document",
     "DocumentChunk",
+    "EmbeddingCache",
+    "CorpusState",
     "db_manager",
     "get_db",
+    "get_async_db",
     "DatabaseManager"
 ]
\ No newline at end of file
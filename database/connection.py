@@ -1,14 +1,43 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool, QueuePool
+from pgvector.psycopg2 import register_vector
 from contextlib import contextmanager
-from typing import Generator
+from typing import AsyncGenerator, Dict, Generator, Optional
+import threading
+import time
+import uuid
 import logging
-from config import settings
+from config import get_settings
 from database.models import Base
 
 logger = logging.getLogger(__name__)
 
+# Seconds a connection test result is reused before probing the database again
+_CONNECTION_TEST_TTL = 1.0
+
+# Advisory lock key held while migrating, so only one process migrates at a
+# time (others wait, then find everything already in place)
+_MIGRATION_LOCK_KEY = 7240531
+
+# Indexes declared on the models that create_all() won't add to tables
+# created before they were declared. Built CONCURRENTLY so startup does not
+# block writes on large tables.
+_INDEX_DDL = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_embedding_hnsw_ip "
+    "ON document_chunks USING hnsw (embedding halfvec_ip_ops) "
+    "WITH (m = 16, ef_construction = 64)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_has_embedding "
+    "ON document_chunks (id) WHERE embedding IS NOT NULL",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_doc_created "
+    "ON document_chunks (document_id, created_at DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_doc_status_uploaded "
+    "ON documents (processing_status, uploaded_at DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chunk_tsv "
+    "ON document_chunks USING gin (chunk_tsv)",
+]
+
 
 class DatabaseManager:
     """
@@ -21,32 +50,92 @@ class DatabaseManager:
         """
         self.engine = None
         self.SessionLocal = None
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        self._vector_checked: bool = False  # pgvector presence verified once per process
+        self._last_probe_monotonic: float = 0.0
+        self._last_probe_result: bool = False
+        self._probe_lock = threading.Lock()
+        self._corpus_version: Optional[int] = None
+        self._corpus_version_monotonic: float = 0.0
         self._initialize_engine()
     
     def _initialize_engine(self):
         """
         Create database engine with connection pooling
         """
+        settings = get_settings()
+        
         try:
             # Create engine with connection pooling
             self.engine = create_engine(
                 settings.database_url,
                 poolclass=QueuePool,
-                pool_size=5,  # Number of connections to keep open
-                max_overflow=10,  # Max connections that can be created beyond pool_size
-                pool_timeout=30,  # Timeout for getting connection from pool
-                pool_recycle=3600,  # Recycle connections after 1 hour
-                pool_pre_ping=True,  # Verify connections before using them
+                pool_size=settings.db_pool_size,  # Number of connections to keep open
+                max_overflow=settings.db_max_overflow,  # Max connections that can be created beyond pool_size
+                pool_timeout=settings.db_pool_timeout,  # Timeout for getting connection from pool
+                pool_recycle=settings.db_pool_recycle,  # Recycle connections after this many seconds
+                # Reuse the most recently returned connection so surplus idle
+                # connections age out under low traffic
+                pool_use_lifo=settings.db_pool_use_lifo,
+                # Verify connections before using them. Disable behind PgBouncer
+                # transaction pooling and rely on pool_recycle instead.
+                pool_pre_ping=settings.db_pool_pre_ping,
+                query_cache_size=1200,  # Compiled statement cache entries
                 echo=False  # Set to True for SQL query logging
             )
             
-            # Create session factory
+            # Register pgvector adapters on every new DBAPI connection so
+            # numpy embeddings are adapted by psycopg2 directly and results
+            # come back as vectors rather than strings to re-parse
+            @event.listens_for(self.engine, "connect")
+            def _register_vector(dbapi_connection, connection_record):
+                try:
+                    register_vector(dbapi_connection)
+                except Exception as e:
+                    # Extension not created yet (first start before init.sql)
+                    logger.warning(f"Could not register pgvector adapters: {str(e)}")
+            
+            # Create session factory. Objects keep their loaded state after
+            # commit, so CRUD methods don't need a refresh round-trip.
             self.SessionLocal = sessionmaker(
                 autocommit=False,
                 autoflush=False,
+                expire_on_commit=False,
                 bind=self.engine
             )
             
+            # Async engine (asyncpg) for read-heavy endpoints such as vector
+            # search; writes stay on the sync engine above
+            async_connect_args = {}
+            if settings.db_use_pgbouncer:
+                # asyncpg still prepares every statement under a generated
+                # name; make the names unique so clients sharing a server
+                # connection in transaction pooling never collide
+                async_connect_args = {
+                    "statement_cache_size": 0,
+                    "prepared_statement_cache_size": 0,
+                    "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__"
+                }
+            
+            self.async_engine = create_async_engine(
+                settings.database_url.replace("postgresql://", "postgresql+asyncpg://", 1),
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout,
+                pool_recycle=settings.db_pool_recycle,
+                pool_use_lifo=settings.db_pool_use_lifo,
+                pool_pre_ping=settings.db_pool_pre_ping,
+                connect_args=async_connect_args,
+                echo=False
+            )
+            
+            # Keep attributes loaded after commit so reads don't re-fetch
+            self.AsyncSessionLocal = async_sessionmaker(
+                self.async_engine,
+                expire_on_commit=False
+            )
+            
             logger.info("Database engine initialized successfully")
             
         except Exception as e:
@@ -55,14 +144,85 @@ class DatabaseManager:
     
     def create_tables(self):
         """
-        Create all tables defined in models
+        Create all tables defined in models and apply schema updates
+        
+        Runs on a dedicated connection to MIGRATION_DATABASE_URL (direct to
+        PostgreSQL, bypassing PgBouncer) under a session advisory lock, so
+        concurrent workers never run the DDL at the same time.
         """
+        settings = get_settings()
+        engine = create_engine(
+            settings.migration_database_url or settings.database_url,
+            poolclass=NullPool
+        )
         try:
-            Base.metadata.create_all(bind=self.engine)
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+                try:
+                    Base.metadata.create_all(bind=conn)
+                    self._ensure_schema_updates(conn)
+                finally:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK_KEY})
             logger.info("Database tables created successfully")
         except Exception as e:
             logger.error(f"Failed to create tables: {str(e)}")
             raise
+        finally:
+            engine.dispose()
+    
+    def _ensure_schema_updates(self, conn):
+        """
+        Bring tables created by older versions up to date with the models
+        
+        create_all() only emits indexes for new tables, so older
+        document_chunks tables are migrated from vector to halfvec, get the
+        chunk_tsv column added and get the missing indexes built. CREATE INDEX
+        CONCURRENTLY cannot run inside a transaction, hence the AUTOCOMMIT
+        connection; for the same reason maintenance_work_mem can't be SET
+        LOCAL, so it is set for the index builds and reset afterwards (the
+        connection is private to this migration and closed when it ends).
+        
+        Args:
+            conn: AUTOCOMMIT connection holding the migration lock
+        """
+        column_type = conn.execute(text(
+            "SELECT udt_name FROM information_schema.columns "
+            "WHERE table_name = 'document_chunks' AND column_name = 'embedding'"
+        )).scalar()
+        
+        # Superseded by the inner-product index below
+        conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS idx_chunk_embedding_hnsw"))
+        
+        if column_type == 'vector':
+            logger.info("Converting document_chunks.embedding from vector to halfvec")
+            conn.execute(text(
+                "ALTER TABLE document_chunks ALTER COLUMN embedding "
+                "TYPE halfvec(1536) USING embedding::halfvec(1536)"
+            ))
+        
+        # Generated full-text column backing keyword search
+        conn.execute(text(
+            "ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS chunk_tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', chunk_text)) STORED"
+        ))
+        
+        # Seed the corpus_state row from the existing tables; later changes are
+        # applied as deltas, so the counts only run while the row is missing
+        conn.execute(text(
+            "INSERT INTO corpus_state (id, version, document_count, chunk_count, indexed_chunk_count) "
+            "SELECT 1, 0, count(DISTINCT d.id), count(c.id), count(c.embedding) "
+            "FROM documents d LEFT JOIN document_chunks c ON c.document_id = d.document_id "
+            "WHERE d.processing_status = 'completed' "
+            "AND NOT EXISTS (SELECT 1 FROM corpus_state) "
+            "ON CONFLICT (id) DO NOTHING"
+        ))
+        
+        conn.execute(text("SET maintenance_work_mem = '1GB'"))
+        try:
+            for ddl in _INDEX_DDL:
+                conn.execute(text(ddl))
+        finally:
+            conn.execute(text("RESET maintenance_work_mem"))
     
     def drop_tables(self):
         """
@@ -116,15 +276,72 @@ class DatabaseManager:
         """
         Test database connection
         
+        The result is reused for _CONNECTION_TEST_TTL seconds so health check
+        bursts issue at most one probe per second; concurrent callers wait on
+        a lock instead of all probing at once.
+        
+        Returns:
+            True if connection is successful, False otherwise
+        """
+        if time.monotonic() - self._last_probe_monotonic < _CONNECTION_TEST_TTL:
+            return self._last_probe_result
+        
+        with self._probe_lock:
+            # Another thread may have probed while we waited
+            if time.monotonic() - self._last_probe_monotonic < _CONNECTION_TEST_TTL:
+                return self._last_probe_result
+            
+            result = self._probe_connection()
+            self._last_probe_result = result
+            self._last_probe_monotonic = time.monotonic()
+            return result
+    
+    async def corpus_version(self) -> Optional[int]:
+        """
+        Current corpus_state version, bumped whenever documents finish
+        processing or are deleted (by any process)
+        
+        Cached responses are namespaced by it, so every worker stops serving
+        entries built on an older document set. The value is reused for
+        CORPUS_VERSION_TTL seconds; if it can't be read, the last known value
+        is returned.
+        
+        Returns:
+            Version number, or None if it has never been read
+        """
+        if time.monotonic() - self._corpus_version_monotonic < get_settings().corpus_version_ttl:
+            return self._corpus_version
+        
+        try:
+            async with self.async_engine.connect() as conn:
+                version = (await conn.execute(
+                    text("SELECT version FROM corpus_state WHERE id = 1")
+                )).scalar()
+            self._corpus_version = version
+        except Exception as e:
+            logger.warning(f"Could not read corpus version: {str(e)}")
+        self._corpus_version_monotonic = time.monotonic()
+        return self._corpus_version
+    
+    def _probe_connection(self) -> bool:
+        """
+        Probe the database
+        
+        The pgvector extension check only runs until it first succeeds;
+        after that only the cheap SELECT 1 liveness ping is issued.
+        
         Returns:
             True if connection is successful, False otherwise
         """
         try:
             with self.engine.connect() as conn:
-                # Test pgvector extension
+                # Test connection
                 result = conn.execute(text("SELECT 1"))
                 result.fetchone()
                 
+                if self._vector_checked:
+                    return True
+                
                 # Test pgvector is installed
                 result = conn.execute(
                     text("SELECT COUNT(*) FROM pg_extension WHERE extname = 'vector'")
@@ -135,6 +352,7 @@ class DatabaseManager:
                     logger.warning("pgvector extension is not installed")
                     return False
                 
+                self._vector_checked = True
                 logger.info("Database connection test successful")
                 return True
                 
@@ -189,6 +407,25 @@ class DatabaseManager:
             logger.error(f"Failed to get table count: {str(e)}")
             return 0
     
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Current connection pool usage of the sync and async engines
+        
+        Returns:
+            Per-engine size, checked-out and overflow connection counts
+        """
+        stats = {}
+        for name, engine in (("sync", self.engine), ("async", self.async_engine)):
+            if engine is None:
+                continue
+            pool = engine.pool
+            stats[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow()
+            }
+        return stats
+    
     def close(self):
         """
         Close database connection and dispose of engine
@@ -196,6 +433,14 @@ class DatabaseManager:
         if self.engine:
             self.engine.dispose()
             logger.info("Database connection closed")
+    
+    async def close_async(self):
+        """
+        Dispose of the async engine's connection pool
+        """
+        if self.async_engine:
+            await self.async_engine.dispose()
+            logger.info("Async database connection closed")
 
 
 # Create global database manager instance
@@ -211,4 +456,12 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield session
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency to get an async (asyncpg) database session
+    """
+    async with db_manager.AsyncSessionLocal() as session:
+        yield session
\ No newline at end of file
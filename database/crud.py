@@ -1,13 +1,99 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, func
-from typing import List, Optional, Dict
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import ScalarResult
+from sqlalchemy import desc, and_, func, text, select, insert, update, delete, tuple_, or_, bindparam
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime
+import csv
+import io
+import numpy as np
 import logging
 
-from database.models import Document, DocumentChunk
+from config import get_settings
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from database.models import Document, DocumentChunk, EmbeddingCache, CorpusState
 
 logger = logging.getLogger(__name__)
 
+# Sets the HNSW candidate list size for the current transaction only
+_EF_SEARCH_STMT = text("SELECT set_config('hnsw.ef_search', :ef_search, true)")
+
+# Planner row estimate for a table or index; -1 if never analyzed (PG14+)
+_RELTUPLES_STMT = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:relation AS regclass)")
+
+# Hot lookups built once at import; each call only binds parameters and
+# reuses the engine's cached compiled form
+_DOCUMENT_BY_ID_STMT = select(Document).where(Document.document_id == bindparam('document_id'))
+_DOCUMENT_BY_HASH_STMT = select(Document).where(Document.file_hash == bindparam('file_hash'))
+# Columns returned by document listings (matches DocumentMetadata)
+_DOCUMENT_LIST_COLUMNS = (
+    Document.document_id,
+    Document.filename,
+    Document.file_type,
+    Document.file_size,
+    Document.file_hash,
+    Document.character_count,
+    Document.word_count,
+    Document.page_count,
+    Document.chunk_count,
+    Document.uploaded_at,
+)
+_CHUNK_BY_ID_STMT = select(DocumentChunk).where(DocumentChunk.chunk_id == bindparam('chunk_id'))
+
+# Batches at least this large are loaded with COPY instead of INSERT
+_COPY_MIN_ROWS = 1000
+_CHUNK_COPY_COLUMNS = ("chunk_id", "document_id", "chunk_text", "chunk_index", "chunk_size", "embedding")
+_CHUNK_COPY_SQL = (
+    f"COPY {DocumentChunk.__tablename__} ({', '.join(_CHUNK_COPY_COLUMNS)}) "
+    # Empty unquoted fields are NULL in CSV; only the embedding may be NULL
+    "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (chunk_id, document_id, chunk_text))"
+)
+
+
+def _to_halfvec(embedding: Optional[List[float]]) -> Optional[np.ndarray]:
+    """
+    L2-normalize an embedding and cast it to float16 for a halfvec column
+    
+    Stored and query vectors are unit length, so inner product equals
+    cosine similarity and search can use the cheaper inner-product operator.
+    
+    Args:
+        embedding: Vector embedding or None
+        
+    Returns:
+        Normalized float16 numpy array or None
+    """
+    if embedding is None:
+        return None
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec = vec / norm
+    return vec.astype(np.float16)
+
+
+def _estimate_rows(db: Session, relation: str, exact_stmt) -> int:
+    """
+    Row count from pg_class.reltuples, falling back to an exact count
+    
+    The estimate is O(1) and kept current by autovacuum/ANALYZE. A value
+    of 0 or less is not trusted (never analyzed, or a small table that
+    autovacuum has not re-analyzed since it was empty), and in that case
+    the table is small enough for exact_stmt to be cheap.
+    
+    Args:
+        db: Database session
+        relation: Table or index name
+        exact_stmt: COUNT statement to run when the estimate is unusable
+        
+    Returns:
+        Estimated (or exact) row count
+    """
+    estimate = db.scalar(_RELTUPLES_STMT, {"relation": relation})
+    if estimate is not None and estimate > 0:
+        return estimate
+    return db.scalar(exact_stmt)
+
 
 class DocumentCRUD:
     """
@@ -54,7 +140,6 @@ class DocumentCRUD:
             
             db.add(document)
             db.commit()
-            db.refresh(document)
             
             logger.info(f"Document created: {document_id}")
             return document
@@ -76,7 +161,52 @@ class DocumentCRUD:
         Returns:
             Document object or None
         """
-        return db.query(Document).filter(Document.document_id == document_id).first()
+        return db.execute(
+            _DOCUMENT_BY_ID_STMT, {"document_id": document_id}
+        ).scalar_one_or_none()
+    
+    @staticmethod
+    def get_documents_by_ids(db: Session, document_ids: List[str]) -> Dict[str, Document]:
+        """
+        Load several documents in one query
+        
+        Args:
+            db: Database session
+            document_ids: Document identifiers
+            
+        Returns:
+            Dictionary mapping document_id to Document (missing ids omitted)
+        """
+        if not document_ids:
+            return {}
+        
+        result = db.execute(
+            select(Document).where(Document.document_id.in_(set(document_ids)))
+        )
+        return {document.document_id: document for document in result.scalars()}
+    
+    @staticmethod
+    async def get_documents_by_ids_async(
+        db: AsyncSession,
+        document_ids: List[str]
+    ) -> Dict[str, Document]:
+        """
+        Async variant of get_documents_by_ids
+        
+        Args:
+            db: Async database session
+            document_ids: Document identifiers
+            
+        Returns:
+            Dictionary mapping document_id to Document (missing ids omitted)
+        """
+        if not document_ids:
+            return {}
+        
+        result = await db.execute(
+            select(Document).where(Document.document_id.in_(set(document_ids)))
+        )
+        return {document.document_id: document for document in result.scalars()}
     
     @staticmethod
     def get_document_by_hash(db: Session, file_hash: str) -> Optional[Document]:
@@ -90,33 +220,104 @@ class DocumentCRUD:
         Returns:
             Document object or None
         """
-        return db.query(Document).filter(Document.file_hash == file_hash).first()
+        return db.execute(
+            _DOCUMENT_BY_HASH_STMT, {"file_hash": file_hash}
+        ).scalar_one_or_none()
     
     @staticmethod
     def get_all_documents(
         db: Session,
-        skip: int = 0,
+        cursor: Optional[Tuple[datetime, int]] = None,
+        limit: int = 100,
+        status: Optional[str] = None
+    ) -> Tuple[List[Document], Optional[Tuple[datetime, int]]]:
+        """
+        Get all documents with optional filtering, newest first
+        
+        Uses keyset pagination on (uploaded_at, id): each page is an index
+        range scan starting after the cursor instead of an OFFSET scan.
+        
+        Args:
+            db: Database session
+            cursor: (uploaded_at, id) of the last document on the previous page
+            limit: Maximum records to return
+            status: Filter by processing status
+            
+        Returns:
+            Tuple of (Document objects, cursor for the next page or None)
+        """
+        stmt = select(Document)
+        
+        if status:
+            stmt = stmt.where(Document.processing_status == status)
+        if cursor:
+            stmt = stmt.where(tuple_(Document.uploaded_at, Document.id) < cursor)
+        
+        stmt = stmt.order_by(desc(Document.uploaded_at), desc(Document.id)).limit(limit)
+        documents = db.execute(stmt).scalars().all()
+        
+        next_cursor = None
+        if len(documents) == limit:
+            next_cursor = (documents[-1].uploaded_at, documents[-1].id)
+        
+        return documents, next_cursor
+    
+    @staticmethod
+    def list_with_count(
+        db: Session,
+        cursor: Optional[Tuple[datetime, int]] = None,
         limit: int = 100,
         status: Optional[str] = None
-    ) -> List[Document]:
+    ) -> Tuple[List[Dict], int, Optional[Tuple[datetime, int]]]:
         """
-        Get all documents with optional filtering
+        List document metadata and the total count in a single query
+        
+        Selects only the listing columns (no ORM hydration) plus the total
+        as a scalar subquery. The total ignores the cursor, so it stays the
+        full count on every page (a COUNT(*) OVER () window would only count
+        rows after the cursor).
         
         Args:
             db: Database session
-            skip: Number of records to skip
+            cursor: (uploaded_at, id) of the last document on the previous page
             limit: Maximum records to return
             status: Filter by processing status
             
         Returns:
-            List of Document objects
+            Tuple of (metadata dicts, total count, cursor for the next page or None)
         """
-        query = db.query(Document)
+        count_stmt = select(func.count(Document.id))
+        if status:
+            count_stmt = count_stmt.where(Document.processing_status == status)
+        
+        stmt = select(
+            *_DOCUMENT_LIST_COLUMNS,
+            Document.id,
+            count_stmt.scalar_subquery().label('total')
+        )
         
         if status:
-            query = query.filter(Document.processing_status == status)
+            stmt = stmt.where(Document.processing_status == status)
+        if cursor:
+            stmt = stmt.where(tuple_(Document.uploaded_at, Document.id) < cursor)
+        
+        stmt = stmt.order_by(desc(Document.uploaded_at), desc(Document.id)).limit(limit)
+        rows = db.execute(stmt).all()
+        
+        if rows:
+            total = rows[0].total
+        else:
+            total = db.scalar(count_stmt)
+        
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = (rows[-1].uploaded_at, rows[-1].id)
         
-        return query.order_by(desc(Document.uploaded_at)).offset(skip).limit(limit).all()
+        documents = [
+            {column.key: row[i] for i, column in enumerate(_DOCUMENT_LIST_COLUMNS)}
+            for row in rows
+        ]
+        return documents, total, next_cursor
     
     @staticmethod
     def update_document_status(
@@ -140,18 +341,25 @@ class DocumentCRUD:
             Updated Document object or None
         """
         try:
-            document = DocumentCRUD.get_document_by_id(db, document_id)
-            if not document:
-                return None
-            
-            document.processing_status = status
+            values = {"processing_status": status}
             if error_message:
-                document.error_message = error_message
+                values["error_message"] = error_message
             if processed_at:
-                document.processed_at = processed_at
+                values["processed_at"] = processed_at
+            
+            # Single UPDATE ... RETURNING instead of SELECT + UPDATE
+            stmt = (
+                update(Document)
+                .where(Document.document_id == document_id)
+                .values(**values)
+                .returning(Document)
+            )
+            document = db.execute(stmt).scalar_one_or_none()
+            if not document:
+                db.rollback()
+                return None
             
             db.commit()
-            db.refresh(document)
             
             logger.info(f"Document status updated: {document_id} -> {status}")
             return document
@@ -179,14 +387,18 @@ class DocumentCRUD:
             Updated Document object or None
         """
         try:
-            document = DocumentCRUD.get_document_by_id(db, document_id)
+            stmt = (
+                update(Document)
+                .where(Document.document_id == document_id)
+                .values(chunk_count=chunk_count)
+                .returning(Document)
+            )
+            document = db.execute(stmt).scalar_one_or_none()
             if not document:
+                db.rollback()
                 return None
             
-            document.chunk_count = chunk_count
             db.commit()
-            db.refresh(document)
-            
             return document
             
         except Exception as e:
@@ -194,11 +406,109 @@ class DocumentCRUD:
             logger.error(f"Failed to update chunk count: {str(e)}")
             raise
     
+    @staticmethod
+    def complete_document(
+        db: Session,
+        document_id: str,
+        chunk_count: int,
+        processed_at: datetime
+    ) -> Optional[Document]:
+        """
+        Mark a document completed and add it to the corpus totals
+        
+        The status, chunk count and corpus_state delta are written in one
+        transaction. Every stored chunk carries an embedding, so chunk_count
+        is added to both chunk totals.
+        
+        Args:
+            db: Database session
+            document_id: Document identifier
+            chunk_count: Number of chunks stored
+            processed_at: Processing completion time
+            
+        Returns:
+            Updated Document object or None (e.g. deleted while processing)
+        """
+        try:
+            stmt = (
+                update(Document)
+                .where(Document.document_id == document_id)
+                .values(
+                    processing_status='completed',
+                    chunk_count=chunk_count,
+                    processed_at=processed_at
+                )
+                .returning(Document)
+            )
+            document = db.execute(stmt).scalar_one_or_none()
+            if not document:
+                db.rollback()
+                return None
+            
+            db.execute(CorpusStateCRUD._delta_stmt(1, chunk_count, chunk_count))
+            db.commit()
+            
+            logger.info(f"Document status updated: {document_id} -> completed")
+            return document
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to complete document: {str(e)}")
+            raise
+    
+    @staticmethod
+    def update_document_content_stats(
+        db: Session,
+        document_id: str,
+        character_count: Optional[int],
+        word_count: Optional[int],
+        page_count: Optional[int] = None
+    ) -> Optional[Document]:
+        """
+        Update content metadata filled in after parsing
+        
+        Args:
+            db: Database session
+            document_id: Document identifier
+            character_count: Number of characters in parsed content
+            word_count: Number of words in parsed content
+            page_count: Number of pages (PDF only)
+            
+        Returns:
+            Updated Document object or None
+        """
+        try:
+            stmt = (
+                update(Document)
+                .where(Document.document_id == document_id)
+                .values(
+                    character_count=character_count,
+                    word_count=word_count,
+                    page_count=page_count
+                )
+                .returning(Document)
+            )
+            document = db.execute(stmt).scalar_one_or_none()
+            if not document:
+                db.rollback()
+                return None
+            
+            db.commit()
+            return document
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to update content stats: {str(e)}")
+            raise
+    
     @staticmethod
     def delete_document(db: Session, document_id: str) -> bool:
         """
         Delete document and all its chunks (cascade)
         
+        A completed document is subtracted from the corpus totals in the
+        same transaction.
+        
         Args:
             db: Database session
             document_id: Document identifier
@@ -207,11 +517,21 @@ class DocumentCRUD:
             True if deleted, False if not found
         """
         try:
-            document = DocumentCRUD.get_document_by_id(db, document_id)
-            if not document:
+            # Chunks are removed by the ON DELETE CASCADE foreign key
+            stmt = (
+                delete(Document)
+                .where(Document.document_id == document_id)
+                .returning(Document.processing_status, Document.chunk_count)
+            )
+            deleted = db.execute(stmt).one_or_none()
+            if deleted is None:
+                db.rollback()
                 return False
             
-            db.delete(document)
+            # Only completed documents are in the corpus totals
+            if deleted.processing_status == 'completed':
+                chunk_count = deleted.chunk_count or 0
+                db.execute(CorpusStateCRUD._delta_stmt(-1, -chunk_count, -chunk_count))
             db.commit()
             
             logger.info(f"Document deleted: {document_id}")
@@ -223,21 +543,30 @@ class DocumentCRUD:
             raise
     
     @staticmethod
-    def count_documents(db: Session, status: Optional[str] = None) -> int:
+    def count_documents(
+        db: Session,
+        status: Optional[str] = None,
+        estimate: bool = False
+    ) -> int:
         """
         Count total documents
         
+        Filtered counts are served by the processing_status indexes.
+        
         Args:
             db: Database session
             status: Filter by status (optional)
+            estimate: Return the pg_class estimate when unfiltered (see _estimate_rows)
             
         Returns:
             Count of documents
         """
-        query = db.query(Document)
+        stmt = select(func.count(Document.id))
         if status:
-            query = query.filter(Document.processing_status == status)
-        return query.count()
+            stmt = stmt.where(Document.processing_status == status)
+        elif estimate:
+            return _estimate_rows(db, Document.__tablename__, stmt)
+        return db.scalar(stmt)
 
 
 class ChunkCRUD:
@@ -275,12 +604,11 @@ class ChunkCRUD:
                 chunk_text=chunk_text,
                 chunk_index=chunk_index,
                 chunk_size=len(chunk_text),
-                embedding=embedding
+                embedding=_to_halfvec(embedding)
             )
             
             db.add(chunk)
             db.commit()
-            db.refresh(chunk)
             
             logger.info(f"Chunk created: {chunk_id}")
             return chunk
@@ -290,35 +618,121 @@ class ChunkCRUD:
             logger.error(f"Failed to create chunk: {str(e)}")
             raise
     
+    @staticmethod
+    def _chunk_rows(chunks_data: List[Dict]) -> List[Dict]:
+        """
+        Build column-keyed insert parameters from chunk dictionaries
+        """
+        return [
+            {
+                "chunk_id": data["chunk_id"],
+                "document_id": data["document_id"],
+                "chunk_text": data["chunk_text"],
+                "chunk_index": data["chunk_index"],
+                "chunk_size": data.get("chunk_size", len(data["chunk_text"])),
+                "embedding": _to_halfvec(data.get("embedding"))
+            }
+            for data in chunks_data
+        ]
+    
+    @staticmethod
+    def _copy_chunk_rows(db: Session, rows: List[Dict]) -> None:
+        """
+        Stream chunk rows into the table with COPY (psycopg2 only)
+        
+        Rows are written as one CSV buffer, so the server parses a single
+        COPY instead of per-row INSERT values. Embeddings are sent as
+        halfvec text literals; id and created_at take their defaults.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            embedding = row["embedding"]
+            writer.writerow((
+                row["chunk_id"],
+                row["document_id"],
+                row["chunk_text"],
+                row["chunk_index"],
+                row["chunk_size"],
+                None if embedding is None else "[" + ",".join(map(str, embedding.tolist())) + "]"
+            ))
+        buffer.seek(0)
+        
+        with db.connection().connection.cursor() as cursor:
+            cursor.copy_expert(_CHUNK_COPY_SQL, buffer)
+    
+    @staticmethod
+    def bulk_insert_chunks(db: Session, chunks_data: List[Dict]) -> int:
+        """
+        Insert many chunks in as few round trips as possible
+        
+        Like create_chunks_batch but without RETURNING, for callers that
+        don't need the generated ids (e.g. background ingestion). The
+        parameter list is sent through insertmanyvalues, so a 500-chunk
+        document is a handful of multi-row INSERTs instead of 500.
+        Batches of _COPY_MIN_ROWS or more are loaded with COPY instead.
+        
+        Args:
+            db: Database session
+            chunks_data: List of chunk dictionaries
+            
+        Returns:
+            Number of chunks inserted
+        """
+        if not chunks_data:
+            return 0
+        
+        try:
+            rows = ChunkCRUD._chunk_rows(chunks_data)
+            if len(rows) >= _COPY_MIN_ROWS and db.get_bind().dialect.driver == "psycopg2":
+                ChunkCRUD._copy_chunk_rows(db, rows)
+            else:
+                db.execute(insert(DocumentChunk), rows)
+            db.commit()
+            
+            logger.info(f"Bulk inserted {len(chunks_data)} chunks")
+            return len(chunks_data)
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to bulk insert chunks: {str(e)}")
+            raise
+    
     @staticmethod
     def create_chunks_batch(
         db: Session,
         chunks_data: List[Dict]
-    ) -> List[DocumentChunk]:
+    ) -> List[int]:
         """
         Create multiple chunks in a batch
         
+        Uses a Core INSERT ... RETURNING id executed with the whole parameter
+        list, which SQLAlchemy's insertmanyvalues turns into multi-row
+        INSERT statements. No ORM objects are built and no rows are
+        refreshed afterwards.
+        
         Args:
             db: Database session
             chunks_data: List of chunk dictionaries
             
         Returns:
-            List of created DocumentChunk objects
+            List of created chunk ids (primary keys), in input order
         """
+        if not chunks_data:
+            return []
+        
         try:
-            chunks = []
-            for data in chunks_data:
-                chunk = DocumentChunk(**data)
-                chunks.append(chunk)
+            rows = ChunkCRUD._chunk_rows(chunks_data)
             
-            db.add_all(chunks)
+            stmt = insert(DocumentChunk).returning(
+                DocumentChunk.id,
+                sort_by_parameter_order=True
+            )
+            chunk_ids = db.execute(stmt, rows).scalars().all()
             db.commit()
             
-            for chunk in chunks:
-                db.refresh(chunk)
-            
-            logger.info(f"Batch created {len(chunks)} chunks")
-            return chunks
+            logger.info(f"Batch created {len(chunk_ids)} chunks")
+            return chunk_ids
             
         except Exception as e:
             db.rollback()
@@ -337,26 +751,133 @@ class ChunkCRUD:
         Returns:
             DocumentChunk object or None
         """
-        return db.query(DocumentChunk).filter(DocumentChunk.chunk_id == chunk_id).first()
+        return db.execute(
+            _CHUNK_BY_ID_STMT, {"chunk_id": chunk_id}
+        ).scalar_one_or_none()
     
     @staticmethod
     def get_chunks_by_document(
         db: Session,
-        document_id: str
-    ) -> List[DocumentChunk]:
+        document_id: str,
+        include_embedding: bool = False
+    ) -> ScalarResult:
         """
         Get all chunks for a document
         
+        Rows are streamed from the server in batches of 100 rather than
+        materialized up front, and the embedding column is deferred unless
+        requested.
+        
         Args:
             db: Database session
             document_id: Document identifier
+            include_embedding: Load the embedding vectors as well
             
         Returns:
-            List of DocumentChunk objects ordered by chunk_index
+            Iterable of DocumentChunk objects ordered by chunk_index
         """
-        return db.query(DocumentChunk).filter(
+        stmt = select(DocumentChunk).where(
             DocumentChunk.document_id == document_id
-        ).order_by(DocumentChunk.chunk_index).all()
+        ).order_by(DocumentChunk.chunk_index)
+        
+        if not include_embedding:
+            stmt = stmt.options(defer(DocumentChunk.embedding))
+        
+        return db.execute(stmt.execution_options(yield_per=100)).scalars()
+    
+    @staticmethod
+    def iter_chunk_rows(
+        db: Session,
+        document_id: str,
+        skip: int = 0,
+        limit: int = 100
+    ):
+        """
+        Stream one page of a document's chunks as plain column rows
+        
+        Only the columns the chunk listing needs are selected (no ORM
+        hydration, no embedding), fetched from the server in batches of 100.
+        
+        Args:
+            db: Database session
+            document_id: Document identifier
+            skip: Number of chunks to skip
+            limit: Maximum chunks to return
+            
+        Returns:
+            Iterable of rows ordered by chunk_index
+        """
+        stmt = select(
+            DocumentChunk.chunk_id,
+            DocumentChunk.chunk_text,
+            DocumentChunk.chunk_index,
+            DocumentChunk.document_id,
+            DocumentChunk.chunk_size,
+            DocumentChunk.created_at,
+            DocumentChunk.has_embedding
+        ).where(
+            DocumentChunk.document_id == document_id
+        ).order_by(DocumentChunk.chunk_index).offset(skip).limit(limit)
+        
+        return db.execute(stmt.execution_options(yield_per=100))
+    
+    @staticmethod
+    def _chunk_texts_in_ranges_stmt(ranges: List[Tuple[str, int, int]]):
+        """
+        Build a single query for chunks in (document_id, first, last) index ranges
+        
+        One BETWEEN predicate per range, each served by the (document_id,
+        chunk_index) index, so the statement grows with the number of ranges
+        rather than the number of chunks in them.
+        """
+        return select(
+            DocumentChunk.document_id,
+            DocumentChunk.chunk_index,
+            DocumentChunk.chunk_text
+        ).where(
+            or_(*(
+                and_(
+                    DocumentChunk.document_id == document_id,
+                    DocumentChunk.chunk_index.between(first, last)
+                )
+                for document_id, first, last in ranges
+            ))
+        )
+    
+    @staticmethod
+    def get_chunk_texts_in_ranges(db: Session, ranges: List[Tuple[str, int, int]]) -> List[tuple]:
+        """
+        Fetch the text of chunks within chunk_index ranges (inclusive)
+        
+        Args:
+            db: Database session
+            ranges: (document_id, first chunk_index, last chunk_index) triples
+            
+        Returns:
+            List of (document_id, chunk_index, chunk_text) rows
+        """
+        if not ranges:
+            return []
+        return db.execute(ChunkCRUD._chunk_texts_in_ranges_stmt(ranges)).all()
+    
+    @staticmethod
+    async def get_chunk_texts_in_ranges_async(
+        db: AsyncSession,
+        ranges: List[Tuple[str, int, int]]
+    ) -> List[tuple]:
+        """
+        Async variant of get_chunk_texts_in_ranges
+        
+        Args:
+            db: Async database session
+            ranges: (document_id, first chunk_index, last chunk_index) triples
+            
+        Returns:
+            List of (document_id, chunk_index, chunk_text) rows
+        """
+        if not ranges:
+            return []
+        return (await db.execute(ChunkCRUD._chunk_texts_in_ranges_stmt(ranges))).all()
     
     @staticmethod
     def update_chunk_embedding(
@@ -376,13 +897,17 @@ class ChunkCRUD:
             Updated DocumentChunk object or None
         """
         try:
-            chunk = ChunkCRUD.get_chunk_by_id(db, chunk_id)
+            # Lock the row up front since it is written straight away
+            chunk = db.execute(
+                select(DocumentChunk)
+                .where(DocumentChunk.chunk_id == chunk_id)
+                .with_for_update()
+            ).scalar_one_or_none()
             if not chunk:
                 return None
             
-            chunk.embedding = embedding
+            chunk.embedding = _to_halfvec(embedding)
             db.commit()
-            db.refresh(chunk)
             
             logger.info(f"Chunk embedding updated: {chunk_id}")
             return chunk
@@ -392,12 +917,45 @@ class ChunkCRUD:
             logger.error(f"Failed to update chunk embedding: {str(e)}")
             raise
     
+    @staticmethod
+    def _similar_chunks_stmt(
+        query_embedding: List[float],
+        limit: int,
+        document_id: Optional[str],
+        min_similarity: float = 0.0
+    ):
+        """
+        Build the vector similarity query shared by the sync and async paths
+        
+        document_id and min_similarity are SQL predicates applied alongside
+        the HNSW scan, so filtered-out rows never reach Python.
+        """
+        # Negative inner product of unit vectors (= -cosine similarity)
+        # Lower distance = more similar; ORDER BY must use it for the index
+        distance = DocumentChunk.embedding.max_inner_product(_to_halfvec(query_embedding))
+        
+        # Similarity is computed by the database, no Python post-processing
+        stmt = select(
+            DocumentChunk,
+            (distance * -1).label('similarity')
+        ).where(
+            DocumentChunk.embedding.isnot(None)
+        )
+        
+        if document_id:
+            stmt = stmt.where(DocumentChunk.document_id == document_id)
+        if min_similarity > 0:
+            stmt = stmt.where(distance <= -min_similarity)
+        
+        return stmt.order_by(distance).limit(limit)
+    
     @staticmethod
     def search_similar_chunks(
         db: Session,
         query_embedding: List[float],
         limit: int = 5,
-        document_id: Optional[str] = None
+        document_id: Optional[str] = None,
+        min_similarity: float = 0.0
     ) -> List[tuple]:
         """
         Search for similar chunks using vector similarity
@@ -407,38 +965,136 @@ class ChunkCRUD:
             query_embedding: Query vector
             limit: Maximum results to return
             document_id: Filter by document (optional)
+            min_similarity: Minimum similarity (optional)
             
         Returns:
             List of tuples (DocumentChunk, similarity_score)
         """
         try:
-            # Calculate cosine distance (1 - cosine similarity)
-            # Lower distance = more similar
-            distance = DocumentChunk.embedding.cosine_distance(query_embedding)
-            
-            query = db.query(
-                DocumentChunk,
-                distance.label('distance')
-            ).filter(
-                DocumentChunk.embedding.isnot(None)
-            )
+            # Candidate list size for the HNSW scan, scoped to this transaction
+            db.execute(_EF_SEARCH_STMT, {"ef_search": str(get_settings().hnsw_ef_search)})
             
-            if document_id:
-                query = query.filter(DocumentChunk.document_id == document_id)
+            stmt = ChunkCRUD._similar_chunks_stmt(query_embedding, limit, document_id, min_similarity)
+            return db.execute(stmt).all()
             
-            results = query.order_by(distance).limit(limit).all()
+        except Exception as e:
+            logger.error(f"Failed to search similar chunks: {str(e)}")
+            raise
+    
+    @staticmethod
+    async def search_similar_chunks_async(
+        db: AsyncSession,
+        query_embedding: List[float],
+        limit: int = 5,
+        document_id: Optional[str] = None,
+        min_similarity: float = 0.0
+    ) -> List[tuple]:
+        """
+        Async variant of search_similar_chunks for read endpoints
+        
+        Runs on the asyncpg engine so the event loop is free while the
+        vector search is in flight.
+        
+        Args:
+            db: Async database session
+            query_embedding: Query vector
+            limit: Maximum results to return
+            document_id: Filter by document (optional)
+            min_similarity: Minimum similarity (optional)
             
-            # Convert distance to similarity score (1 - distance)
-            results_with_score = [
-                (chunk, 1 - dist) for chunk, dist in results
-            ]
+        Returns:
+            List of tuples (DocumentChunk, similarity_score)
+        """
+        try:
+            await db.execute(_EF_SEARCH_STMT, {"ef_search": str(get_settings().hnsw_ef_search)})
             
-            return results_with_score
+            stmt = ChunkCRUD._similar_chunks_stmt(query_embedding, limit, document_id, min_similarity)
+            return (await db.execute(stmt)).all()
             
         except Exception as e:
             logger.error(f"Failed to search similar chunks: {str(e)}")
             raise
     
+    @staticmethod
+    def _keyword_chunks_stmt(query: str, limit: int, document_id: Optional[str]):
+        """
+        Build the full-text search query shared by the sync and async paths
+        
+        Matches plainto_tsquery('english', query) against the generated
+        chunk_tsv column (GIN indexed) and ranks with ts_rank_cd using
+        normalization 32, which maps ranks into [0, 1).
+        """
+        tsquery = func.plainto_tsquery('english', query)
+        rank = func.ts_rank_cd(DocumentChunk.chunk_tsv, tsquery, 32)
+        
+        stmt = select(
+            DocumentChunk,
+            rank.label('rank')
+        ).options(
+            defer(DocumentChunk.embedding)
+        ).where(
+            DocumentChunk.chunk_tsv.op('@@')(tsquery)
+        )
+        
+        if document_id:
+            stmt = stmt.where(DocumentChunk.document_id == document_id)
+        
+        return stmt.order_by(rank.desc()).limit(limit)
+    
+    @staticmethod
+    def search_keyword_chunks(
+        db: Session,
+        query: str,
+        limit: int = 5,
+        document_id: Optional[str] = None
+    ) -> List[tuple]:
+        """
+        Full-text search over chunk text, ranked by the database
+        
+        Args:
+            db: Database session
+            query: Search query text
+            limit: Maximum results to return
+            document_id: Filter by document (optional)
+            
+        Returns:
+            List of tuples (DocumentChunk, rank), best first
+        """
+        try:
+            stmt = ChunkCRUD._keyword_chunks_stmt(query, limit, document_id)
+            return db.execute(stmt).all()
+            
+        except Exception as e:
+            logger.error(f"Failed to search keyword chunks: {str(e)}")
+            raise
+    
+    @staticmethod
+    async def search_keyword_chunks_async(
+        db: AsyncSession,
+        query: str,
+        limit: int = 5,
+        document_id: Optional[str] = None
+    ) -> List[tuple]:
+        """
+        Async variant of search_keyword_chunks for read endpoints
+        
+        Args:
+            db: Async database session
+            query: Search query text
+            limit: Maximum results to return
+            document_id: Filter by document (optional)
+            
+        Returns:
+            List of tuples (DocumentChunk, rank), best first
+        """
+        try:
+            stmt = ChunkCRUD._keyword_chunks_stmt(query, limit, document_id)
+            return (await db.execute(stmt)).all()
+            
+        except Exception as e:
+            logger.error(f"Failed to search keyword chunks: {str(e)}")
+            raise
+    
     @staticmethod
     def delete_chunks_by_document(db: Session, document_id: str) -> int:
         """
@@ -466,21 +1122,28 @@ class ChunkCRUD:
             raise
     
     @staticmethod
-    def count_chunks(db: Session, document_id: Optional[str] = None) -> int:
+    def count_chunks(
+        db: Session,
+        document_id: Optional[str] = None,
+        estimate: bool = False
+    ) -> int:
         """
         Count total chunks
         
         Args:
             db: Database session
             document_id: Filter by document (optional)
+            estimate: Return the pg_class estimate when unfiltered (see _estimate_rows)
             
         Returns:
             Count of chunks
         """
-        query = db.query(DocumentChunk)
+        stmt = select(func.count(DocumentChunk.id))
         if document_id:
-            query = query.filter(DocumentChunk.document_id == document_id)
-        return query.count()
+            stmt = stmt.where(DocumentChunk.document_id == document_id)
+        elif estimate:
+            return _estimate_rows(db, DocumentChunk.__tablename__, stmt)
+        return db.scalar(stmt)
     
     @staticmethod
     def get_chunks_without_embeddings(
@@ -497,42 +1160,216 @@ class ChunkCRUD:
         Returns:
             List of DocumentChunk objects without embeddings
         """
-        return db.query(DocumentChunk).filter(
+        # The embedding is NULL for these rows, so there is nothing to select
+        stmt = select(DocumentChunk).options(
+            defer(DocumentChunk.embedding)
+        ).where(
             DocumentChunk.embedding.is_(None)
-        ).limit(limit).all()
+        ).limit(limit)
+        return db.execute(stmt).scalars().all()
     
     @staticmethod
-    def count_chunks_with_embeddings(db: Session) -> int:
+    def count_chunks_with_embeddings(db: Session, estimate: bool = False) -> int:
         """
         Count chunks that have embeddings
         
         Args:
             db: Database session
+            estimate: Return the row estimate of the idx_chunk_has_embedding
+                partial index instead (see _estimate_rows)
             
         Returns:
             Count of chunks with embeddings
         """
-        return db.query(DocumentChunk).filter(
+        stmt = select(func.count(DocumentChunk.id)).where(
             DocumentChunk.embedding.isnot(None)
-        ).count()
+        )
+        if estimate:
+            return _estimate_rows(db, 'idx_chunk_has_embedding', stmt)
+        return db.scalar(stmt)
     
     @staticmethod
     def get_all_chunks(
         db: Session,
-        skip: int = 0,
-        limit: int = 100
-    ) -> List[DocumentChunk]:
+        cursor: Optional[Tuple[datetime, int]] = None,
+        limit: int = 100,
+        include_embedding: bool = False
+    ) -> Tuple[List[DocumentChunk], Optional[Tuple[datetime, int]]]:
         """
-        Get all chunks with pagination
+        Get all chunks with keyset pagination on (created_at, id), newest first
         
         Args:
             db: Database session
-            skip: Number of records to skip
+            cursor: (created_at, id) of the last chunk on the previous page
             limit: Maximum records to return
+            include_embedding: Load the embedding vectors as well
+            
+        Returns:
+            Tuple of (DocumentChunk objects, cursor for the next page or None)
+        """
+        stmt = select(DocumentChunk)
+        if not include_embedding:
+            stmt = stmt.options(defer(DocumentChunk.embedding))
+        if cursor:
+            stmt = stmt.where(tuple_(DocumentChunk.created_at, DocumentChunk.id) < cursor)
+        
+        stmt = stmt.order_by(
+            DocumentChunk.created_at.desc(),
+            DocumentChunk.id.desc()
+        ).limit(limit)
+        chunks = db.execute(stmt).scalars().all()
+        
+        next_cursor = None
+        if len(chunks) == limit:
+            next_cursor = (chunks[-1].created_at, chunks[-1].id)
+        
+        return chunks, next_cursor
+
+
+class EmbeddingCacheCRUD:
+    """
+    CRUD operations for the content-hash -> embedding cache
+    """
+    
+    @staticmethod
+    def get_many(
+        db: Session,
+        content_hashes: List[str],
+        model: str,
+        provider: str = "openai"
+    ) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings for many content hashes in one query
+        
+        Args:
+            db: Database session
+            content_hashes: SHA-256 hex digests of chunk texts
+            model: Embedding model name
+            provider: Embedding provider
             
         Returns:
-            List of DocumentChunk objects
+            Dictionary mapping content hash to embedding (hits only)
         """
-        return db.query(DocumentChunk).order_by(
-            DocumentChunk.created_at.desc()
-        ).offset(skip).limit(limit).all()
\ No newline at end of file
+        if not content_hashes:
+            return {}
+        
+        stmt = select(EmbeddingCache.content_hash, EmbeddingCache.embedding).where(
+            EmbeddingCache.content_hash.in_(content_hashes),
+            EmbeddingCache.provider == provider,
+            EmbeddingCache.model == model
+        )
+        return {content_hash: embedding.to_numpy() for content_hash, embedding in db.execute(stmt)}
+    
+    @staticmethod
+    def put_many(
+        db: Session,
+        embeddings: Dict[str, List[float]],
+        model: str,
+        provider: str = "openai"
+    ) -> None:
+        """
+        Store embeddings, ignoring hashes that are already cached
+        
+        Args:
+            db: Database session
+            embeddings: Dictionary mapping content hash to embedding
+            model: Embedding model name
+            provider: Embedding provider
+        """
+        if not embeddings:
+            return
+        
+        try:
+            rows = [
+                {
+                    "content_hash": content_hash,
+                    "provider": provider,
+                    "model": model,
+                    "embedding": _to_halfvec(embedding)
+                }
+                for content_hash, embedding in embeddings.items()
+            ]
+            db.execute(pg_insert(EmbeddingCache).on_conflict_do_nothing(), rows)
+            db.commit()
+            logger.info(f"Cached {len(rows)} embeddings")
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to cache embeddings: {str(e)}")
+            raise
+
+
+class CorpusStateCRUD:
+    """
+    CRUD operations for the single-row corpus_state table
+    """
+    
+    @staticmethod
+    def get(db: Session) -> Optional[CorpusState]:
+        """
+        Read the corpus totals and version
+        
+        Args:
+            db: Database session
+            
+        Returns:
+            CorpusState row or None if the table hasn't been seeded
+        """
+        return db.get(CorpusState, 1)
+    
+    @staticmethod
+    async def get_async(db: AsyncSession) -> Optional[CorpusState]:
+        """
+        Async variant of get
+        
+        Args:
+            db: Async database session
+            
+        Returns:
+            CorpusState row or None if the table hasn't been seeded
+        """
+        return await db.get(CorpusState, 1)
+    
+    @staticmethod
+    def _delta_stmt(documents: int, chunks: int, indexed_chunks: int):
+        """
+        Build the UPDATE applying count deltas and bumping the version
+        
+        A single row update (no counting), so it can join the transaction
+        of the document change it accounts for.
+        """
+        return (
+            update(CorpusState)
+            .where(CorpusState.id == 1)
+            .values(
+                version=CorpusState.version + 1,
+                document_count=CorpusState.document_count + documents,
+                chunk_count=CorpusState.chunk_count + chunks,
+                indexed_chunk_count=CorpusState.indexed_chunk_count + indexed_chunks,
+                updated_at=func.now()
+            )
+        )
+    
+    @staticmethod
+    def apply_delta(
+        db: Session,
+        documents: int = 0,
+        chunks: int = 0,
+        indexed_chunks: int = 0
+    ) -> None:
+        """
+        Adjust the corpus totals and bump the version
+        
+        Args:
+            db: Database session (committed here)
+            documents: Change in completed documents
+            chunks: Change in chunks of completed documents
+            indexed_chunks: Change in those chunks with embeddings
+        """
+        try:
+            db.execute(CorpusStateCRUD._delta_stmt(documents, chunks, indexed_chunks))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to update corpus state: {str(e)}")
+            raise
@@ -1,12 +1,22 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index, Computed
+from sqlalchemy.orm import relationship, declarative_base, column_property, deferred
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC
 from datetime import datetime
 
 Base = declarative_base()
 
 
+def _isoformat(value):
+    """ISO-8601 string for a datetime, passing None through"""
+    return value.isoformat() if value is not None else None
+
+
+def _identity(value):
+    return value
+
+
 class Document(Base):
     """
     SQLAlchemy model for documents table
@@ -39,11 +49,26 @@ class Document(Base):
     # Relationships
     chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
     
+    # Fetch server-generated columns (uploaded_at, updated_at) via RETURNING
+    # on INSERT/UPDATE rather than a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True}
+    
+    __table_args__ = (
+        # Backs get_all_documents: filter by status, newest first
+        Index('idx_doc_status_uploaded', 'processing_status', uploaded_at.desc()),
+    )
+    
     def __repr__(self):
         return f"<Document(document_id='{self.document_id}', filename='{self.filename}', status='{self.processing_status}')>"
     
-    def to_dict(self):
-        """Convert model to dictionary"""
+    def to_dict(self, iso_dates=True):
+        """
+        Convert model to dictionary
+        
+        Pass iso_dates=False to keep datetime objects for serializers that
+        encode them natively (e.g. orjson).
+        """
+        iso = _isoformat if iso_dates else _identity
         return {
             "id": self.id,
             "document_id": self.document_id,
@@ -58,9 +83,9 @@ class Document(Base):
             "chunk_count": self.chunk_count,
             "processing_status": self.processing_status,
             "error_message": self.error_message,
-            "uploaded_at": self.uploaded_at.isoformat() if self.uploaded_at else None,
-            "processed_at": self.processed_at.isoformat() if self.processed_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            "uploaded_at": iso(self.uploaded_at),
+            "processed_at": iso(self.processed_at),
+            "updated_at": iso(self.updated_at)
         }
 
 
@@ -81,8 +106,18 @@ class DocumentChunk(Base):
     # Chunk metadata
     chunk_size = Column(Integer, nullable=False)
     
-    # Vector embedding (1536 dimensions for OpenAI text-embedding-3-small)
-    embedding = Column(Vector(1536))
+    # Vector embedding (1536 dimensions for OpenAI text-embedding-3-small),
+    # stored as half precision to halve disk and index bandwidth
+    embedding = Column(HALFVEC(1536))
+    
+    # Full-text search vector maintained by Postgres (deferred: only used in SQL)
+    chunk_tsv = deferred(Column(
+        TSVECTOR,
+        Computed("to_tsvector('english', chunk_text)", persisted=True)
+    ))
+    
+    # Lets callers check for an embedding without loading the vector itself
+    has_embedding = column_property(embedding.isnot(None))
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -90,16 +125,34 @@ class DocumentChunk(Base):
     # Relationships
     document = relationship("Document", back_populates="chunks")
     
-    # Unique constraint for document_id + chunk_index
+    __mapper_args__ = {"eager_defaults": True}
+    
     __table_args__ = (
+        # Unique constraint for document_id + chunk_index
         Index('idx_document_chunk_unique', 'document_id', 'chunk_index', unique=True),
+        # HNSW index for approximate nearest neighbour search on embeddings.
+        # Embeddings are stored L2-normalized, so inner product == cosine.
+        Index(
+            'idx_chunk_embedding_hnsw_ip',
+            'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'halfvec_ip_ops'}
+        ),
+        # Per-document chunk listing, newest first
+        Index('idx_chunk_doc_created', 'document_id', created_at.desc()),
+        # Partial index backing count_chunks_with_embeddings
+        Index('idx_chunk_has_embedding', 'id', postgresql_where=embedding.isnot(None)),
+        # Inverted index for keyword search
+        Index('idx_chunk_tsv', 'chunk_tsv', postgresql_using='gin'),
     )
     
     def __repr__(self):
         return f"<DocumentChunk(chunk_id='{self.chunk_id}', document_id='{self.document_id}', index={self.chunk_index})>"
     
-    def to_dict(self, include_embedding=False):
-        """Convert model to dictionary"""
+    def to_dict(self, include_embedding=False, iso_dates=True):
+        """Convert model to dictionary (see Document.to_dict for iso_dates)"""
+        iso = _isoformat if iso_dates else _identity
         result = {
             "id": self.id,
             "chunk_id": self.chunk_id,
@@ -107,10 +160,54 @@ class DocumentChunk(Base):
             "chunk_text": self.chunk_text,
             "chunk_index": self.chunk_index,
             "chunk_size": self.chunk_size,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": iso(self.created_at)
         }
         
-        if include_embedding and self.embedding:
-            result["embedding"] = self.embedding
+        if include_embedding and self.embedding is not None:
+            result["embedding"] = self.embedding.to_list()
         
-        return result
\ No newline at end of file
+        return result
+
+
+class EmbeddingCache(Base):
+    """
+    SQLAlchemy model for embedding_cache table
+    
+    Content-addressed embeddings (SHA-256 of the chunk text) so identical
+    chunks across uploads and re-uploads are never embedded twice.
+    """
+    __tablename__ = "embedding_cache"
+    
+    content_hash = Column(String(64), primary_key=True)
+    provider = Column(String(32), primary_key=True)
+    model = Column(String(100), primary_key=True)
+    
+    # Same storage format as DocumentChunk.embedding (L2-normalized halfvec)
+    embedding = Column(HALFVEC(1536), nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<EmbeddingCache(content_hash='{self.content_hash}', model='{self.model}')>"
+
+
+class CorpusState(Base):
+    """
+    SQLAlchemy model for corpus_state table
+    
+    A single row (id = 1) of totals over completed documents, adjusted by
+    deltas in the same transaction that completes or deletes a document, so
+    health checks read them instead of counting, plus a version bumped on
+    every change so any process can tell the document set has changed.
+    """
+    __tablename__ = "corpus_state"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    document_count = Column(Integer, nullable=False, default=0)
+    chunk_count = Column(Integer, nullable=False, default=0)
+    indexed_chunk_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<CorpusState(version={self.version}, documents={self.document_count})>"
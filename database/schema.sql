@@ -52,8 +52,12 @@ CREATE TABLE document_chunks (
     -- Chunk metadata
     chunk_size INTEGER NOT NULL,
     
-    -- Vector embedding (1536 dimensions for OpenAI text-embedding-3-small)
-    embedding vector(1536),
+    -- Vector embedding (1536 dimensions for OpenAI text-embedding-3-small),
+    -- stored as half precision (pgvector 0.7+)
+    embedding halfvec(1536),
+    
+    -- Full-text search vector for keyword search
+    chunk_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', chunk_text)) STORED,
     
     -- Timestamps
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -68,19 +72,46 @@ CREATE TABLE document_chunks (
     CONSTRAINT unique_document_chunk UNIQUE (document_id, chunk_index)
 );
 
+-- Embedding cache: content-addressed embeddings reused across uploads
+CREATE TABLE embedding_cache (
+    content_hash VARCHAR(64) NOT NULL,
+    provider VARCHAR(32) NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    embedding halfvec(1536) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash, provider, model)
+);
+
+-- Totals over completed documents and a change version (single row, id = 1),
+-- adjusted when documents finish processing or are deleted
+CREATE TABLE corpus_state (
+    id INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    document_count INTEGER NOT NULL DEFAULT 0,
+    chunk_count INTEGER NOT NULL DEFAULT 0,
+    indexed_chunk_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO corpus_state (id) VALUES (1);
+
 -- Create indexes for better query performance
 CREATE INDEX idx_documents_document_id ON documents(document_id);
 CREATE INDEX idx_documents_status ON documents(processing_status);
 CREATE INDEX idx_documents_uploaded_at ON documents(uploaded_at);
 CREATE INDEX idx_documents_file_hash ON documents(file_hash);
+CREATE INDEX idx_doc_status_uploaded ON documents(processing_status, uploaded_at DESC);
 
 CREATE INDEX idx_chunks_document_id ON document_chunks(document_id);
 CREATE INDEX idx_chunks_chunk_id ON document_chunks(chunk_id);
+CREATE INDEX idx_chunk_doc_created ON document_chunks(document_id, created_at DESC);
+CREATE INDEX idx_chunk_has_embedding ON document_chunks(id) WHERE embedding IS NOT NULL;
+CREATE INDEX idx_chunk_tsv ON document_chunks USING gin(chunk_tsv);
 
 -- Create HNSW index for vector similarity search
 -- This enables fast nearest neighbor search on embeddings
-CREATE INDEX idx_chunks_embedding ON document_chunks 
-USING hnsw (embedding vector_cosine_ops)
+-- Embeddings are stored L2-normalized, so inner product equals cosine similarity
+CREATE INDEX idx_chunk_embedding_hnsw_ip ON document_chunks 
+USING hnsw (embedding halfvec_ip_ops)
 WITH (m = 16, ef_construction = 64);
 
 -- Create function to update updated_at timestamp
@@ -89,6 +89,7 @@ export interface DocumentUploadResponse {
 export interface DocumentListResponse {
   documents: DocumentMetadata[];
   total_count: number;
+  next_cursor?: string | null;
   timestamp: string;
 }
 
@@ -1,11 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+import os
+import time
+import hashlib
+from functools import lru_cache
+import asyncio
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 import uvicorn
-from config import settings
-from routers import chat_router, documents_router, search_router, rag_router
-from models import HealthResponse, APIStatusResponse
+from config import get_settings
+from routers import chat_router, documents_router, search_router, rag_router, debug_router
+from models import HealthResponse, APIStatusResponse, utc_now
 from database import db_manager
+from services import similarity, openai_service
+from typing import Callable, Dict
 import logging
 
 # Configure logging
@@ -15,11 +25,119 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class _GZipExceptStreamsMiddleware(GZipMiddleware):
+    """
+    GZip middleware that leaves streaming (SSE) endpoints uncompressed
+    
+    The gzip encoder buffers small writes, which would hold back streamed
+    tokens until the buffer fills.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Seconds that /health and /api/v1/status payloads are served from cache
+HEALTH_CACHE_TTL = 5.0
+_health_cache = {"expires": 0.0, "body": None, "etag": None}
+_status_cache = {"expires": 0.0, "body": None, "etag": None}
+
+
+def _cached_response(request: Request, cache: Dict, build: Callable[[], Dict]) -> Response:
+    """
+    Serve a small JSON payload from a TTL cache with ETag revalidation
+    
+    Args:
+        request: Incoming request (checked for If-None-Match)
+        cache: Cache slot holding expiry, encoded body and ETag
+        build: Callable producing a fresh JSON-serializable payload on cache miss
+        
+    Returns:
+        200 response with the cached body, or 304 if the client's ETag matches
+    """
+    now = time.monotonic()
+    if cache["body"] is None or now >= cache["expires"]:
+        body = orjson.dumps(build())
+        cache["body"] = body
+        cache["etag"] = f'"{hashlib.md5(body).hexdigest()}"'
+        cache["expires"] = now + HEALTH_CACHE_TTL
+    
+    headers = {"ETag": cache["etag"], "Cache-Control": f"max-age={int(HEALTH_CACHE_TTL)}"}
+    if request.headers.get("if-none-match") == cache["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=cache["body"], media_type="application/json", headers=headers)
+
+
+@lru_cache(maxsize=1)
+def _openai_status_snapshot() -> Dict:
+    """
+    Snapshot of the OpenAI configuration (settings are immutable at runtime)
+    
+    Returns:
+        Dictionary with configured flag, chat model and embedding model
+    """
+    settings = get_settings()
+    configured = bool(settings.openai_api_key)
+    return {
+        "configured": configured,
+        "model": settings.openai_model if configured else None,
+        "embedding_model": settings.openai_embedding_model if configured else None
+    }
+
+
+# Static payloads built once at import time
+_ROOT_PAYLOAD = {
+    "message": "Welcome to RAG System API",
+    "version": "1.0.0",
+    "documentation": "/docs",
+    "endpoints": {
+        "health": "/health",
+        "status": "/api/v1/status",
+        "chat": "/api/v1/chat",
+        "rag_chat": "/api/v1/rag/chat",
+        "rag_health": "/api/v1/rag/health",
+        "upload_document": "/api/v1/documents/upload",
+        "list_documents": "/api/v1/documents/",
+        "search_semantic": "/api/v1/search/semantic",
+        "search_hybrid": "/api/v1/search/hybrid",
+        "search_stats": "/api/v1/search/stats"
+    }
+}
+if get_settings().environment == "development":
+    _ROOT_PAYLOAD["endpoints"].update({
+        "test_parser": "/api/v1/documents/test/parse-text",
+        "test_chunking": "/api/v1/documents/test/chunking"
+    })
+_ROOT_BODY = orjson.dumps(_ROOT_PAYLOAD)
+
+_STATUS_ENDPOINTS = {
+    "root": "/",
+    "health": "/health",
+    "chat": "/api/v1/chat",
+    "rag_chat": "/api/v1/rag/chat",
+    "rag_health": "/api/v1/rag/health",
+    "test_openai": "/api/v1/chat/test",
+    "upload_document": "/api/v1/documents/upload",
+    "list_documents": "/api/v1/documents/",
+    "search_semantic": "/api/v1/search/semantic",
+    "search_keyword": "/api/v1/search/keyword",
+    "search_hybrid": "/api/v1/search/hybrid",
+    "search_context": "/api/v1/search/context",
+    "search_stats": "/api/v1/search/stats",
+    "docs": "/docs",
+    "openapi": "/openapi.json"
+}
+
+
 # Create FastAPI application
 app = FastAPI(
     title="RAG System API",
     description="A Retrieval-Augmented Generation system for document Q&A",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -31,94 +149,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON payloads (document lists, search results); level 5 keeps CPU cost low
+app.add_middleware(_GZipExceptStreamsMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(chat_router)
 app.include_router(documents_router)
 app.include_router(search_router)
 app.include_router(rag_router)
 
+# Parser/chunker diagnostics are development-only
+if get_settings().environment == "development":
+    app.include_router(debug_router)
+
 
 @app.get("/")
 async def root():
     """
     Root endpoint - Welcome message
     """
-    return {
-        "message": "Welcome to RAG System API",
-        "version": "1.0.0",
-        "documentation": "/docs",
-        "endpoints": {
-            "health": "/health",
-            "status": "/api/v1/status",
-            "chat": "/api/v1/chat",
-            "rag_chat": "/api/v1/rag/chat",
-            "rag_health": "/api/v1/rag/health",
-            "upload_document": "/api/v1/documents/upload",
-            "list_documents": "/api/v1/documents/",
-            "search_semantic": "/api/v1/search/semantic",
-            "search_hybrid": "/api/v1/search/hybrid",
-            "search_stats": "/api/v1/search/stats",
-            "test_parser": "/api/v1/documents/test/parse-text",
-            "test_chunking": "/api/v1/documents/test/chunking"
-        }
-    }
+    # Static payload, encoded once at import time
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
-@app.get("/health", response_model=HealthResponse)
-async def health_check():
-    """
-    Health check endpoint to verify the API is running
+def _build_health() -> Dict:
     """
-    # Check if OpenAI API key is configured
-    openai_configured = bool(settings.openai_api_key)
+    Build a fresh health payload (hits the database)
     
+    Returned as a plain dict matching HealthResponse; the shape is trusted,
+    so Pydantic validation is skipped.
+    """
     # Check database connection
     db_connected = db_manager.test_connection()
     
-    return HealthResponse(
-        status="healthy" if db_connected else "degraded",
-        timestamp=datetime.utcnow(),
-        service="RAG System API",
-        openai_configured=openai_configured
-    )
+    return {
+        "status": "healthy" if db_connected else "degraded",
+        "timestamp": utc_now(),
+        "service": "RAG System API",
+        "openai_configured": _openai_status_snapshot()["configured"]
+    }
 
 
-@app.get("/api/v1/status", response_model=APIStatusResponse)
-async def api_status():
+@app.get("/health", responses={200: {"model": HealthResponse}})
+async def health_check(request: Request):
     """
-    API status endpoint with detailed information
+    Health check endpoint to verify the API is running
+    
+    Cached for HEALTH_CACHE_TTL seconds and revalidated via ETag.
+    """
+    return _cached_response(request, _health_cache, _build_health)
+
+
+def _build_status() -> Dict:
+    """
+    Build a fresh API status payload (matches APIStatusResponse)
+    
+    Only the timestamp is dynamic; endpoints and OpenAI status are shared.
     """
-    # Check OpenAI configuration
-    openai_configured = bool(settings.openai_api_key)
-    openai_status = {
-        "configured": openai_configured,
-        "model": settings.openai_model if openai_configured else None,
-        "embedding_model": settings.openai_embedding_model if openai_configured else None
+    return {
+        "api_version": "1.0.0",
+        "status": "operational",
+        "timestamp": utc_now(),
+        "endpoints": _STATUS_ENDPOINTS,
+        "openai_status": _openai_status_snapshot()
     }
+
+
+@app.get("/api/v1/status", responses={200: {"model": APIStatusResponse}})
+async def api_status(request: Request):
+    """
+    API status endpoint with detailed information
     
-    return APIStatusResponse(
-        api_version="1.0.0",
-        status="operational",
-        timestamp=datetime.utcnow(),
-        endpoints={
-            "root": "/",
-            "health": "/health",
-            "chat": "/api/v1/chat",
-            "rag_chat": "/api/v1/rag/chat",
-            "rag_health": "/api/v1/rag/health",
-            "test_openai": "/api/v1/chat/test",
-            "upload_document": "/api/v1/documents/upload",
-            "list_documents": "/api/v1/documents/",
-            "search_semantic": "/api/v1/search/semantic",
-            "search_keyword": "/api/v1/search/keyword",
-            "search_hybrid": "/api/v1/search/hybrid",
-            "search_context": "/api/v1/search/context",
-            "search_stats": "/api/v1/search/stats",
-            "docs": "/docs",
-            "openapi": "/openapi.json"
-        },
-        openai_status=openai_status
-    )
+    Cached for HEALTH_CACHE_TTL seconds and revalidated via ETag.
+    """
+    return _cached_response(request, _status_cache, _build_status)
 
 
 @app.on_event("startup")
@@ -126,24 +230,41 @@ async def startup_event():
     """
     Run on application startup
     """
+    settings = get_settings()
     logger.info("=" * 50)
     logger.info("RAG System API Starting...")
     logger.info(f"Environment: {settings.environment}")
-    logger.info(f"OpenAI Configured: {bool(settings.openai_api_key)}")
+    logger.info(f"OpenAI Configured: {_openai_status_snapshot()['configured']}")
     logger.info(f"OpenAI Model: {settings.openai_model}")
     logger.info("=" * 50)
     
+    # Size the default executor used by asyncio.to_thread (parsers, blocking I/O)
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)))
+    
+    # Compile the semantic cache similarity kernel (if numba is installed)
+    # so the first cache lookup doesn't pay the JIT cost
+    try:
+        await asyncio.to_thread(similarity.warmup, settings.embedding_dimension)
+    except Exception as e:
+        logger.error(f"✗ Failed to compile similarity kernel: {str(e)}")
+    
+    # Establish the OpenAI connection before the first search needs it
+    await openai_service.warmup()
+    
     # Test database connection
     logger.info("Testing database connection...")
     if db_manager.test_connection():
         logger.info("✓ Database connection successful")
         
-        # Create tables if they don't exist
-        try:
-            db_manager.create_tables()
-            logger.info("✓ Database tables verified/created")
-        except Exception as e:
-            logger.error(f"✗ Failed to create tables: {str(e)}")
+        # Create tables if they don't exist (skipped when the launcher has
+        # already migrated once for all workers)
+        if settings.db_migrate_on_startup:
+            try:
+                db_manager.create_tables()
+                logger.info("✓ Database tables verified/created")
+            except Exception as e:
+                logger.error(f"✗ Failed to create tables: {str(e)}")
     else:
         logger.error("✗ Database connection failed")
     
@@ -160,16 +281,34 @@ async def shutdown_event():
     # Close database connection
     try:
         db_manager.close()
+        await db_manager.close_async()
         logger.info("✓ Database connection closed")
     except Exception as e:
         logger.error(f"✗ Error closing database: {str(e)}")
+    
+    await openai_service.close()
 
 
 if __name__ == "__main__":
-    # Run the application
+    # Auto-reload only in development; it forces a single worker process
+    reload = get_settings().environment == "development"
+    
+    # Migrate once here rather than in every worker's startup
+    if get_settings().db_migrate_on_startup:
+        try:
+            db_manager.create_tables()
+            logger.info("✓ Database tables verified/created")
+            os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+        except Exception as e:
+            logger.error(f"✗ Failed to create tables: {str(e)}")
+    
+    # Run the application on uvloop + httptools (installed via uvicorn[standard])
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
-    )
\ No newline at end of file
+        reload=reload,
+        loop="uvloop",
+        http="httptools",
+        workers=1 if reload else int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    )
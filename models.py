@@ -1,6 +1,13 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
+
+
+def utc_now() -> datetime:
+    """
+    Timezone-aware UTC timestamp (replaces the deprecated datetime.utcnow)
+    """
+    return datetime.now(timezone.utc)
 
 
 class ChatMessage(BaseModel):
@@ -51,7 +58,7 @@ class ChatResponse(BaseModel):
     message_count: int = Field(..., description="Number of messages in conversation")
     tokens_used: Optional[int] = Field(None, description="Total tokens used in the request")
     model: str = Field(..., description="Model used for generation")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Response timestamp")
+    timestamp: datetime = Field(default_factory=utc_now, description="Response timestamp")
 
     class Config:
         json_schema_extra = {
@@ -72,7 +79,7 @@ class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error type")
     message: str = Field(..., description="Error message")
     detail: Optional[str] = Field(None, description="Detailed error information")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Error timestamp")
+    timestamp: datetime = Field(default_factory=utc_now, description="Error timestamp")
 
     class Config:
         json_schema_extra = {
@@ -119,7 +126,7 @@ class DocumentMetadata(BaseModel):
     word_count: Optional[int] = None
     page_count: Optional[int] = None
     chunk_count: Optional[int] = None
-    uploaded_at: datetime = Field(default_factory=datetime.utcnow)
+    uploaded_at: datetime = Field(default_factory=utc_now)
 
 
 class DocumentUploadResponse(BaseModel):
@@ -134,7 +141,7 @@ class DocumentUploadResponse(BaseModel):
     file_hash: str
     chunks_created: int
     metadata: DocumentMetadata
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
 
     class Config:
         json_schema_extra = {
@@ -177,4 +184,5 @@ class DocumentListResponse(BaseModel):
     """
     documents: List[DocumentMetadata]
     total_count: int
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if any")
+    timestamp: datetime = Field(default_factory=utc_now)
\ No newline at end of file
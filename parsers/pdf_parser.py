@@ -1,18 +1,49 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List
 import PyPDF2
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
 from PIL import Image
 import logging
 
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover - PyPDF2 fallback is used instead
+    fitz = None
+
 logger = logging.getLogger(__name__)
 
 
+def _ocr_page(file_path: str, page_number: int) -> str:
+    """
+    Render and OCR a single page (module-level so it can run in a worker process)
+    
+    Each worker rasterizes its own page, so rendering overlaps with OCR on
+    other pages, page images are never pickled between processes, and only
+    one high-DPI image per worker is alive at a time.
+    
+    Args:
+        file_path: Path to the PDF file
+        page_number: 1-based page number
+        
+    Returns:
+        Extracted text for the page
+    """
+    images = convert_from_path(file_path, dpi=300, first_page=page_number, last_page=page_number)
+    return pytesseract.image_to_string(images[0], lang='eng') if images else ""
+
+
 class PDFParser:
     """
     Parser for PDF files with OCR support
     """
+    
+    # Below this many extracted characters per page the PDF is treated as
+    # scanned (no usable text layer) and OCR is attempted
+    MIN_CHARS_PER_PAGE = 100
 
     def __init__(self):
         """
@@ -39,13 +70,32 @@ class PDFParser:
         return text
     
     
-    async def parse(self, file_path: Path, use_ocr: bool = True) -> Dict:
+    def needs_ocr(self, content: str, metadata: Dict) -> bool:
+        """
+        Decide whether a PDF's text layer is too sparse to be born-digital
+        
+        Args:
+            content: Text extracted from the text layer
+            metadata: Extraction metadata (uses page_count)
+            
+        Returns:
+            True if the document looks scanned and should be OCR'd
+        """
+        page_count = metadata.get("page_count") or 1
+        return len(content.strip()) < self.MIN_CHARS_PER_PAGE * page_count
+    
+    
+    async def parse(self, file_path: Path, use_ocr: bool = True, force_ocr: bool = False) -> Dict:
         """
         Parse a PDF file and extract its content
         
+        The text layer is always extracted first (fast); OCR only runs when it
+        is too sparse to be a born-digital PDF, or when force_ocr is set.
+        
         Args:
             file_path: Path to the PDF file
             use_ocr: Whether to use OCR for image-based PDFs
+            force_ocr: OCR regardless of the text layer
             
         Returns:
             Dictionary containing parsed text and metadata
@@ -53,14 +103,15 @@ class PDFParser:
         try:
             logger.info(f"Parsing PDF file: {file_path}")
             
-            # Try text extraction first
-            content, metadata = self._extract_text(file_path)
+            # Try text extraction first (blocking, so run it off the event loop)
+            content, metadata = await asyncio.to_thread(self._extract_text, file_path)
             
-            # If no text found and OCR is enabled, try OCR
-            if use_ocr and (not content or len(content.strip()) < 100):
-                logger.info("Text extraction yielded minimal content, attempting OCR...")
-                ocr_content = self._extract_text_with_ocr(file_path)
-                if len(ocr_content) > len(content):
+            # If the text layer is sparse and OCR is enabled (or forced), try OCR
+            if force_ocr or (use_ocr and self.needs_ocr(content, metadata)):
+                logger.info("Text layer is sparse or OCR was forced, attempting OCR...")
+                ocr_content = await asyncio.to_thread(self._extract_text_with_ocr, file_path)
+                # An empty OCR result (e.g. OCR failed) never replaces the text layer
+                if ocr_content.strip() and (force_ocr or len(ocr_content) > len(content)):
                     content = ocr_content
                     metadata["extraction_method"] = "ocr"
                 else:
@@ -92,6 +143,72 @@ class PDFParser:
     
     
     def _extract_text(self, file_path: Path) -> tuple:
+        """
+        Extract text from PDF, preferring PyMuPDF and falling back to PyPDF2
+        
+        Args:
+            file_path: Path to PDF file
+            
+        Returns:
+            Tuple of (text_content, metadata)
+        """
+        if fitz is not None:
+            try:
+                return self._extract_text_pymupdf(file_path)
+            except Exception as e:
+                logger.warning(f"PyMuPDF extraction failed, falling back to PyPDF2: {str(e)}")
+        
+        return self._extract_text_pypdf2(file_path)
+    
+    
+    def _extract_text_pymupdf(self, file_path: Path) -> tuple:
+        """
+        Extract text from PDF using PyMuPDF, streaming one page at a time
+        
+        Args:
+            file_path: Path to PDF file
+            
+        Returns:
+            Tuple of (text_content, metadata)
+        """
+        text_content = []
+        
+        with fitz.open(file_path) as doc:
+            page_count = doc.page_count
+            
+            # Extract text from each page
+            for page_num, page in enumerate(doc):
+                try:
+                    text = page.get_text("text")
+                    if text:
+                        text_content.append(text)
+                except Exception as e:
+                    logger.warning(f"Error extracting text from page {page_num + 1}: {str(e)}")
+            
+            pdf_info = doc.metadata or {}
+        
+        # Get metadata
+        metadata = {
+            "filename": file_path.name,
+            "file_type": "pdf",
+            "extension": ".pdf",
+            "page_count": page_count,
+            "has_content": bool(text_content)
+        }
+        
+        # Add PDF info if available
+        for key in ("title", "author", "subject"):
+            if pdf_info.get(key):
+                metadata[key] = pdf_info[key]
+        
+        full_text = "\n\n".join(text_content)
+        metadata["character_count"] = len(full_text)
+        metadata["word_count"] = len(full_text.split())
+        
+        return full_text, metadata
+    
+    
+    def _extract_text_pypdf2(self, file_path: Path) -> tuple:
         """
         Extract text from PDF using PyPDF2
         
@@ -159,16 +276,19 @@ class PDFParser:
         try:
             logger.info("Starting OCR extraction...")
             
-            # Convert PDF to images
-            images = convert_from_path(str(file_path), dpi=300)
+            workers = os.cpu_count() or 1
+            page_count = pdfinfo_from_path(str(file_path))["Pages"]
+            
+            # Render + OCR pages in parallel worker processes, preserving page order
+            logger.info(f"Processing {page_count} pages with OCR using {workers} workers")
+            with ProcessPoolExecutor(max_workers=min(workers, page_count) or 1) as executor:
+                texts = list(executor.map(
+                    _ocr_page,
+                    [str(file_path)] * page_count,
+                    range(1, page_count + 1)
+                ))
             
-            # Perform OCR on each page
-            text_content = []
-            for i, image in enumerate(images):
-                logger.info(f"Processing page {i + 1}/{len(images)} with OCR")
-                text = pytesseract.image_to_string(image, lang='eng')
-                if text:
-                    text_content.append(text)
+            text_content = [text for text in texts if text]
             
             full_text = "\n\n".join(text_content)
             logger.info(f"OCR extraction complete: {len(full_text)} characters")
@@ -191,11 +311,17 @@ class PDFParser:
         Returns:
             List of parsed results
         """
-        results = []
-        for file_path in file_paths:
-            result = await self.parse(file_path, use_ocr)
-            results.append(result)
-        return results
+        results = await asyncio.gather(
+            *(self.parse(file_path, use_ocr) for file_path in file_paths),
+            return_exceptions=True
+        )
+        
+        # Normalize unexpected exceptions into the standard error result
+        return [
+            {"content": "", "metadata": {}, "success": False, "error": str(result)}
+            if isinstance(result, BaseException) else result
+            for result in results
+        ]
 
 
 # Create singleton instance
@@ -1,10 +1,14 @@
+import asyncio
+import re
 from pathlib import Path
 from typing import Dict, List
-import aiofiles
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Matches one whitespace-delimited word (same semantics as str.split())
+_WORD_RE = re.compile(r'\S+')
+
 
 class TextParser:
     """
@@ -41,9 +45,8 @@ class TextParser:
         try:
             logger.info(f"Parsing text file: {file_path}")
             
-            # Read file content
-            async with aiofiles.open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = await f.read()
+            # Read file content in a single read on a worker thread
+            content = await asyncio.to_thread(file_path.read_text, encoding='utf-8', errors='ignore')
 
             # Sanitize text to remove problematic characters
             content = self._sanitize_text(content)
@@ -82,16 +85,17 @@ class TextParser:
         Returns:
             Dictionary with metadata
         """
-        lines = content.split('\n')
-        words = content.split()
+        # Count without materializing line/word lists
+        line_count = content.count('\n') + 1
+        word_count = sum(1 for _ in _WORD_RE.finditer(content))
         
         return {
             "filename": file_path.name,
             "file_type": "text",
             "extension": file_path.suffix.lower(),
             "character_count": len(content),
-            "word_count": len(words),
-            "line_count": len(lines),
+            "word_count": word_count,
+            "line_count": line_count,
             "has_content": bool(content.strip())
         }
     
@@ -106,11 +110,17 @@ class TextParser:
         Returns:
             List of parsed results
         """
-        results = []
-        for file_path in file_paths:
-            result = await self.parse(file_path)
-            results.append(result)
-        return results
+        results = await asyncio.gather(
+            *(self.parse(file_path) for file_path in file_paths),
+            return_exceptions=True
+        )
+        
+        # Normalize unexpected exceptions into the standard error result
+        return [
+            {"content": "", "metadata": {}, "success": False, "error": str(result)}
+            if isinstance(result, BaseException) else result
+            for result in results
+        ]
 
 
 # Create singleton instance
@@ -2,5 +2,6 @@ from .chat import router as chat_router
 from .documents import router as documents_router
 from .search import router as search_router
 from .rag import router as rag_router
+from .debug import router as debug_router
 
-__all__ = ["chat_router", "documents_router", "search_router", "rag_router"]
\ No newline at end of file
+__all__ = ["chat_router", "documents_router", "search_router", "rag_router", "debug_router"]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, status  # pyright: ignore[reportMissingImports]
+from fastapi.responses import ORJSONResponse
 from typing import List, Dict
 from models import ChatRequest, ChatResponse, ErrorResponse
 from services import openai_service
@@ -8,10 +9,14 @@ import logging
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# System prompt shared by every chat request
+SYSTEM_PROMPT = "You are a helpful AI assistant. Provide clear, accurate, and helpful responses."
+
 # Create router
 router = APIRouter(
     prefix="/api/v1/chat",
     tags=["Chat"],
+    default_response_class=ORJSONResponse,
     responses={
         500: {"model": ErrorResponse, "description": "Internal server error"},
         400: {"model": ErrorResponse, "description": "Bad request"}
@@ -19,7 +24,11 @@ router = APIRouter(
 )
 
 
-@router.post("", response_model=ChatResponse, status_code=status.HTTP_200_OK)
+@router.post(
+    "",
+    status_code=status.HTTP_200_OK,
+    responses={200: {"model": ChatResponse}}
+)
 async def chat(request: ChatRequest):
     """
     Chat with the AI assistant
@@ -41,33 +50,23 @@ async def chat(request: ChatRequest):
     - timestamp: Response timestamp
     """
     try:
-        # Build messages list for OpenAI API
-        messages: List[Dict[str, str]] = []
-        
-        # Add system message
-        messages.append({
-            "role": "system",
-            "content": "You are a helpful AI assistant. Provide clear, accurate, and helpful responses."
-        })
-        
-        # Add conversation history if provided
-        if request.conversation_history:
-            for msg in request.conversation_history:
-                messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
-        
-        # Add the current user message
-        messages.append({
-            "role": "user",
-            "content": request.message
-        })
+        # Build messages list for OpenAI API: system prompt, history, user message.
+        # ChatMessage only has role/content, so its validated __dict__ is already
+        # the shape OpenAI expects.
+        history: List[Dict[str, str]] = (
+            [msg.__dict__ for msg in request.conversation_history]
+            if request.conversation_history else []
+        )
+        messages: List[Dict[str, str]] = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *history,
+            {"role": "user", "content": request.message}
+        ]
         
-        logger.info(f"Processing chat request with {len(messages)} messages")
+        logger.info("Processing chat request with %s messages", len(messages))
         
         # Get response from OpenAI
-        result = openai_service.chat_completion(
+        result = await openai_service.chat_completion(
             messages=messages,
             temperature=request.temperature,
             max_tokens=request.max_tokens
@@ -82,7 +81,9 @@ async def chat(request: ChatRequest):
         )
         
         logger.info("Chat request processed successfully")
-        return response
+        
+        # Return the already-validated model directly, skipping response_model re-validation
+        return ORJSONResponse(response.model_dump(mode="json"))
         
     except OpenAIError as e:
         logger.error(f"OpenAI API error: {str(e)}")
@@ -118,7 +119,7 @@ async def test_openai_connection():
     - model: Configured model name
     """
     try:
-        is_connected = openai_service.test_connection()
+        is_connected = await openai_service.test_connection()
         
         if is_connected:
             return {
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, HTTPException, status
+from pathlib import Path
+
+from models import ErrorResponse
+from utils import text_chunker
+from parsers import text_parser
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Development-only diagnostics; main.py includes this router only when
+# ENVIRONMENT=development, so these routes do not exist in production
+router = APIRouter(
+    prefix="/api/v1/documents",
+    tags=["Debug"],
+    responses={
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+
+
+@router.get("/test/parse-text")
+async def test_text_parser():
+    """
+    Test endpoint for text parser
+    
+    This endpoint tests the text parsing functionality with sample content.
+    """
+    try:
+        # Create a temporary test file
+        test_content = """This is a test document.
+        
+        It has multiple paragraphs to test the parsing functionality.
+
+        This is the third paragraph with some more content to make it interesting.
+        The parser should handle this correctly and extract all the text.
+        """
+
+        # Create temporary file
+        import tempfile
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            f.write(test_content)
+            temp_path = Path(f.name)
+        
+        # Parse the file
+        result = await text_parser.parse(temp_path)
+        
+        # Clean up
+        temp_path.unlink()
+        
+        return {
+            "success": result["success"],
+            "content_length": len(result["content"]),
+            "metadata": result["metadata"],
+            "sample_content": result["content"][:200]
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Test failed: {str(e)}"
+        )
+
+
+@router.get("/test/chunking")
+async def test_chunking():
+    """
+    Test endpoint for text chunking
+    
+    This endpoint demonstrates how text is split into chunks.
+    """
+    try:
+        # Sample text
+        sample_text = """
+        Artificial Intelligence (AI) is transforming how we live and work. 
+        Machine learning, a subset of AI, enables computers to learn from data without explicit programming.
+        
+        Deep learning, using neural networks, has revolutionized fields like computer vision and natural language processing.
+        These technologies power applications from voice assistants to autonomous vehicles.
+        
+        As AI continues to advance, it raises important questions about ethics, privacy, and the future of work.
+        Responsible development and deployment of AI systems is crucial for ensuring beneficial outcomes for society.
+        """ * 3  # Repeat to make it longer
+        
+        # Chunk the text
+        chunks = text_chunker.chunk_text(sample_text, preserve_paragraphs=True)
+        
+        return {
+            "success": True,
+            "original_length": len(sample_text),
+            "chunk_count": len(chunks),
+            "chunk_size": text_chunker.chunk_size,
+            "chunk_overlap": text_chunker.chunk_overlap,
+            "chunks": [
+                {
+                    "index": i,
+                    "length": len(chunk),
+                    "preview": chunk[:100] + "..." if len(chunk) > 100 else chunk
+                }
+                for i, chunk in enumerate(chunks)
+            ]
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Test failed: {str(e)}"
+        )
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends, BackgroundTasks, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple
 from pathlib import Path
+import asyncio
+import base64
+import orjson
 import uuid
 from datetime import datetime
 
@@ -9,14 +13,12 @@ from models import (
     DocumentUploadResponse,
     DocumentMetadata,
     ErrorResponse,
-    ChunkData,
     DocumentListResponse
 )
-from utils import file_handler, text_chunker
-from parsers import text_parser, pdf_parser
-from database import get_db
+from utils import file_handler
+from database import db_manager, get_db
 from database.crud import DocumentCRUD, ChunkCRUD
-from services import background_task_service
+from services import background_task_service, semantic_cache, retrieval_cache, document_metadata_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,6 +27,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api/v1/documents",
     tags=["Documents"],
+    default_response_class=ORJSONResponse,
     responses={
         500: {"model": ErrorResponse, "description": "Internal server error"},
         400: {"model": ErrorResponse, "description": "Bad request"}
@@ -32,10 +35,47 @@ router = APIRouter(
 )
 
 
-@router.post("/upload", response_model=DocumentUploadResponse, status_code=status.HTTP_201_CREATED)
+def _document_metadata(document, **overrides) -> DocumentMetadata:
+    """
+    Build DocumentMetadata from a Document row
+    
+    Uses model_construct: values loaded from the database are already
+    correctly typed, so field validation is skipped (the routes return the
+    serialized payload directly rather than via response_model, which would
+    validate it again).
+    
+    Args:
+        document: Document ORM object
+        **overrides: Field values to use instead of the row's
+        
+    Returns:
+        DocumentMetadata instance
+    """
+    fields = {
+        "document_id": document.document_id,
+        "filename": document.filename,
+        "file_type": document.file_type,
+        "file_size": document.file_size,
+        "file_hash": document.file_hash,
+        "character_count": document.character_count,
+        "word_count": document.word_count,
+        "page_count": document.page_count,
+        "chunk_count": document.chunk_count,
+        "uploaded_at": document.uploaded_at
+    }
+    fields.update(overrides)
+    return DocumentMetadata.model_construct(**fields)
+
+
+@router.post(
+    "/upload",
+    status_code=status.HTTP_201_CREATED,
+    responses={201: {"model": DocumentUploadResponse}}
+)
 async def upload_document(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(..., description="Document file to upload (PDF or TXT)"),
+    force_ocr: bool = Query(False, description="OCR PDFs even if they have a text layer"),
     db: Session = Depends(get_db)
 ):
     """
@@ -47,11 +87,12 @@ async def upload_document(
     **Supported formats:**
     - Text files (.txt)
     - PDF files (.pdf) - with OCR support for scanned documents
+      (OCR only runs when the text layer is sparse, or with `force_ocr=true`)
     
     **Processing steps:**
     1. Validate file type and size
-    2. Check for duplicate (by hash)
-    3. Save file to disk
+    2. Stream to a temp file while hashing
+    3. Check for duplicate (by hash) and move the file into place
     4. Create database record
     5. Process in background:
        - Extract text content
@@ -65,7 +106,7 @@ async def upload_document(
     - Processing status
     """
     try:
-        logger.info(f"Received upload request for file: {file.filename}")
+        logger.info("Received upload request for file: %s", file.filename)
         
         # Step 1: Validate file
         is_valid, error_message = file_handler.validate_file(file)
@@ -75,59 +116,41 @@ async def upload_document(
                 detail=error_message
             )
         
-        # Step 2: Save file to disk
-        file_path, file_hash, file_size = await file_handler.save_file(file)
-        
-        # Step 3: Check for duplicate
-        existing_doc = DocumentCRUD.get_document_by_hash(db, file_hash)
-        if existing_doc:
-            logger.info(f"Duplicate document found: {existing_doc.document_id}")
-            return DocumentUploadResponse(
-                success=True,
-                message="Document already exists (duplicate detected)",
-                document_id=existing_doc.document_id,
-                filename=existing_doc.filename,
-                file_size=existing_doc.file_size,
-                file_hash=existing_doc.file_hash,
-                chunks_created=existing_doc.chunk_count or 0,
-                metadata=DocumentMetadata(
+        # Step 2: Write the upload to a temp file, hashing it in the same pass
+        temp_path, file_hash, file_size = await file_handler.stage_file(file)
+        try:
+            # Step 3: Check for duplicate before the file is moved into place
+            existing_doc = DocumentCRUD.get_document_by_hash(db, file_hash)
+            if existing_doc:
+                logger.info("Duplicate document found: %s", existing_doc.document_id)
+                response = DocumentUploadResponse.model_construct(
+                    success=True,
+                    message="Document already exists (duplicate detected)",
                     document_id=existing_doc.document_id,
                     filename=existing_doc.filename,
-                    file_type=existing_doc.file_type,
                     file_size=existing_doc.file_size,
                     file_hash=existing_doc.file_hash,
-                    character_count=existing_doc.character_count,
-                    word_count=existing_doc.word_count,
-                    page_count=existing_doc.page_count,
-                    chunk_count=existing_doc.chunk_count,
-                    uploaded_at=existing_doc.uploaded_at
+                    chunks_created=existing_doc.chunk_count or 0,
+                    metadata=_document_metadata(existing_doc)
                 )
-            )
-        
-        # Step 4: Parse document to get metadata
-        file_ext = Path(file.filename).suffix.lower()
-        file_type = file_ext[1:]  # Remove the dot
-        
-        if file_ext == '.txt':
-            parse_result = await text_parser.parse(file_path)
-        elif file_ext == '.pdf':
-            parse_result = await pdf_parser.parse(file_path, use_ocr=True)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unsupported file type: {file_ext}"
-            )
+                return ORJSONResponse(
+                    response.model_dump(mode="json"),
+                    status_code=status.HTTP_201_CREATED
+                )
+            
+            file_path = file_handler.commit_staged_file(temp_path, file.filename, file_hash)
+        finally:
+            # Removes the temp file unless it was committed
+            file_handler.discard_staged_file(temp_path)
         
-        if not parse_result["success"]:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to parse document: {parse_result['error']}"
-            )
+        # Parsing (and content metadata) happens in the background task;
+        # the client polls GET /{document_id} for processing_status
+        file_type = file_handler.get_extension(file.filename)[1:]  # Remove the dot
         
         # Generate document ID
         document_id = f"doc_{uuid.uuid4().hex[:12]}"
         
-        # Step 5: Create database record
+        # Step 4: Create database record (content counts filled in after parsing)
         document = DocumentCRUD.create_document(
             db=db,
             document_id=document_id,
@@ -136,37 +159,24 @@ async def upload_document(
             file_size=file_size,
             file_hash=file_hash,
             file_path=str(file_path),
-            character_count=parse_result["metadata"].get("character_count", 0),
-            word_count=parse_result["metadata"].get("word_count", 0),
-            page_count=parse_result["metadata"].get("page_count"),
             processing_status='pending'
         )
         
-        # Step 6: Add background task for processing
+        # Step 5: Add background task for processing
         background_tasks.add_task(
             background_task_service.process_document,
             document_id=document_id,
             file_path=file_path,
             filename=file.filename,
-            file_type=file_type
+            file_type=file_type,
+            force_ocr=force_ocr
         )
         
-        # Step 7: Create metadata response
-        doc_metadata = DocumentMetadata(
-            document_id=document.document_id,
-            filename=document.filename,
-            file_type=document.file_type,
-            file_size=document.file_size,
-            file_hash=document.file_hash,
-            character_count=document.character_count,
-            word_count=document.word_count,
-            page_count=document.page_count,
-            chunk_count=0,  # Will be updated by background task
-            uploaded_at=document.uploaded_at
-        )
+        # Step 6: Create metadata response
+        doc_metadata = _document_metadata(document, chunk_count=0)  # Will be updated by background task
         
-        # Step 8: Create response
-        response = DocumentUploadResponse(
+        # Step 7: Create response
+        response = DocumentUploadResponse.model_construct(
             success=True,
             message="Document uploaded successfully. Processing in background...",
             document_id=document_id,
@@ -177,8 +187,11 @@ async def upload_document(
             metadata=doc_metadata
         )
         
-        logger.info(f"Upload completed successfully for document: {document_id}")
-        return response
+        logger.info("Upload completed successfully for document: %s", document_id)
+        return ORJSONResponse(
+            response.model_dump(mode="json"),
+            status_code=status.HTTP_201_CREATED
+        )
         
     except HTTPException:
         raise
@@ -190,48 +203,62 @@ async def upload_document(
         )
 
 
-@router.get("/", response_model=DocumentListResponse)
+def _encode_cursor(cursor: Optional[Tuple[datetime, int]]) -> Optional[str]:
+    """Encode an (uploaded_at, id) keyset cursor as an opaque URL-safe string"""
+    if cursor is None:
+        return None
+    raw = f"{cursor[0].isoformat()}|{cursor[1]}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by _encode_cursor"""
+    try:
+        uploaded_at, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(uploaded_at), int(doc_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+@router.get("/", responses={200: {"model": DocumentListResponse}})
 async def list_documents(
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 100,
-    status: str = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
     db: Session = Depends(get_db)
 ):
     """
     List all uploaded documents
     
     **Query Parameters:**
-    - skip: Number of records to skip (pagination)
+    - cursor: `next_cursor` from the previous page (pagination)
     - limit: Maximum records to return (max 100)
     - status: Filter by processing status (pending, processing, completed, failed)
     
     **Returns:**
     - List of documents with metadata
     - Total count
+    - Cursor for the next page (null on the last page)
     """
+    keyset = _decode_cursor(cursor) if cursor else None
+    
     try:
-        documents = DocumentCRUD.get_all_documents(db, skip=skip, limit=limit, status=status)
-        total_count = DocumentCRUD.count_documents(db, status=status)
+        documents, total_count, next_keyset = DocumentCRUD.list_with_count(
+            db, cursor=keyset, limit=limit, status=status_filter
+        )
         
-        doc_list = []
-        for doc in documents:
-            doc_list.append(DocumentMetadata(
-                document_id=doc.document_id,
-                filename=doc.filename,
-                file_type=doc.file_type,
-                file_size=doc.file_size,
-                file_hash=doc.file_hash,
-                character_count=doc.character_count,
-                word_count=doc.word_count,
-                page_count=doc.page_count,
-                chunk_count=doc.chunk_count,
-                uploaded_at=doc.uploaded_at
-            ))
+        # Rows come straight from the database, so skip Pydantic validation
+        doc_list = [DocumentMetadata.model_construct(**doc) for doc in documents]
         
-        return DocumentListResponse(
+        response = DocumentListResponse.model_construct(
             documents=doc_list,
-            total_count=total_count
+            total_count=total_count,
+            next_cursor=_encode_cursor(next_keyset)
         )
+        return ORJSONResponse(response.model_dump(mode="json"))
         
     except Exception as e:
         logger.error(f"Error listing documents: {str(e)}")
@@ -241,7 +268,7 @@ async def list_documents(
         )
 
 
-@router.get("/{document_id}", response_model=DocumentUploadResponse)
+@router.get("/{document_id}", responses={200: {"model": DocumentUploadResponse}})
 async def get_document(
     document_id: str,
     db: Session = Depends(get_db)
@@ -266,20 +293,7 @@ async def get_document(
                 detail=f"Document not found: {document_id}"
             )
         
-        doc_metadata = DocumentMetadata(
-            document_id=document.document_id,
-            filename=document.filename,
-            file_type=document.file_type,
-            file_size=document.file_size,
-            file_hash=document.file_hash,
-            character_count=document.character_count,
-            word_count=document.word_count,
-            page_count=document.page_count,
-            chunk_count=document.chunk_count,
-            uploaded_at=document.uploaded_at
-        )
-        
-        return DocumentUploadResponse(
+        response = DocumentUploadResponse.model_construct(
             success=document.processing_status == 'completed',
             message=f"Document status: {document.processing_status}",
             document_id=document.document_id,
@@ -287,8 +301,9 @@ async def get_document(
             file_size=document.file_size,
             file_hash=document.file_hash,
             chunks_created=document.chunk_count or 0,
-            metadata=doc_metadata
+            metadata=_document_metadata(document)
         )
+        return ORJSONResponse(response.model_dump(mode="json"))
         
     except HTTPException:
         raise
@@ -329,8 +344,14 @@ async def delete_document(
         if file_path.exists():
             await file_handler.delete_file(file_path)
         
-        # Delete from database (cascades to chunks)
-        DocumentCRUD.delete_document(db, document_id)
+        # Delete from database (cascades to chunks; corpus totals are
+        # adjusted in the same transaction)
+        await asyncio.to_thread(DocumentCRUD.delete_document, db, document_id)
+        
+        # Cached RAG answers and search results may cite the deleted document
+        semantic_cache.clear()
+        retrieval_cache.clear()
+        document_metadata_cache.invalidate(document_id)
         
         return {
             "success": True,
@@ -351,15 +372,26 @@ async def delete_document(
 @router.get("/{document_id}/chunks")
 async def get_document_chunks(
     document_id: str,
+    skip: int = Query(0, ge=0, description="Number of chunks to skip"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum chunks to return"),
     db: Session = Depends(get_db)
 ):
     """
-    Get all chunks for a document
+    Get chunks for a document, one page at a time
+    
+    The response is streamed chunk by chunk, so memory use does not grow
+    with the page size.
     
     **Path Parameters:**
     - document_id: Document identifier
     
+    **Query Parameters:**
+    - skip: Number of chunks to skip (default: 0)
+    - limit: Maximum chunks to return (1-500, default: 100)
+    
     **Returns:**
+    - total_chunks: Number of chunks in the document
+    - chunk_count: Number of chunks in this page
     - List of chunks with text and metadata
     """
     try:
@@ -371,29 +403,15 @@ async def get_document_chunks(
                 detail=f"Document not found: {document_id}"
             )
         
-        # Get chunks
-        chunks = ChunkCRUD.get_chunks_by_document(db, document_id)
-        
-        chunk_list = []
-        for chunk in chunks:
-            chunk_list.append(ChunkData(
-                chunk_id=chunk.chunk_id,
-                text=chunk.chunk_text,
-                chunk_index=chunk.chunk_index,
-                document_id=chunk.document_id,
-                metadata={
-                    "chunk_size": chunk.chunk_size,
-                    "created_at": chunk.created_at.isoformat() if chunk.created_at else None,
-                    "has_embedding": chunk.embedding is not None
-                }
-            ))
-        
-        return {
+        total = ChunkCRUD.count_chunks(db, document_id)
+        header = orjson.dumps({
             "success": True,
             "document_id": document_id,
-            "chunk_count": len(chunk_list),
-            "chunks": chunk_list
-        }
+            "total_chunks": total,
+            "chunk_count": min(limit, max(total - skip, 0)),
+            "skip": skip,
+            "limit": limit
+        })
         
     except HTTPException:
         raise
@@ -403,92 +421,28 @@ async def get_document_chunks(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get chunks: {str(e)}"
         )
-
-
-@router.get("/test/parse-text")
-async def test_text_parser():
-    """
-    Test endpoint for text parser
     
-    This endpoint tests the text parsing functionality with sample content.
-    """
-    try:
-        # Create a temporary test file
-        test_content = """This is a test document.
-        
-        It has multiple paragraphs to test the parsing functionality.
-
-        This is the third paragraph with some more content to make it interesting.
-        The parser should handle this correctly and extract all the text.
-        """
-
-        # Create temporary file
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            f.write(test_content)
-            temp_path = Path(f.name)
-        
-        # Parse the file
-        result = await text_parser.parse(temp_path)
-        
-        # Clean up
-        temp_path.unlink()
-        
-        return {
-            "success": result["success"],
-            "content_length": len(result["content"]),
-            "metadata": result["metadata"],
-            "sample_content": result["content"][:200]
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Test failed: {str(e)}"
-        )
-
-
-@router.get("/test/chunking")
-async def test_chunking():
-    """
-    Test endpoint for text chunking
+    def generate():
+        # Sync generator: Starlette iterates it in the threadpool, so the
+        # database fetches never block the event loop. It runs after the
+        # handler returns, so it opens its own session rather than using the
+        # request-scoped one.
+        yield header[:-1] + b',"chunks":['
+        with db_manager.get_session() as stream_db:
+            for i, chunk in enumerate(ChunkCRUD.iter_chunk_rows(stream_db, document_id, skip, limit)):
+                if i:
+                    yield b","
+                yield orjson.dumps({
+                    "chunk_id": chunk.chunk_id,
+                    "text": chunk.chunk_text,
+                    "chunk_index": chunk.chunk_index,
+                    "document_id": chunk.document_id,
+                    "metadata": {
+                        "chunk_size": chunk.chunk_size,
+                        "created_at": chunk.created_at.isoformat() if chunk.created_at else None,
+                        "has_embedding": chunk.has_embedding
+                    }
+                })
+        yield b"]}"
     
-    This endpoint demonstrates how text is split into chunks.
-    """
-    try:
-        # Sample text
-        sample_text = """
-        Artificial Intelligence (AI) is transforming how we live and work. 
-        Machine learning, a subset of AI, enables computers to learn from data without explicit programming.
-        
-        Deep learning, using neural networks, has revolutionized fields like computer vision and natural language processing.
-        These technologies power applications from voice assistants to autonomous vehicles.
-        
-        As AI continues to advance, it raises important questions about ethics, privacy, and the future of work.
-        Responsible development and deployment of AI systems is crucial for ensuring beneficial outcomes for society.
-        """ * 3  # Repeat to make it longer
-        
-        # Chunk the text
-        chunks = text_chunker.chunk_text(sample_text, preserve_paragraphs=True)
-        
-        return {
-            "success": True,
-            "original_length": len(sample_text),
-            "chunk_count": len(chunks),
-            "chunk_size": text_chunker.chunk_size,
-            "chunk_overlap": text_chunker.chunk_overlap,
-            "chunks": [
-                {
-                    "index": i,
-                    "length": len(chunk),
-                    "preview": chunk[:100] + "..." if len(chunk) > 100 else chunk
-                }
-                for i, chunk in enumerate(chunks)
-            ]
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Test failed: {str(e)}"
-        )
\ No newline at end of file
+    return StreamingResponse(generate(), media_type="application/json")
@@ -1,17 +1,23 @@
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 
-from models import ErrorResponse, ChatMessage
+from models import ErrorResponse, ChatMessage, utc_now
 from database import get_db
+from config import get_settings
 from services import rag_service
+import orjson
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Settings are immutable at runtime, so the API key check only needs to run once
+OPENAI_CONFIGURED = bool(get_settings().openai_api_key)
+
 
 # Request/Response Models
 class RAGChatRequest(BaseModel):
@@ -74,7 +80,7 @@ class RAGChatResponse(BaseModel):
     context_used: int
     model: str
     tokens_used: int
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
     
     class Config:
         json_schema_extra = {
@@ -104,6 +110,7 @@ class RAGChatResponse(BaseModel):
 router = APIRouter(
     prefix="/api/v1/rag",
     tags=["RAG (Retrieval-Augmented Generation)"],
+    default_response_class=ORJSONResponse,
     responses={
         500: {"model": ErrorResponse, "description": "Internal server error"},
         400: {"model": ErrorResponse, "description": "Bad request"}
@@ -111,7 +118,7 @@ router = APIRouter(
 )
 
 
-@router.post("/chat", response_model=RAGChatResponse)
+@router.post("/chat", responses={200: {"model": RAGChatResponse}})
 async def rag_chat(
     request: RAGChatRequest,
     db: Session = Depends(get_db)
@@ -167,13 +174,20 @@ async def rag_chat(
     - Higher temperature (0.7-1.0) for creative responses
     """
     try:
-        logger.info(f"RAG chat request: '{request.query}'")
+        logger.info("RAG chat request: '%s'", request.query)
+        
+        # ChatMessage only has role/content, so the validated __dict__ is
+        # already the plain dict the service expects (no per-message dump)
+        history = (
+            [msg.__dict__ for msg in request.conversation_history]
+            if request.conversation_history else None
+        )
         
         # Generate RAG response
-        rag_response = rag_service.generate_rag_response(
+        rag_response = await rag_service.generate_rag_response(
             db=db,
             query=request.query,
-            conversation_history=[msg.dict() for msg in request.conversation_history] if request.conversation_history else None,
+            conversation_history=history,
             document_id=request.document_id,
             top_k=request.top_k,
             temperature=request.temperature,
@@ -191,8 +205,10 @@ async def rag_chat(
             tokens_used=rag_response["tokens_used"]
         )
         
-        logger.info(f"RAG chat completed: {len(rag_response['sources'])} sources used")
-        return response
+        logger.info("RAG chat completed: %s sources used", len(rag_response['sources']))
+        
+        # Return the already-validated model directly, skipping response_model re-validation
+        return ORJSONResponse(response.model_dump(mode="json"))
         
     except Exception as e:
         logger.error(f"RAG chat error: {str(e)}", exc_info=True)
@@ -203,25 +219,102 @@ async def rag_chat(
 
 
 @router.post("/chat/stream")
-async def rag_chat_stream(
-    request: RAGChatRequest,
-    db: Session = Depends(get_db)
-):
+async def rag_chat_stream(request: RAGChatRequest):
+    """
+    RAG chat with a streaming response (Server-Sent Events)
+    
+    Same request body as `/chat`. The response is a `text/event-stream`:
+    1. `event: sources` - retrieved sources and context_used (sent before generation)
+    2. `event: token` - one per generated text delta: `{"token": "..."}`
+    3. `event: done` - end of stream with the model used
+    
+    If generation fails mid-stream an `event: error` is sent instead of `done`.
+    """
+    logger.info("RAG stream request: '%s'", request.query)
+    
+    history = (
+        [msg.__dict__ for msg in request.conversation_history]
+        if request.conversation_history else None
+    )
+    
+    async def event_generator():
+        # Runs after the handler returns; retrieval opens (and closes) its own
+        # session inside stream_rag_response rather than using a request-scoped one
+        try:
+            async for event, data in rag_service.stream_rag_response(
+                query=request.query,
+                conversation_history=history,
+                document_id=request.document_id,
+                top_k=request.top_k,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens
+            ):
+                yield f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+        except Exception as e:
+            logger.error(f"RAG stream error: {str(e)}", exc_info=True)
+            yield f"event: error\ndata: {orjson.dumps({'detail': str(e)}).decode()}\n\n"
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _compute_rag_health(db: Session) -> dict:
     """
-    RAG chat with streaming response (placeholder for future implementation)
+    Run the database check behind the RAG health endpoint
     
-    **Note**: Streaming is not yet implemented. This endpoint will:
-    1. Retrieve context as usual
-    2. Stream the AI response token by token
-    3. Provide sources after streaming completes
+    One round trip: reading the corpus_state row both probes the connection
+    and returns the totals maintained by the ingest and delete paths, so no
+    rows are counted here. total_documents counts completed documents.
     
-    For now, use the regular `/chat` endpoint.
+    Args:
+        db: Database session
+        
+    Returns:
+        Health payload dictionary
     """
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Streaming is not yet implemented. Please use /api/v1/rag/chat"
+    from database.crud import CorpusStateCRUD
+
+    # Check database connection and read corpus totals
+    database_connection = True
+    total_docs = total_chunks = chunks_with_embeddings = 0
+    try:
+        corpus = CorpusStateCRUD.get(db)
+        if corpus is not None:
+            total_docs = corpus.document_count
+            total_chunks = corpus.chunk_count
+            chunks_with_embeddings = corpus.indexed_chunk_count
+    except Exception:
+        database_connection = False
+
+    # Check if embeddings are ready
+    embedding_ready = chunks_with_embeddings > 0
+
+    is_ready = (
+        database_connection and
+        OPENAI_CONFIGURED and
+        total_docs > 0 and
+        chunks_with_embeddings > 0
     )
 
+    return {
+        "status": "healthy" if is_ready else "not_ready",
+        "database_connection": database_connection,
+        "openai_configured": OPENAI_CONFIGURED,
+        "embedding_ready": embedding_ready,
+        "total_documents": total_docs,
+        "total_chunks": total_chunks,
+        "indexed_chunks": chunks_with_embeddings,
+        "timestamp": utc_now()
+    }
+
+
+# Seconds a RAG health result is reused
+RAG_HEALTH_CACHE_TTL = 10.0
+_rag_health_cache = {"expires_at": 0.0, "payload": None}
+
 
 @router.get("/health")
 async def rag_health_check(db: Session = Depends(get_db)):
@@ -234,53 +327,24 @@ async def rag_health_check(db: Session = Depends(get_db)):
     - Chunks with embeddings
     - Search functionality
     
+    Results are cached for RAG_HEALTH_CACHE_TTL seconds; `timestamp` is
+    when the checks last ran.
+    
     **Returns:**
     - Status of RAG system components
     - Readiness indicators
     """
     try:
-        from database.crud import DocumentCRUD, ChunkCRUD
-        from config import settings
+        now = time.monotonic()
+        if _rag_health_cache["payload"] is None or now >= _rag_health_cache["expires_at"]:
+            _rag_health_cache["payload"] = _compute_rag_health(db)
+            _rag_health_cache["expires_at"] = now + RAG_HEALTH_CACHE_TTL
 
-        # Check database connection
-        database_connection = True
-        try:
-            db.execute(text("SELECT 1"))
-        except:
-            database_connection = False
-
-        # Check OpenAI configuration
-        openai_configured = bool(settings.openai_api_key)
-
-        # Check document availability
-        total_docs = DocumentCRUD.count_documents(db, status='completed')
-        total_chunks = ChunkCRUD.count_chunks(db)
-        chunks_with_embeddings = ChunkCRUD.count_chunks_with_embeddings(db)
-
-        # Check if embeddings are ready
-        embedding_ready = chunks_with_embeddings > 0
-
-        is_ready = (
-            database_connection and
-            openai_configured and
-            total_docs > 0 and
-            chunks_with_embeddings > 0
-        )
-
-        return {
-            "status": "healthy" if is_ready else "not_ready",
-            "database_connection": database_connection,
-            "openai_configured": openai_configured,
-            "embedding_ready": embedding_ready,
-            "total_documents": total_docs,
-            "total_chunks": total_chunks,
-            "indexed_chunks": chunks_with_embeddings,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        return _rag_health_cache["payload"]
         
     except Exception as e:
         logger.error(f"RAG health check failed: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Health check failed: {str(e)}"
-        )
\ No newline at end of file
+        )
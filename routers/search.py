@@ -1,11 +1,13 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from datetime import datetime
 
-from models import ErrorResponse
-from database import get_db
-from services import search_service
+from models import ErrorResponse, utc_now
+from database import db_manager, get_db, get_async_db
+from services import search_service, openai_service, reranker_service
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +16,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(
     prefix="/api/v1/search",
     tags=["Search"],
+    default_response_class=ORJSONResponse,
     responses={
         500: {"model": ErrorResponse, "description": "Internal server error"},
         400: {"model": ErrorResponse, "description": "Bad request"}
@@ -21,13 +24,22 @@ router = APIRouter(
 )
 
 
+def _require_reranker(rerank: bool):
+    """Reject rerank requests when no reranker model is configured"""
+    if rerank and not reranker_service.available:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Reranking is not available: set RERANKER_MODEL_DIR and install onnxruntime and tokenizers"
+        )
+
+
 @router.get("/semantic")
 async def semantic_search(
     query: str = Query(..., description="Search query text", min_length=1),
     top_k: int = Query(5, description="Number of results to return", ge=1, le=20),
     document_id: Optional[str] = Query(None, description="Filter by document ID"),
     min_similarity: float = Query(0.0, description="Minimum similarity threshold (0.0-1.0)", ge=0.0, le=1.0),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Perform semantic search using vector similarity
@@ -54,7 +66,8 @@ async def semantic_search(
     try:
         logger.info(f"Semantic search request: '{query}'")
         
-        results = search_service.semantic_search(
+        # Async embedding and async (asyncpg) vector search
+        results = await search_service.semantic_search_async(
             db=db,
             query=query,
             top_k=top_k,
@@ -68,7 +81,7 @@ async def semantic_search(
             "search_type": "semantic",
             "results_count": len(results),
             "results": results,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utc_now()
         }
         
     except Exception as e:
@@ -84,10 +97,10 @@ async def keyword_search(
     query: str = Query(..., description="Search query text", min_length=1),
     top_k: int = Query(5, description="Number of results to return", ge=1, le=20),
     document_id: Optional[str] = Query(None, description="Filter by document ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Perform keyword-based search using text matching
+    Perform keyword-based search using full-text matching
     
     **Keyword search** finds exact or partial text matches in documents.
     Useful for finding specific terms or phrases.
@@ -99,7 +112,7 @@ async def keyword_search(
     
     **Returns:**
     - List of matching chunks
-    - Relevance scores based on match frequency
+    - Relevance scores from full-text ranking
     - Source document information
     
     **Example:**
@@ -110,7 +123,7 @@ async def keyword_search(
     try:
         logger.info(f"Keyword search request: '{query}'")
         
-        results = search_service.keyword_search(
+        results = await search_service.keyword_search_async(
             db=db,
             query=query,
             top_k=top_k,
@@ -123,7 +136,7 @@ async def keyword_search(
             "search_type": "keyword",
             "results_count": len(results),
             "results": results,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utc_now()
         }
         
     except Exception as e:
@@ -139,10 +152,11 @@ async def hybrid_search(
     query: str = Query(..., description="Search query text", min_length=1),
     top_k: int = Query(5, description="Number of results to return", ge=1, le=20),
     document_id: Optional[str] = Query(None, description="Filter by document ID"),
-    semantic_weight: float = Query(0.7, description="Weight for semantic search", ge=0.0, le=1.0),
-    keyword_weight: float = Query(0.3, description="Weight for keyword search", ge=0.0, le=1.0),
+    semantic_weight: Optional[float] = Query(None, description="Weight for semantic search (default 0.7, adapted to the query)", ge=0.0, le=1.0),
+    keyword_weight: Optional[float] = Query(None, description="Weight for keyword search (default 0.3, adapted to the query)", ge=0.0, le=1.0),
     min_similarity: float = Query(0.0, description="Minimum similarity for semantic results", ge=0.0, le=1.0),
-    db: Session = Depends(get_db)
+    rerank: bool = Query(False, description="Rerank candidates with the cross-encoder"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Perform hybrid search combining semantic and keyword search
@@ -159,10 +173,16 @@ async def hybrid_search(
     - document_id: Filter by specific document (optional)
     - semantic_weight: Weight for semantic scores (0.0-1.0, default: 0.7)
     - keyword_weight: Weight for keyword scores (0.0-1.0, default: 0.3)
+    
+    When neither weight is given, they are adapted to the query: questions
+    (7+ words or containing '?') run semantic-only, and 1-3 word queries use
+    semantic=0.4, keyword=0.6. `weights` in the response are the ones applied.
     - min_similarity: Minimum similarity threshold (0.0-1.0, default: 0.0)
+    - rerank: Rerank the top candidates with a cross-encoder (default: false;
+      requires RERANKER_MODEL_DIR)
     
     **Returns:**
-    - List of relevant chunks ranked by combined score
+    - List of relevant chunks ranked by combined score (or rerank_score)
     - Individual semantic and keyword scores
     - Combined score
     - Source document information
@@ -177,17 +197,25 @@ async def hybrid_search(
     - Semantic-focused: semantic=0.7, keyword=0.3 (default)
     - Keyword-focused: semantic=0.3, keyword=0.7
     """
+    _require_reranker(rerank)
+    
     try:
+        # Resolve the weights up front so the response reports what ran
+        _, semantic_weight, keyword_weight = search_service.route_query(
+            query, semantic_weight, keyword_weight
+        )
         logger.info(f"Hybrid search request: '{query}' (s={semantic_weight}, k={keyword_weight})")
         
-        results = search_service.hybrid_search(
+        # Semantic and keyword branches run concurrently
+        results = await search_service.hybrid_search_async(
             db=db,
             query=query,
             top_k=top_k,
             document_id=document_id,
             semantic_weight=semantic_weight,
             keyword_weight=keyword_weight,
-            min_similarity=min_similarity
+            min_similarity=min_similarity,
+            rerank=rerank
         )
         
         return {
@@ -200,7 +228,7 @@ async def hybrid_search(
                 "keyword": keyword_weight
             },
             "results": results,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utc_now()
         }
         
     except Exception as e:
@@ -217,9 +245,10 @@ async def search_with_context(
     top_k: int = Query(5, description="Number of results to return", ge=1, le=20),
     context_window: int = Query(1, description="Number of surrounding chunks to include", ge=0, le=5),
     document_id: Optional[str] = Query(None, description="Filter by document ID"),
-    semantic_weight: float = Query(0.7, description="Weight for semantic search", ge=0.0, le=1.0),
-    keyword_weight: float = Query(0.3, description="Weight for keyword search", ge=0.0, le=1.0),
-    db: Session = Depends(get_db)
+    semantic_weight: Optional[float] = Query(None, description="Weight for semantic search (default 0.7, adapted to the query)", ge=0.0, le=1.0),
+    keyword_weight: Optional[float] = Query(None, description="Weight for keyword search (default 0.3, adapted to the query)", ge=0.0, le=1.0),
+    rerank: bool = Query(False, description="Rerank candidates with the cross-encoder"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Search with surrounding context chunks
@@ -232,8 +261,10 @@ async def search_with_context(
     - top_k: Number of results (1-20, default: 5)
     - context_window: Number of chunks before/after (0-5, default: 1)
     - document_id: Filter by specific document (optional)
-    - semantic_weight: Weight for semantic search (default: 0.7)
+    - semantic_weight: Weight for semantic search (default: 0.7, adapted
+      to the query when neither weight is given)
     - keyword_weight: Weight for keyword search (default: 0.3)
+    - rerank: Rerank the top candidates with a cross-encoder (default: false)
     
     **Returns:**
     - Search results with context chunks
@@ -250,17 +281,21 @@ async def search_with_context(
     - Understanding narrative flow
     - Getting complete paragraphs
     """
+    _require_reranker(rerank)
+    
     try:
         logger.info(f"Context search request: '{query}' (window={context_window})")
         
-        results = search_service.search_with_context(
+        # Semantic and keyword branches run concurrently
+        results = await search_service.search_with_context_async(
             db=db,
             query=query,
             top_k=top_k,
             context_window=context_window,
             document_id=document_id,
             semantic_weight=semantic_weight,
-            keyword_weight=keyword_weight
+            keyword_weight=keyword_weight,
+            rerank=rerank
         )
         
         return {
@@ -270,7 +305,7 @@ async def search_with_context(
             "context_window": context_window,
             "results_count": len(results),
             "results": results,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utc_now()
         }
         
     except Exception as e:
@@ -292,6 +327,8 @@ async def get_search_stats(db: Session = Depends(get_db)):
     - Number of chunks with embeddings
     - Percentage of searchable content
     - Average chunks per document
+    - Database connection pool usage
+    - Latency percentiles per search stage (embedding, SQL, fusion, rerank)
     
     **Example:**
     ```
@@ -299,12 +336,14 @@ async def get_search_stats(db: Session = Depends(get_db)):
     ```
     """
     try:
-        stats = search_service.get_search_statistics(db)
+        stats = await asyncio.to_thread(search_service.get_search_statistics, db)
         
         return {
             "success": True,
             "statistics": stats,
-            "timestamp": datetime.utcnow().isoformat()
+            "embedding_cache": openai_service.embedding_cache_stats(),
+            "pool": db_manager.pool_stats(),
+            "timestamp": utc_now()
         }
         
     except Exception as e:
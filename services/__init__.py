@@ -1,15 +1,28 @@
 from .openai_service import openai_service, OpenAIService
+from .timing import search_timings, TimingRecorder
 from .background_tasks import background_task_service, BackgroundTaskService
+from .reranker_service import reranker_service, RerankerService
 from .search_service import search_service, SearchService
+from .semantic_cache import semantic_cache, retrieval_cache, SemanticCache
+from .document_cache import document_metadata_cache, DocumentMetadataCache
 from .rag_service import rag_service, RAGService
 
 __all__ = [
     "openai_service", 
     "OpenAIService", 
+    "search_timings",
+    "TimingRecorder",
     "background_task_service", 
     "BackgroundTaskService",
+    "reranker_service",
+    "RerankerService",
     "search_service",
     "SearchService",
+    "semantic_cache",
+    "retrieval_cache",
+    "SemanticCache",
+    "document_metadata_cache",
+    "DocumentMetadataCache",
     "rag_service",
     "RAGService"
 ]
\ No newline at end of file
@@ -1,16 +1,27 @@
+import asyncio
+import hashlib
+import itertools
 import logging
 from pathlib import Path
-from typing import List
-from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
 
+from config import get_settings
+from models import utc_now
 from database import db_manager, Document, DocumentChunk
-from database.crud import DocumentCRUD, ChunkCRUD
+from database.crud import DocumentCRUD, ChunkCRUD, EmbeddingCacheCRUD, CorpusStateCRUD
 from utils import text_chunker
 from parsers import text_parser, pdf_parser
 from services import openai_service
+from services.semantic_cache import semantic_cache, retrieval_cache
 
 logger = logging.getLogger(__name__)
 
+# Parser dispatch by file type (extension without the dot); each takes (file_path, force_ocr)
+PARSERS: Dict[str, Callable[[Path, bool], Awaitable[Dict]]] = {
+    'txt': lambda file_path, force_ocr: text_parser.parse(file_path),
+    'pdf': lambda file_path, force_ocr: pdf_parser.parse(file_path, use_ocr=True, force_ocr=force_ocr),
+}
+
 
 class BackgroundTaskService:
     """
@@ -22,7 +33,8 @@ class BackgroundTaskService:
         document_id: str,
         file_path: Path,
         filename: str,
-        file_type: str
+        file_type: str,
+        force_ocr: bool = False
     ):
         """
         Process a document in the background:
@@ -36,64 +48,59 @@ class BackgroundTaskService:
             file_path: Path to uploaded file
             filename: Original filename
             file_type: File extension
+            force_ocr: OCR PDFs even if they have a text layer
         """
+        completed = None
         try:
             logger.info(f"Starting background processing for document: {document_id}")
             
-            with db_manager.get_session() as db:
-                # Update status to processing
-                DocumentCRUD.update_document_status(
-                    db, 
-                    document_id, 
-                    'processing'
-                )
+            # Update status to processing (sync DB calls run off the event loop)
+            await asyncio.to_thread(
+                BackgroundTaskService._in_session,
+                DocumentCRUD.update_document_status,
+                document_id,
+                'processing'
+            )
             
             # Step 1: Parse document
-            if file_type == 'txt':
-                parse_result = await text_parser.parse(file_path)
-            elif file_type == 'pdf':
-                parse_result = await pdf_parser.parse(file_path, use_ocr=True)
-            else:
+            parser = PARSERS.get(file_type)
+            if parser is None:
                 raise ValueError(f"Unsupported file type: {file_type}")
+            parse_result = await parser(file_path, force_ocr)
             
             if not parse_result["success"]:
                 raise Exception(f"Failed to parse document: {parse_result['error']}")
             
             content = parse_result["content"]
             
-            # Step 2: Chunk text
-            chunks = text_chunker.chunk_text(content, preserve_paragraphs=True)
-            logger.info(f"Document chunked into {len(chunks)} pieces")
-            
-            # Step 3: Generate embeddings for all chunks
-            logger.info(f"Generating embeddings for {len(chunks)} chunks")
-            embeddings = openai_service.create_embeddings_batch(chunks)
-            
-            # Step 4: Store chunks in database
-            with db_manager.get_session() as db:
-                chunks_data = []
-                for i, (chunk_text, embedding) in enumerate(zip(chunks, embeddings)):
-                    chunk_id = f"chunk_{document_id}_{i}"
-                    chunks_data.append({
-                        "chunk_id": chunk_id,
-                        "document_id": document_id,
-                        "chunk_text": chunk_text,
-                        "chunk_index": i,
-                        "chunk_size": len(chunk_text),
-                        "embedding": embedding
-                    })
-                
-                # Batch insert chunks
-                ChunkCRUD.create_chunks_batch(db, chunks_data)
-                
-                # Update document chunk count and status
-                DocumentCRUD.update_document_chunk_count(db, document_id, len(chunks))
-                DocumentCRUD.update_document_status(
-                    db,
-                    document_id,
-                    'completed',
-                    processed_at=datetime.utcnow()
-                )
+            # Record content metadata now that the document has been parsed
+            parse_metadata = parse_result["metadata"]
+            await asyncio.to_thread(
+                BackgroundTaskService._in_session,
+                DocumentCRUD.update_document_content_stats,
+                document_id,
+                character_count=parse_metadata.get("character_count", len(content)),
+                word_count=parse_metadata.get("word_count"),
+                page_count=parse_metadata.get("page_count")
+            )
+            
+            # Steps 2-4: Chunk text lazily, generate embeddings (reusing cached
+            # ones for identical chunk text) and store chunks, pipelined window
+            # by window so chunks and vectors never pile up for the whole document
+            chunk_count = await BackgroundTaskService._embed_and_store_chunks(
+                document_id,
+                text_chunker.chunk_text_iter(content, preserve_paragraphs=True)
+            )
+            logger.info(f"Document chunked into {chunk_count} pieces")
+            
+            # Status, chunk count and corpus totals in one transaction
+            completed = await asyncio.to_thread(
+                BackgroundTaskService._complete_document, document_id, chunk_count
+            )
+            
+            # New content can change answers, so drop cached responses and results
+            semantic_cache.clear()
+            retrieval_cache.clear()
             
             logger.info(f"Document processing completed: {document_id}")
             
@@ -102,15 +109,196 @@ class BackgroundTaskService:
             
             # Update document status to failed
             try:
-                with db_manager.get_session() as db:
-                    DocumentCRUD.update_document_status(
-                        db,
-                        document_id,
-                        'failed',
-                        error_message=str(e)
-                    )
+                await asyncio.to_thread(
+                    BackgroundTaskService._fail_document, document_id, str(e), completed
+                )
             except Exception as db_error:
                 logger.error(f"Failed to update error status: {str(db_error)}")
 
 
+    @staticmethod
+    def _in_session(operation: Callable, *args, **kwargs):
+        """
+        Run a CRUD operation in its own session (called via asyncio.to_thread
+        so the blocking database round trip stays off the event loop)
+        
+        Args:
+            operation: CRUD function taking the session as its first argument
+            *args: Further positional arguments for operation
+            **kwargs: Keyword arguments for operation
+            
+        Returns:
+            Whatever operation returns
+        """
+        with db_manager.get_session() as db:
+            return operation(db, *args, **kwargs)
+
+
+    @staticmethod
+    def _fail_document(document_id: str, error_message: str, completed: Optional[Document]) -> None:
+        """
+        Mark a document failed and drop its partially stored chunks
+        
+        Args:
+            document_id: Document identifier
+            error_message: Error to record
+            completed: The completed Document if it had already been counted
+                in the corpus totals (the counts are then taken back out)
+        """
+        with db_manager.get_session() as db:
+            # Drop partially stored chunks so a retry starts clean
+            ChunkCRUD.delete_chunks_by_document(db, document_id)
+            DocumentCRUD.update_document_status(
+                db,
+                document_id,
+                'failed',
+                error_message=error_message
+            )
+            if completed is not None:
+                chunk_count = completed.chunk_count or 0
+                CorpusStateCRUD.apply_delta(db, -1, -chunk_count, -chunk_count)
+
+
+    @staticmethod
+    def _complete_document(document_id: str, chunk_count: int) -> Optional[Document]:
+        """
+        Mark a document completed (and count it in the corpus totals)
+        
+        Args:
+            document_id: Document identifier
+            chunk_count: Number of chunks stored
+            
+        Returns:
+            Updated Document object or None if it no longer exists
+        """
+        with db_manager.get_session() as db:
+            return DocumentCRUD.complete_document(db, document_id, chunk_count, utc_now())
+
+
+    @staticmethod
+    async def _embed_and_store_chunks(document_id: str, chunks: Iterable[str]) -> int:
+        """
+        Embed and insert chunks in windows, overlapping each window's insert
+        with the next window's embedding requests
+        
+        Windows are INGEST_WINDOW_SIZE chunks (at most one embeddings batch),
+        small enough that typical documents span several windows and their
+        inserts actually overlap embedding. Chunks are pulled from the
+        iterable one window at a time, so only two windows of chunks and
+        vectors are ever held in memory.
+        
+        Args:
+            document_id: Document identifier
+            chunks: Chunk texts in document order (any iterable, e.g. a generator)
+            
+        Returns:
+            Number of chunks stored
+        """
+        window_size = max(1, min(get_settings().ingest_window_size, openai_service.embedding_batch_size))
+        chunks = iter(chunks)
+        insert_task = None
+        start = 0
+        
+        try:
+            while True:
+                window = list(itertools.islice(chunks, window_size))
+                if not window:
+                    break
+                
+                embeddings = await BackgroundTaskService._embed_chunks(window)
+                
+                if insert_task is not None:
+                    await insert_task
+                
+                chunks_data = [
+                    {
+                        "chunk_id": f"chunk_{document_id}_{i}",
+                        "document_id": document_id,
+                        "chunk_text": chunk_text,
+                        "chunk_index": i,
+                        "chunk_size": len(chunk_text),
+                        "embedding": embedding
+                    }
+                    for i, (chunk_text, embedding) in enumerate(zip(window, embeddings), start=start)
+                ]
+                insert_task = asyncio.create_task(
+                    asyncio.to_thread(BackgroundTaskService._insert_chunks, chunks_data)
+                )
+                start += len(window)
+            
+            if insert_task is not None:
+                await insert_task
+            return start
+        except BaseException:
+            # Let an in-flight insert finish before the caller cleans up
+            if insert_task is not None:
+                await asyncio.gather(insert_task, return_exceptions=True)
+            raise
+
+
+    @staticmethod
+    def _insert_chunks(chunks_data: List[dict]) -> None:
+        """
+        Bulk insert one window of chunks in its own transaction
+        
+        Args:
+            chunks_data: Chunk rows for ChunkCRUD.bulk_insert_chunks
+        """
+        with db_manager.get_session() as db:
+            # Ids aren't needed, so no RETURNING
+            ChunkCRUD.bulk_insert_chunks(db, chunks_data)
+
+
+    @staticmethod
+    async def _embed_chunks(chunks: List[str]) -> List:
+        """
+        Embed chunks, only calling the API for texts not in the embedding cache
+        
+        Args:
+            chunks: Chunk texts
+            
+        Returns:
+            Embeddings in the same order as chunks
+        """
+        model = openai_service.embedding_model
+        chunk_hashes = [hashlib.sha256(chunk.encode("utf-8")).hexdigest() for chunk in chunks]
+        
+        # One round trip for all cache lookups
+        cached = await asyncio.to_thread(
+            BackgroundTaskService._in_session,
+            EmbeddingCacheCRUD.get_many,
+            list(set(chunk_hashes)),
+            model
+        )
+        
+        # Unique uncached texts (duplicate chunks are embedded once)
+        uncached = {}
+        for chunk_hash, chunk in zip(chunk_hashes, chunks):
+            if chunk_hash not in cached and chunk_hash not in uncached:
+                uncached[chunk_hash] = chunk
+        
+        logger.info(
+            f"Embedding cache: {len(chunks) - len(uncached)} of {len(chunks)} chunks cached, "
+            f"{len(uncached)} to embed"
+        )
+        
+        if uncached:
+            new_embeddings = await openai_service.create_embeddings_batch_async(
+                list(uncached.values()),
+                as_float16=True
+            )
+            fresh = dict(zip(uncached.keys(), new_embeddings))
+            
+            await asyncio.to_thread(
+                BackgroundTaskService._in_session,
+                EmbeddingCacheCRUD.put_many,
+                fresh,
+                model
+            )
+            
+            cached.update(fresh)
+        
+        return [cached[chunk_hash] for chunk_hash in chunk_hashes]
+
+
 background_task_service = BackgroundTaskService()
\ No newline at end of file
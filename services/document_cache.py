@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from config import get_settings
+
+
+class DocumentInfo(NamedTuple):
+    """
+    Document fields shown alongside search results
+    """
+    filename: str
+    file_type: str
+    uploaded_at: Optional[datetime]
+
+
+class DocumentMetadataCache:
+    """
+    In-process TTL + LRU cache of document_id -> DocumentInfo
+
+    Search results only show a document's filename, type and upload time,
+    which never change after upload, so hot documents are served from memory
+    instead of a database lookup per search. Entries expire after the TTL and
+    are dropped explicitly when a document is deleted.
+    """
+
+    def __init__(self):
+        """
+        Read cache size and TTL from settings
+        """
+        settings = get_settings()
+        self.max_size = settings.document_cache_size
+        self.ttl = settings.document_cache_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, document_ids: Iterable[str]) -> Dict[str, DocumentInfo]:
+        """
+        Look up cached documents
+
+        Args:
+            document_ids: Document identifiers
+
+        Returns:
+            Dictionary of document_id -> DocumentInfo for fresh entries only
+        """
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for document_id in document_ids:
+                entry = self._entries.get(document_id)
+                if entry is None:
+                    continue
+                expires_at, info = entry
+                if expires_at < now:
+                    del self._entries[document_id]
+                    continue
+                self._entries.move_to_end(document_id)
+                found[document_id] = info
+        return found
+
+    def put_many(self, documents: Iterable) -> Dict[str, DocumentInfo]:
+        """
+        Cache documents loaded from the database
+
+        Args:
+            documents: Document ORM objects
+
+        Returns:
+            Dictionary of document_id -> DocumentInfo for the given documents
+        """
+        infos = {
+            document.document_id: DocumentInfo(document.filename, document.file_type, document.uploaded_at)
+            for document in documents
+        }
+        if self.max_size <= 0:
+            return infos
+
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for document_id, info in infos.items():
+                self._entries[document_id] = (expires_at, info)
+                self._entries.move_to_end(document_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return infos
+
+    def invalidate(self, document_id: str) -> None:
+        """
+        Drop a document (e.g. after it is deleted)
+
+        Args:
+            document_id: Document identifier
+        """
+        with self._lock:
+            self._entries.pop(document_id, None)
+
+
+# Create singleton instance
+document_metadata_cache = DocumentMetadataCache()
@@ -1,6 +1,14 @@
-from openai import OpenAI, OpenAIError
-from typing import List, Dict
-from config import settings
+import asyncio
+import base64
+import hashlib
+import importlib.util
+import threading
+from collections import OrderedDict
+import httpx
+from openai import OpenAI, AsyncOpenAI, OpenAIError, DEFAULT_TIMEOUT
+from typing import AsyncIterator, List, Dict, Optional, Set, Tuple
+import numpy as np
+from config import get_settings
 import logging
 
 # Configure logging
@@ -17,16 +25,53 @@ class OpenAIService:
         """
         Initialize OpenAI client with API key from settings
         """
+        settings = get_settings()
         if not settings.openai_api_key:
             raise ValueError("OpenAI API key is not configured. Please set OPENAI_API_KEY in .env file")
         
         self.client = OpenAI(api_key=settings.openai_api_key)
+        # Async client for request-path calls so the event loop is never blocked.
+        # Its connections are kept alive between bursts (and multiplexed over
+        # HTTP/2 when h2 is installed), so requests skip TCP/TLS setup.
+        self.http2 = settings.openai_http2 and importlib.util.find_spec("h2") is not None
+        self.async_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=httpx.AsyncClient(
+                http2=self.http2,
+                timeout=DEFAULT_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=settings.openai_max_keepalive_connections,
+                    keepalive_expiry=settings.openai_keepalive_expiry
+                )
+            )
+        )
         self.model = settings.openai_model
         self.embedding_model = settings.openai_embedding_model
+        # OpenAI accepts at most 2048 inputs per embeddings request
+        self.embedding_batch_size = min(settings.embedding_batch_size, 2048)
+        self.embedding_max_concurrency = settings.embedding_max_concurrency
+        
+        # Query embedding cache: SHA-1 of (model, text) -> embedding, LRU order
+        self.embedding_cache_size = settings.query_embedding_cache_size
+        self._embedding_cache: OrderedDict = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        self._embedding_cache_hits = 0
+        self._embedding_cache_misses = 0
+        
+        # Query micro-batching (see embed_query); created lazily on the running loop
+        self.query_batch_max_size = min(settings.query_batch_max_size, 2048)
+        self.query_batch_wait = settings.query_batch_wait_ms / 1000
+        self._query_queue: Optional[asyncio.Queue] = None
+        self._query_batcher: Optional[asyncio.Task] = None
+        self._query_batch_tasks: Set[asyncio.Task] = set()
+        # cache_key -> future of a query embedding that is queued or in flight
+        self._pending_queries: Dict[str, asyncio.Future] = {}
         logger.info(f"OpenAI service initialized with model: {self.model}")
     
     
-    def chat_completion(
+    async def chat_completion(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
@@ -47,9 +92,9 @@ class OpenAIService:
             OpenAIError: If the API request fails
         """
         try:
-            logger.info(f"Generating chat completion with {len(messages)} messages")
+            logger.info("Generating chat completion with %s messages", len(messages))
             
-            response = self.client.chat.completions.create(
+            response = await self.async_client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
@@ -64,7 +109,7 @@ class OpenAIService:
                 "finish_reason": response.choices[0].finish_reason
             }
             
-            logger.info(f"Chat completion successful. Tokens used: {result['tokens_used']}")
+            logger.info("Chat completion successful. Tokens used: %s", result['tokens_used'])
             return result
             
         except OpenAIError as e:
@@ -75,10 +120,106 @@ class OpenAIService:
             raise
     
     
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        usage: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion token by token
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            temperature: Controls randomness (0.0 to 2.0)
+            max_tokens: Maximum tokens in the response
+            usage: Optional dict filled with the token usage counts
+                (prompt_tokens, completion_tokens, total_tokens) once the
+                stream completes
+            
+        Yields:
+            Content deltas as they arrive from the API
+            
+        Raises:
+            OpenAIError: If the API request fails
+        """
+        try:
+            logger.info("Streaming chat completion with %s messages", len(messages))
+            
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                # Final chunk carries usage (passed raw for older SDK versions)
+                extra_body={"stream_options": {"include_usage": True}}
+            )
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                chunk_usage = getattr(chunk, "usage", None)
+                if usage is not None and chunk_usage:
+                    # A model on current SDKs, a plain dict on older ones
+                    usage.update(chunk_usage if isinstance(chunk_usage, dict) else chunk_usage.model_dump())
+            
+        except OpenAIError as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in chat completion stream: {str(e)}")
+            raise
+    
+    
+    def _embedding_cache_key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.embedding_model}\x00{text.strip()}".encode("utf-8")).hexdigest()
+    
+    
+    def _get_cached_embedding(self, key: str) -> Optional[List[float]]:
+        with self._embedding_cache_lock:
+            embedding = self._embedding_cache.get(key)
+            if embedding is None:
+                self._embedding_cache_misses += 1
+                return None
+            self._embedding_cache.move_to_end(key)
+            self._embedding_cache_hits += 1
+            return embedding
+    
+    
+    def _cache_embedding(self, key: str, embedding: List[float]) -> None:
+        if self.embedding_cache_size <= 0:
+            return
+        with self._embedding_cache_lock:
+            self._embedding_cache[key] = embedding
+            self._embedding_cache.move_to_end(key)
+            while len(self._embedding_cache) > self.embedding_cache_size:
+                self._embedding_cache.popitem(last=False)
+    
+    
+    def embedding_cache_stats(self) -> Dict[str, int]:
+        """
+        Get query embedding cache counters
+        
+        Returns:
+            Dictionary with size, max_size, hits and misses
+        """
+        with self._embedding_cache_lock:
+            return {
+                "size": len(self._embedding_cache),
+                "max_size": self.embedding_cache_size,
+                "hits": self._embedding_cache_hits,
+                "misses": self._embedding_cache_misses
+            }
+    
+    
     def create_embedding(self, text: str) -> List[float]:
         """
         Create an embedding vector for the given text
         
+        Repeated texts are served from an in-memory LRU cache.
+        
         Args:
             text: Text to embed
             
@@ -89,7 +230,12 @@ class OpenAIService:
             OpenAIError: If the API request fails
         """
         try:
-            logger.info(f"Creating embedding for text of length {len(text)}")
+            cache_key = self._embedding_cache_key(text)
+            embedding = self._get_cached_embedding(cache_key)
+            if embedding is not None:
+                return embedding
+            
+            logger.info("Creating embedding for text of length %s", len(text))
             
             response = self.client.embeddings.create(
                 model=self.embedding_model,
@@ -97,8 +243,9 @@ class OpenAIService:
             )
             
             embedding = response.data[0].embedding
-            logger.info(f"Embedding created successfully. Dimension: {len(embedding)}")
+            logger.info("Embedding created successfully. Dimension: %s", len(embedding))
             
+            self._cache_embedding(cache_key, embedding)
             return embedding
             
         except OpenAIError as e:
@@ -109,6 +256,140 @@ class OpenAIService:
             raise
     
     
+    async def create_embedding_async(self, text: str) -> List[float]:
+        """
+        Create an embedding vector without blocking the event loop
+        
+        Shares the query embedding cache with create_embedding.
+        
+        Args:
+            text: Text to embed
+            
+        Returns:
+            List of floats representing the embedding vector
+            
+        Raises:
+            OpenAIError: If the API request fails
+        """
+        try:
+            cache_key = self._embedding_cache_key(text)
+            embedding = self._get_cached_embedding(cache_key)
+            if embedding is not None:
+                return embedding
+            
+            response = await self.async_client.embeddings.create(
+                model=self.embedding_model,
+                input=text
+            )
+            
+            embedding = response.data[0].embedding
+            self._cache_embedding(cache_key, embedding)
+            return embedding
+            
+        except OpenAIError as e:
+            logger.error(f"OpenAI API error while creating embedding: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in create_embedding_async: {str(e)}")
+            raise
+    
+    
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a search query, coalescing concurrent callers into one API request
+        
+        Queries are buffered for up to query_batch_wait_ms (or until
+        query_batch_max_size are waiting) and embedded with a single
+        embeddings call, so N concurrent searches pay one round trip.
+        Cached queries return immediately, and a query that is already
+        queued or in flight awaits that request instead of sending another.
+        
+        Args:
+            text: Query text to embed
+            
+        Returns:
+            List of floats representing the embedding vector
+            
+        Raises:
+            OpenAIError: If the API request fails
+        """
+        cache_key = self._embedding_cache_key(text)
+        embedding = self._get_cached_embedding(cache_key)
+        if embedding is not None:
+            return embedding
+        
+        # Shielded so a cancelled caller doesn't cancel the embedding for
+        # other callers waiting on the same query
+        future = self._pending_queries.get(cache_key)
+        if future is not None:
+            return await asyncio.shield(future)
+        
+        if self._query_batcher is None or self._query_batcher.done():
+            self._query_queue = asyncio.Queue()
+            self._query_batcher = asyncio.create_task(self._run_query_batcher())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending_queries[cache_key] = future
+        future.add_done_callback(lambda _: self._pending_queries.pop(cache_key, None))
+        self._query_queue.put_nowait((text, cache_key, future))
+        return await asyncio.shield(future)
+    
+    
+    async def _run_query_batcher(self):
+        """
+        Drain the query queue into batches and dispatch each without waiting for it
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._query_queue.get()]
+            deadline = loop.time() + self.query_batch_wait
+            
+            while len(batch) < self.query_batch_max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._query_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            task = asyncio.create_task(self._embed_query_batch(batch))
+            self._query_batch_tasks.add(task)
+            task.add_done_callback(self._query_batch_tasks.discard)
+    
+    
+    async def _embed_query_batch(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        """
+        Embed one batch of queued queries and resolve their futures
+        
+        Args:
+            batch: (text, cache_key, future) tuples
+        """
+        # Identical queries in the same window share one input
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            logger.info("Embedding %s queued queries in one request", len(unique_texts))
+            response = await self.async_client.embeddings.create(
+                model=self.embedding_model,
+                input=unique_texts
+            )
+            embeddings = {
+                text: item.embedding
+                for text, item in zip(unique_texts, sorted(response.data, key=lambda d: d.index))
+            }
+        except Exception as e:
+            logger.error(f"Error embedding query batch: {str(e)}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for text, cache_key, future in batch:
+            self._cache_embedding(cache_key, embeddings[text])
+            if not future.done():
+                future.set_result(embeddings[text])
+    
+    
     def create_embeddings_batch(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
         """
         Create embeddings for multiple texts with automatic batching
@@ -159,7 +440,97 @@ class OpenAIService:
             raise
     
     
-    def test_connection(self) -> bool:
+    async def create_embeddings_batch_async(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        as_float16: bool = False
+    ) -> List:
+        """
+        Create embeddings for many texts with large, concurrent batch requests
+        
+        Texts are split into batches of embedding_batch_size; when there is
+        more than one batch, up to embedding_max_concurrency requests run at
+        once. Output order matches input order.
+        
+        With as_float16, vectors are requested as base64 and decoded straight
+        into float16 arrays (the halfvec storage precision): no per-float
+        Python objects, and ~16x less memory than lists of floats.
+        
+        Args:
+            texts: List of texts to embed
+            batch_size: Override for the number of texts per API call
+            as_float16: Return float16 numpy arrays instead of float lists
+            
+        Returns:
+            List of embedding vectors
+            
+        Raises:
+            OpenAIError: If the API request fails
+        """
+        batch_size = min(batch_size or self.embedding_batch_size, 2048)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        semaphore = asyncio.Semaphore(self.embedding_max_concurrency)
+        
+        async def _embed_batch(batch: List[str]) -> List:
+            async with semaphore:
+                if not as_float16:
+                    response = await self.async_client.embeddings.create(
+                        model=self.embedding_model,
+                        input=batch
+                    )
+                    return [item.embedding for item in response.data]
+                
+                # An explicit encoding_format makes the SDK return the raw base64
+                response = await self.async_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=batch,
+                    encoding_format="base64"
+                )
+                return [
+                    np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32).astype(np.float16)
+                    for item in response.data
+                ]
+        
+        try:
+            logger.info(f"Creating embeddings for {len(texts)} texts in {len(batches)} batches of up to {batch_size}")
+            
+            results = await asyncio.gather(*(_embed_batch(batch) for batch in batches))
+            all_embeddings = [embedding for batch_embeddings in results for embedding in batch_embeddings]
+            
+            logger.info(f"Batch embeddings created successfully: {len(all_embeddings)} total")
+            return all_embeddings
+            
+        except OpenAIError as e:
+            logger.error(f"OpenAI API error while creating batch embeddings: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in create_embeddings_batch_async: {str(e)}")
+            raise
+    
+    
+    async def warmup(self) -> None:
+        """
+        Open a connection to the API ahead of the first user request
+        
+        Retrieves the embedding model's metadata, which costs no tokens but
+        completes the TCP/TLS (and HTTP/2) handshake for the shared pool.
+        """
+        try:
+            await self.async_client.models.retrieve(self.embedding_model)
+            logger.info(f"OpenAI connection warmed up (http2={self.http2})")
+        except Exception as e:
+            logger.warning(f"OpenAI warmup failed: {str(e)}")
+    
+    
+    async def close(self) -> None:
+        """
+        Close the async client's connection pool
+        """
+        await self.async_client.close()
+    
+    
+    async def test_connection(self) -> bool:
         """
         Test if the OpenAI API connection is working
         
@@ -172,7 +543,7 @@ class OpenAIService:
                 {"role": "user", "content": "Hi"}
             ]
             
-            _ = self.client.chat.completions.create(
+            _ = await self.async_client.chat.completions.create(
                 model=self.model,
                 messages=test_messages,
                 max_tokens=5
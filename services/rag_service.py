@@ -1,13 +1,47 @@
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
+import asyncio
+import hashlib
 import logging
+import re
 
 from services.search_service import search_service
 from services.openai_service import openai_service
+from services.semantic_cache import semantic_cache, retrieval_cache
+from database import db_manager
 from database.crud import DocumentCRUD
 
 logger = logging.getLogger(__name__)
 
+# Citations like "Source 3" in a generated answer
+_SOURCE_REF_RE = re.compile(r"Source\s+(\d+)")
+
+# Answer returned when retrieval finds nothing to ground a response on
+NO_DOCUMENTS_ANSWER = (
+    "I don't have any documents to answer your question. "
+    "Please upload documents first using the /api/v1/documents/upload endpoint."
+)
+
+# System prompt around the retrieved context. Everything before the context
+# is identical on every call, so it is built once here and the messages start
+# with a stable prefix that provider-side prompt caching can reuse.
+_SYSTEM_PROMPT_PREFIX = """You are a helpful AI assistant that answers questions based STRICTLY on provided document context.
+
+        CRITICAL RULES - DO NOT VIOLATE:
+        1. Answer ONLY using information from the CONTEXT below - DO NOT use your general knowledge
+        2. If the context doesn't contain the answer, respond: "I don't have enough information in the available documents to answer that question."
+        3. ALWAYS cite your sources using the format: "According to Source 1..." or "Source 2 states..."
+        4. If asked to list or summarize multiple documents, identify each source separately
+        5. DO NOT make up document names, content, or information that isn't in the CONTEXT
+        6. If the CONTEXT is empty or insufficient, say so - never fabricate an answer
+
+        CONTEXT FROM UPLOADED DOCUMENTS:
+        """
+_SYSTEM_PROMPT_SUFFIX = """
+
+        Remember: If it's not in the CONTEXT above, you cannot answer it. Be honest about limitations.
+        """
+
 
 class RAGService:
     """
@@ -20,6 +54,10 @@ class RAGService:
         self.openai_service = openai_service
         self.max_context_length = 6000  # Maximum characters for context
         self.max_sources = 10  # Maximum number of sources to include
+        self.semantic_cache = semantic_cache
+        self.retrieval_cache = retrieval_cache
+        # Prompt template fingerprint so prompt changes invalidate cached answers
+        self._prompt_version = hashlib.sha256(self._build_system_prompt("").encode("utf-8")).hexdigest()
         logger.info("RAG service initialized")
     
     
@@ -29,7 +67,8 @@ class RAGService:
         query: str,
         top_k: int = 5,
         document_id: Optional[str] = None,
-        use_hybrid: bool = True
+        use_hybrid: bool = True,
+        query_embedding: Optional[List[float]] = None
     ) -> Tuple[List[Dict], str]:
         """
         Retrieve relevant context for a query
@@ -40,12 +79,13 @@ class RAGService:
             top_k: Number of chunks to retrieve
             document_id: Optional filter by document
             use_hybrid: Use hybrid search (recommended)
+            query_embedding: Precomputed query embedding (skips the API call)
             
         Returns:
             Tuple of (search_results, assembled_context)
         """
         try:
-            logger.info(f"Retrieving context for query: '{query}'")
+            logger.info("Retrieving context for query: '%s'", query)
             
             # Perform search
             if use_hybrid:
@@ -54,21 +94,21 @@ class RAGService:
                     query=query,
                     top_k=top_k,
                     document_id=document_id,
-                    semantic_weight=0.7,
-                    keyword_weight=0.3
+                    query_embedding=query_embedding
                 )
             else:
                 results = self.search_service.semantic_search(
                     db=db,
                     query=query,
                     top_k=top_k,
-                    document_id=document_id
+                    document_id=document_id,
+                    query_embedding=query_embedding
                 )
             
             # Assemble context from results
             context = self._assemble_context(results)
             
-            logger.info(f"Retrieved {len(results)} chunks, context length: {len(context)} chars")
+            logger.info("Retrieved %s chunks, context length: %s chars", len(results), len(context))
             return results, context
             
         except Exception as e:
@@ -76,6 +116,63 @@ class RAGService:
             raise
     
     
+    async def _retrieve_context_cached(
+        self,
+        db: Session,
+        query: str,
+        top_k: int,
+        document_id: Optional[str],
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[Dict], str]:
+        """
+        retrieve_context (hybrid) behind the retrieval cache
+        
+        An exact query text hit skips embedding and search entirely; otherwise
+        the query is embedded (unless given) and a near-duplicate cached query
+        with the same filters is reused. Misses run retrieve_context on a
+        worker thread, since it uses the sync DB session.
+        
+        Args:
+            db: Database session
+            query: User query
+            top_k: Number of chunks to retrieve
+            document_id: Optional filter by document
+            query_embedding: Precomputed query embedding (optional)
+            
+        Returns:
+            Tuple of (search_results, assembled_context)
+        """
+        namespace = None
+        if self.retrieval_cache.enabled:
+            namespace = self.retrieval_cache.make_namespace(
+                "rag_context", await db_manager.corpus_version(), document_id, top_k
+            )
+            cached = self.retrieval_cache.get_exact(namespace, query)
+            if cached is None:
+                if query_embedding is None:
+                    query_embedding = await self.openai_service.embed_query(query)
+                cached = self.retrieval_cache.get_similar(namespace, query_embedding)
+            if cached is not None:
+                logger.info("RAG context served from retrieval cache")
+                return cached
+        
+        if query_embedding is None:
+            query_embedding = await self.openai_service.embed_query(query)
+        search_results, context = await asyncio.to_thread(
+            self.retrieve_context,
+            db=db,
+            query=query,
+            top_k=top_k,
+            document_id=document_id,
+            use_hybrid=True,
+            query_embedding=query_embedding
+        )
+        
+        if namespace is not None:
+            self.retrieval_cache.put(namespace, query, query_embedding, (search_results, context))
+        return search_results, context
+    
+    
     def _assemble_context(self, search_results: List[Dict]) -> str:
         """
         Assemble context from search results
@@ -86,27 +183,81 @@ class RAGService:
         Returns:
             Assembled context string
         """
-        context_parts = []
+        pieces = []
         total_length = 0
         
         for i, result in enumerate(search_results):
             chunk_text = result.get('text', '')
             document_name = result.get('document_name', 'Unknown')
             
-            # Create context part with source attribution
-            context_part = f"[Source {i+1}: {document_name}]\n{chunk_text}\n"
+            # Source attribution header; the part is header + text + newline
+            header = f"[Source {i+1}: {document_name}]\n"
+            part_length = len(header) + len(chunk_text) + 1
             
             # Check if adding this would exceed max length
-            if total_length + len(context_part) > self.max_context_length:
+            if total_length + part_length > self.max_context_length:
                 break
             
-            context_parts.append(context_part)
-            total_length += len(context_part)
+            # Parts are separated by a blank line
+            if pieces:
+                pieces.append("\n")
+            pieces.extend((header, chunk_text, "\n"))
+            total_length += part_length
+        
+        # Chunk text is copied once, into the final string
+        return "".join(pieces)
+    
+    
+    async def _lookup_cached_answer(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict]],
+        document_id: Optional[str],
+        top_k: int,
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[Optional[str], Optional[List[float]], Optional[Dict]]:
+        """
+        Look up a cached RAG answer (exact text first, then embedding similarity)
+        
+        Args:
+            query: User query
+            conversation_history: Previous conversation messages
+            document_id: Optional filter by document
+            top_k: Number of chunks to retrieve
+            temperature: LLM temperature
+            max_tokens: Maximum response tokens
+            
+        Returns:
+            Tuple of (cache namespace, query embedding, cached response); the
+            namespace is None when the cache is disabled, the embedding is None
+            if it wasn't needed
+        """
+        if not self.semantic_cache.enabled:
+            return None, None, None
         
-        return "\n".join(context_parts)
+        recent_history = conversation_history[-5:] if conversation_history else None
+        cache_namespace = self.semantic_cache.make_namespace(
+            await db_manager.corpus_version(),
+            self.openai_service.model,
+            self._prompt_version,
+            recent_history,
+            document_id,
+            top_k,
+            temperature,
+            max_tokens
+        )
+        query_embedding = None
+        cached = self.semantic_cache.get_exact(cache_namespace, query)
+        if cached is None:
+            query_embedding = await self.openai_service.embed_query(query)
+            cached = self.semantic_cache.get_similar(cache_namespace, query_embedding)
+        if cached is not None:
+            logger.info("RAG response served from semantic cache")
+        return cache_namespace, query_embedding, cached
     
     
-    def generate_rag_response(
+    async def generate_rag_response(
         self,
         db: Session,
         query: str,
@@ -132,47 +283,40 @@ class RAGService:
             Dictionary with response, sources, and metadata
         """
         try:
-            logger.info(f"Generating RAG response for: '{query}'")
+            logger.info("Generating RAG response for: '%s'", query)
 
-            # Step 1: Retrieve relevant context
-            search_results, context = self.retrieve_context(
+            # Step 0: Semantic cache lookup (exact text first, then embedding similarity)
+            cache_namespace, query_embedding, cached = await self._lookup_cached_answer(
+                query, conversation_history, document_id, top_k, temperature, max_tokens
+            )
+            if cached is not None:
+                return dict(cached)
+
+            # Step 1: Retrieve relevant context (retrieval cache, then search)
+            search_results, context = await self._retrieve_context_cached(
                 db=db,
                 query=query,
                 top_k=top_k,
                 document_id=document_id,
-                use_hybrid=True
+                query_embedding=query_embedding
             )
 
             # Step 1.5: Check if any documents exist
             if not search_results or len(search_results) == 0:
                 logger.warning("No documents found for RAG query")
                 return {
-                    "answer": "I don't have any documents to answer your question. Please upload documents first using the /api/v1/documents/upload endpoint.",
+                    "answer": NO_DOCUMENTS_ANSWER,
                     "sources": [],
                     "context_used": 0,
                     "model": "N/A",
                     "tokens_used": 0
                 }
 
-            # Step 2: Build prompt with context
-            system_prompt = self._build_system_prompt(context)
-            
-            # Step 3: Build messages list
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add conversation history if provided
-            if conversation_history:
-                for msg in conversation_history[-5:]:  # Last 5 messages
-                    messages.append({
-                        "role": msg.get("role", "user"),
-                        "content": msg.get("content", "")
-                    })
-            
-            # Add current query
-            messages.append({"role": "user", "content": query})
+            # Steps 2-3: Build prompt with context and messages list
+            messages = self._build_messages(context, query, conversation_history)
             
             # Step 4: Generate response
-            completion = self.openai_service.chat_completion(
+            completion = await self.openai_service.chat_completion(
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens
@@ -190,6 +334,10 @@ class RAGService:
                 "tokens_used": completion["tokens_used"]
             }
             
+            # Cache the answer for repeated / near-duplicate questions
+            if cache_namespace is not None:
+                self.semantic_cache.put(cache_namespace, query, query_embedding, dict(response))
+            
             logger.info("RAG response generated successfully")
             return response
             
@@ -198,6 +346,131 @@ class RAGService:
             raise
     
     
+    async def stream_rag_response(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict]] = None,
+        document_id: Optional[str] = None,
+        top_k: int = 5,
+        temperature: float = 0.7,
+        max_tokens: int = 500
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Generate a RAG response as a stream of events
+        
+        Retrieval runs first and its sources are emitted before any tokens,
+        so clients can render citations while the answer streams in. Answers
+        share the semantic cache with generate_rag_response: a cached answer
+        is sent as a single token, and a streamed answer is cached once done.
+        
+        Retrieval uses its own short-lived session, closed before generation
+        starts, so no connection is held (idle in transaction) while tokens
+        stream.
+        
+        Args:
+            query: User query
+            conversation_history: Previous conversation messages
+            document_id: Optional filter by document
+            top_k: Number of chunks to retrieve
+            temperature: LLM temperature
+            max_tokens: Maximum response tokens
+            
+        Yields:
+            (event, data) tuples: one "sources", any number of "token", one "done"
+        """
+        logger.info("Streaming RAG response for: '%s'", query)
+        
+        cache_namespace, query_embedding, cached = await self._lookup_cached_answer(
+            query, conversation_history, document_id, top_k, temperature, max_tokens
+        )
+        if cached is not None:
+            yield "sources", {
+                "sources": cached["sources"],
+                "context_used": cached["context_used"]
+            }
+            yield "token", {"token": cached["answer"]}
+            yield "done", {"model": cached["model"]}
+            return
+        
+        with db_manager.get_session() as db:
+            search_results, context = await self._retrieve_context_cached(
+                db=db,
+                query=query,
+                top_k=top_k,
+                document_id=document_id,
+                query_embedding=query_embedding
+            )
+        sources = self._extract_sources(search_results)
+        
+        yield "sources", {
+            "sources": sources,
+            "context_used": len(search_results)
+        }
+        
+        if not search_results:
+            logger.warning("No documents found for RAG query")
+            yield "token", {"token": NO_DOCUMENTS_ANSWER}
+            yield "done", {"model": "N/A"}
+            return
+        
+        messages = self._build_messages(context, query, conversation_history)
+        tokens = []
+        usage = {}
+        async for token in self.openai_service.chat_completion_stream(
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            usage=usage
+        ):
+            tokens.append(token)
+            yield "token", {"token": token}
+        
+        if cache_namespace is not None:
+            if query_embedding is None:
+                query_embedding = await self.openai_service.embed_query(query)
+            self.semantic_cache.put(cache_namespace, query, query_embedding, {
+                "answer": "".join(tokens),
+                "sources": sources,
+                "context_used": len(search_results),
+                "model": self.openai_service.model,
+                "tokens_used": usage.get("total_tokens", 0)
+            })
+        
+        yield "done", {"model": self.openai_service.model}
+    
+    
+    def _build_messages(
+        self,
+        context: str,
+        query: str,
+        conversation_history: Optional[List[Dict]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Build the LLM messages: system prompt with context, recent history, query
+        
+        Args:
+            context: Retrieved context string
+            query: User query
+            conversation_history: Previous conversation messages (last 5 are used)
+            
+        Returns:
+            List of message dictionaries
+        """
+        messages = [{"role": "system", "content": self._build_system_prompt(context)}]
+        
+        # Add conversation history if provided
+        if conversation_history:
+            for msg in conversation_history[-5:]:  # Last 5 messages
+                messages.append({
+                    "role": msg.get("role", "user"),
+                    "content": msg.get("content", "")
+                })
+        
+        # Add current query
+        messages.append({"role": "user", "content": query})
+        return messages
+    
+    
     def _build_system_prompt(self, context: str) -> str:
         """
         Build system prompt with context
@@ -208,21 +481,7 @@ class RAGService:
         Returns:
             System prompt string
         """
-        return f"""You are a helpful AI assistant that answers questions based STRICTLY on provided document context.
-
-        CRITICAL RULES - DO NOT VIOLATE:
-        1. Answer ONLY using information from the CONTEXT below - DO NOT use your general knowledge
-        2. If the context doesn't contain the answer, respond: "I don't have enough information in the available documents to answer that question."
-        3. ALWAYS cite your sources using the format: "According to Source 1..." or "Source 2 states..."
-        4. If asked to list or summarize multiple documents, identify each source separately
-        5. DO NOT make up document names, content, or information that isn't in the CONTEXT
-        6. If the CONTEXT is empty or insufficient, say so - never fabricate an answer
-
-        CONTEXT FROM UPLOADED DOCUMENTS:
-        {context}
-
-        Remember: If it's not in the CONTEXT above, you cannot answer it. Be honest about limitations.
-        """
+        return _SYSTEM_PROMPT_PREFIX + context + _SYSTEM_PROMPT_SUFFIX
     
     
     def _extract_sources(self, search_results: List[Dict]) -> List[Dict]:
@@ -254,7 +513,7 @@ class RAGService:
         return sources
     
     
-    def generate_rag_response_with_citations(
+    async def generate_rag_response_with_citations(
         self,
         db: Session,
         query: str,
@@ -281,7 +540,7 @@ class RAGService:
         """
         try:
             # Get base RAG response
-            rag_response = self.generate_rag_response(
+            rag_response = await self.generate_rag_response(
                 db=db,
                 query=query,
                 conversation_history=conversation_history,
@@ -324,7 +583,10 @@ class RAGService:
             "source_count": len(sources),
             "response_length": len(response),
             "avg_source_relevance": sum(s.get('relevance_score', 0) for s in sources) / len(sources) if sources else 0,
-            "contains_source_reference": any(f"Source {i+1}" in response for i in range(len(sources)))
+            "contains_source_reference": any(
+                1 <= int(number) <= len(sources)
+                for number in _SOURCE_REF_RE.findall(response)
+            )
         }
         
         # Simple quality score (0-1)
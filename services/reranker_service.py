@@ -0,0 +1,120 @@
+import heapq
+import os
+import threading
+from typing import Dict, List
+import logging
+
+import numpy as np
+
+from config import get_settings
+
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+except ImportError:  # pragma: no cover - reranking is optional
+    ort = None
+    Tokenizer = None
+
+logger = logging.getLogger(__name__)
+
+
+class RerankerService:
+    """
+    Optional cross-encoder reranking of search candidates with ONNX Runtime
+
+    Requires the onnxruntime and tokenizers packages and RERANKER_MODEL_DIR
+    pointing at a directory with model.onnx and tokenizer.json (e.g. an int8
+    export of bge-reranker-v2-m3). The inference session is created on first
+    use and shared for the life of the process.
+    """
+
+    def __init__(self):
+        """
+        Read reranker settings (the model itself is loaded lazily)
+        """
+        settings = get_settings()
+        self.model_dir = settings.reranker_model_dir
+        self.max_length = settings.reranker_max_length
+        self.candidates = settings.rerank_candidates
+        self._session = None
+        self._tokenizer = None
+        self._input_names = ()
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """
+        Whether reranking can run (dependencies installed and model present)
+        """
+        return (
+            ort is not None
+            and bool(self.model_dir)
+            and os.path.isfile(os.path.join(self.model_dir, "model.onnx"))
+        )
+
+    def _load(self):
+        with self._lock:
+            if self._session is not None:
+                return
+
+            tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+            tokenizer.enable_truncation(max_length=self.max_length)
+            tokenizer.enable_padding()
+
+            session = ort.InferenceSession(
+                os.path.join(self.model_dir, "model.onnx"),
+                providers=["CPUExecutionProvider"]
+            )
+            self._input_names = {i.name for i in session.get_inputs()}
+            self._tokenizer = tokenizer
+            self._session = session
+            logger.info(f"Reranker model loaded from {self.model_dir}")
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        Score (query, text) pairs with the cross-encoder
+
+        Args:
+            query: Search query
+            texts: Candidate texts
+
+        Returns:
+            Relevance logits, one per text (higher is more relevant)
+        """
+        if not texts:
+            return []
+        self._load()
+
+        encodings = self._tokenizer.encode_batch([(query, text) for text in texts])
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        }
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        logits = self._session.run(None, feeds)[0]
+        return logits.reshape(len(texts), -1)[:, 0].tolist()
+
+    def rerank(self, query: str, results: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Reorder search results by cross-encoder score
+
+        Args:
+            query: Search query
+            results: Search results with a "text" field
+            top_k: Number of results to keep
+
+        Returns:
+            Top top_k results, each with a "rerank_score" field
+        """
+        scores = self.score(query, [result["text"] for result in results])
+        for result, score in zip(results, scores):
+            result["rerank_score"] = round(float(score), 4)
+
+        # Same order as a full descending sort, but only keeps top_k
+        return heapq.nlargest(top_k, results, key=lambda x: x["rerank_score"])
+
+
+# Create singleton instance
+reranker_service = RerankerService()
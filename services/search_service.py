@@ -1,14 +1,33 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict, Tuple
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+import itertools
 import logging
+import numpy as np
 
+from config import get_settings
+from database import db_manager
 from database.crud import ChunkCRUD, DocumentCRUD
-from database.models import DocumentChunk, Document
+from database.models import DocumentChunk
+from services.document_cache import document_metadata_cache, DocumentInfo
 from services.openai_service import openai_service
+from services.reranker_service import reranker_service
+from services.semantic_cache import retrieval_cache
+from services.timing import search_timings
 
 logger = logging.getLogger(__name__)
 
+# Hybrid search weights when the caller doesn't set them
+DEFAULT_SEMANTIC_WEIGHT = 0.7
+DEFAULT_KEYWORD_WEIGHT = 0.3
+
+# Runs the keyword branch of synchronous hybrid searches alongside the
+# semantic branch (each on its own session)
+_KEYWORD_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="keyword-search")
+
 
 class SearchService:
     """
@@ -17,16 +36,112 @@ class SearchService:
     
     def __init__(self):
         self.openai_service = openai_service
+        self.reranker_service = reranker_service
+        self.retrieval_cache = retrieval_cache
+        self.query_routing = get_settings().hybrid_query_routing
         logger.info("Search service initialized")
     
     
+    @staticmethod
+    def _format_result(
+        chunk: DocumentChunk,
+        document: Optional[DocumentInfo],
+        score_field: str,
+        score: float
+    ) -> Dict:
+        """
+        Shape a matched chunk and its document into a search result
+        
+        Args:
+            chunk: Matched chunk
+            document: The chunk's document (None if it no longer exists)
+            score_field: Result key for the score
+            score: Similarity or relevance score
+            
+        Returns:
+            Search result dictionary
+        """
+        return {
+            "chunk_id": chunk.chunk_id,
+            "document_id": chunk.document_id,
+            "document_name": document.filename if document else "Unknown",
+            "text": chunk.chunk_text,
+            "chunk_index": chunk.chunk_index,
+            score_field: round(score, 4),
+            "chunk_size": chunk.chunk_size,
+            "metadata": {
+                "file_type": document.file_type if document else None,
+                "uploaded_at": document.uploaded_at.isoformat() if document and document.uploaded_at else None
+            }
+        }
+    
+    
+    def _format_results(
+        self,
+        db: Session,
+        rows: List[tuple],
+        score_field: str
+    ) -> List[Dict]:
+        """
+        Format (chunk, score) rows, loading uncached documents in one query
+        
+        Args:
+            db: Database session
+            rows: (DocumentChunk, score) rows
+            score_field: Result key for the score
+            
+        Returns:
+            List of search result dictionaries
+        """
+        document_ids = {chunk.document_id for chunk, _ in rows}
+        documents = document_metadata_cache.get_many(document_ids)
+        missing = [document_id for document_id in document_ids if document_id not in documents]
+        if missing:
+            loaded = DocumentCRUD.get_documents_by_ids(db, missing)
+            documents.update(document_metadata_cache.put_many(loaded.values()))
+        return [
+            self._format_result(chunk, documents.get(chunk.document_id), score_field, score)
+            for chunk, score in rows
+        ]
+    
+    
+    async def _format_results_async(
+        self,
+        db: AsyncSession,
+        rows: List[tuple],
+        score_field: str
+    ) -> List[Dict]:
+        """
+        Format (chunk, score) rows, loading uncached documents in one query
+        
+        Args:
+            db: Async database session
+            rows: (DocumentChunk, score) rows
+            score_field: Result key for the score
+            
+        Returns:
+            List of search result dictionaries
+        """
+        document_ids = {chunk.document_id for chunk, _ in rows}
+        documents = document_metadata_cache.get_many(document_ids)
+        missing = [document_id for document_id in document_ids if document_id not in documents]
+        if missing:
+            loaded = await DocumentCRUD.get_documents_by_ids_async(db, missing)
+            documents.update(document_metadata_cache.put_many(loaded.values()))
+        return [
+            self._format_result(chunk, documents.get(chunk.document_id), score_field, score)
+            for chunk, score in rows
+        ]
+    
+    
     def semantic_search(
         self,
         db: Session,
         query: str,
         top_k: int = 5,
         document_id: Optional[str] = None,
-        min_similarity: float = 0.0
+        min_similarity: float = 0.0,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict]:
         """
         Perform semantic search using vector similarity
@@ -37,50 +152,33 @@ class SearchService:
             top_k: Number of results to return
             document_id: Optional filter by document
             min_similarity: Minimum similarity threshold (0.0 to 1.0)
+            query_embedding: Precomputed query embedding (skips the API call)
             
         Returns:
             List of search results with metadata
         """
         try:
-            logger.info(f"Semantic search: '{query}' (top_k={top_k})")
+            logger.info("Semantic search: '%s' (top_k=%s)", query, top_k)
             
-            # Generate query embedding
-            query_embedding = self.openai_service.create_embedding(query)
+            # Generate query embedding unless the caller already has one
+            if query_embedding is None:
+                with search_timings.measure("embed_ms"):
+                    query_embedding = self.openai_service.create_embedding(query)
             
             # Search for similar chunks
-            results = ChunkCRUD.search_similar_chunks(
-                db=db,
-                query_embedding=query_embedding,
-                limit=top_k * 2,  # Get more results for filtering
-                document_id=document_id
-            )
+            with search_timings.measure("semantic_sql_ms"):
+                results = ChunkCRUD.search_similar_chunks(
+                    db=db,
+                    query_embedding=query_embedding,
+                    limit=top_k,
+                    document_id=document_id,
+                    min_similarity=min_similarity
+                )
+            
+            # Format results (document and similarity filters ran in SQL)
+            formatted_results = self._format_results(db, results, "similarity_score")
             
-            # Filter by minimum similarity and format results
-            formatted_results = []
-            for chunk, similarity in results:
-                if similarity >= min_similarity:
-                    # Get document info
-                    document = DocumentCRUD.get_document_by_id(db, chunk.document_id)
-                    
-                    result = {
-                        "chunk_id": chunk.chunk_id,
-                        "document_id": chunk.document_id,
-                        "document_name": document.filename if document else "Unknown",
-                        "text": chunk.chunk_text,
-                        "chunk_index": chunk.chunk_index,
-                        "similarity_score": round(similarity, 4),
-                        "chunk_size": chunk.chunk_size,
-                        "metadata": {
-                            "file_type": document.file_type if document else None,
-                            "uploaded_at": document.uploaded_at.isoformat() if document and document.uploaded_at else None
-                        }
-                    }
-                    formatted_results.append(result)
-                    
-                    if len(formatted_results) >= top_k:
-                        break
-            
-            logger.info(f"Found {len(formatted_results)} results")
+            logger.info("Found %s results", len(formatted_results))
             return formatted_results
             
         except Exception as e:
@@ -96,7 +194,7 @@ class SearchService:
         document_id: Optional[str] = None
     ) -> List[Dict]:
         """
-        Perform keyword-based search using text matching
+        Perform keyword-based search using Postgres full-text search
         
         Args:
             db: Database session
@@ -108,54 +206,136 @@ class SearchService:
             List of search results with metadata
         """
         try:
-            logger.info(f"Keyword search: '{query}' (top_k={top_k})")
+            logger.info("Keyword search: '%s' (top_k=%s)", query, top_k)
+            
+            # Matching and ranking run in Postgres over the GIN-indexed tsvector
+            with search_timings.measure("keyword_sql_ms"):
+                results = ChunkCRUD.search_keyword_chunks(
+                    db=db,
+                    query=query,
+                    limit=top_k,
+                    document_id=document_id
+                )
             
-            # Convert query to lowercase for case-insensitive search
-            search_term = f"%{query.lower()}%"
+            # Format results
+            formatted_results = self._format_results(db, results, "relevance_score")
             
-            # Query database for text matches
-            from sqlalchemy import func
+            logger.info("Found %s keyword matches", len(formatted_results))
+            return formatted_results
             
-            query_obj = db.query(DocumentChunk).filter(
-                func.lower(DocumentChunk.chunk_text).like(search_term)
-            )
+        except Exception as e:
+            logger.error(f"Keyword search failed: {str(e)}")
+            raise
+    
+    
+    async def semantic_search_async(
+        self,
+        db: AsyncSession,
+        query: str,
+        top_k: int = 5,
+        document_id: Optional[str] = None,
+        min_similarity: float = 0.0,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict]:
+        """
+        semantic_search on the async (asyncpg) session
+        
+        Results are cached in the retrieval cache: an exact query text hit
+        skips embedding and search, and a near-duplicate query (by embedding)
+        with the same filters skips the vector search.
+        
+        Args:
+            db: Async database session
+            query: Search query text
+            top_k: Number of results to return
+            document_id: Optional filter by document
+            min_similarity: Minimum similarity threshold (0.0 to 1.0)
+            query_embedding: Precomputed query embedding (skips the API call)
+            
+        Returns:
+            List of search results with metadata
+        """
+        try:
+            logger.info("Semantic search: '%s' (top_k=%s)", query, top_k)
             
-            if document_id:
-                query_obj = query_obj.filter(DocumentChunk.document_id == document_id)
+            namespace = None
+            if self.retrieval_cache.enabled:
+                namespace = self.retrieval_cache.make_namespace(
+                    "semantic", await db_manager.corpus_version(), document_id, top_k, min_similarity
+                )
+                cached = self.retrieval_cache.get_exact(namespace, query)
+                if cached is None:
+                    if query_embedding is None:
+                        with search_timings.measure("embed_ms"):
+                            query_embedding = await self.openai_service.embed_query(query)
+                    cached = self.retrieval_cache.get_similar(namespace, query_embedding)
+                if cached is not None:
+                    logger.info("Semantic search served from retrieval cache")
+                    # Callers may annotate results, so hand out copies
+                    return [dict(result) for result in cached]
+            
+            if query_embedding is None:
+                with search_timings.measure("embed_ms"):
+                    query_embedding = await self.openai_service.embed_query(query)
+            
+            with search_timings.measure("semantic_sql_ms"):
+                results = await ChunkCRUD.search_similar_chunks_async(
+                    db=db,
+                    query_embedding=query_embedding,
+                    limit=top_k,
+                    document_id=document_id,
+                    min_similarity=min_similarity
+                )
             
-            chunks = query_obj.order_by(DocumentChunk.chunk_index).limit(top_k * 2).all()
+            formatted_results = await self._format_results_async(db, results, "similarity_score")
             
-            # Format results
-            formatted_results = []
-            for chunk in chunks:
-                document = DocumentCRUD.get_document_by_id(db, chunk.document_id)
-                
-                # Calculate simple relevance score based on query term frequency
-                text_lower = chunk.chunk_text.lower()
-                query_lower = query.lower()
-                frequency = text_lower.count(query_lower)
-                relevance = min(frequency / 10.0, 1.0)  # Normalize to 0-1
-                
-                result = {
-                    "chunk_id": chunk.chunk_id,
-                    "document_id": chunk.document_id,
-                    "document_name": document.filename if document else "Unknown",
-                    "text": chunk.chunk_text,
-                    "chunk_index": chunk.chunk_index,
-                    "relevance_score": round(relevance, 4),
-                    "chunk_size": chunk.chunk_size,
-                    "match_count": frequency,
-                    "metadata": {
-                        "file_type": document.file_type if document else None,
-                        "uploaded_at": document.uploaded_at.isoformat() if document and document.uploaded_at else None
-                    }
-                }
-                formatted_results.append(result)
-                
-                if len(formatted_results) >= top_k:
-                    break
-            
-            logger.info(f"Found {len(formatted_results)} keyword matches")
+            if namespace is not None:
+                self.retrieval_cache.put(
+                    namespace, query, query_embedding,
+                    [dict(result) for result in formatted_results]
+                )
+            
+            logger.info("Found %s results", len(formatted_results))
+            return formatted_results
+            
+        except Exception as e:
+            logger.error(f"Semantic search failed: {str(e)}")
+            raise
+    
+    
+    async def keyword_search_async(
+        self,
+        db: AsyncSession,
+        query: str,
+        top_k: int = 5,
+        document_id: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        keyword_search on the async (asyncpg) session
+        
+        Args:
+            db: Async database session
+            query: Search query text
+            top_k: Number of results to return
+            document_id: Optional filter by document
+            
+        Returns:
+            List of search results with metadata
+        """
+        try:
+            logger.info("Keyword search: '%s' (top_k=%s)", query, top_k)
+            
+            with search_timings.measure("keyword_sql_ms"):
+                results = await ChunkCRUD.search_keyword_chunks_async(
+                    db=db,
+                    query=query,
+                    limit=top_k,
+                    document_id=document_id
+                )
+            
+            formatted_results = await self._format_results_async(db, results, "relevance_score")
+            
+            logger.info("Found %s keyword matches", len(formatted_results))
             return formatted_results
             
         except Exception as e:
@@ -163,108 +343,114 @@ class SearchService:
             raise
     
     
+    def route_query(
+        self,
+        query: str,
+        semantic_weight: Optional[float] = None,
+        keyword_weight: Optional[float] = None
+    ) -> Tuple[bool, float, float]:
+        """
+        Decide whether a hybrid search needs its keyword branch, and its weights
+        
+        Weights the caller sets are used as given (a keyword weight of 0 skips
+        the keyword branch). When neither is set, the defaults (0.7 / 0.3)
+        are adapted to the query: queries of 7+ words or containing '?' are
+        natural-language questions that full-text matching (every term must
+        appear) rarely hits, so they run semantic-only; 1-3 word queries look
+        like exact-match lookups and weight keyword 0.6 / semantic 0.4.
+        
+        Args:
+            query: Search query text
+            semantic_weight: Requested semantic weight (None for the default)
+            keyword_weight: Requested keyword weight (None for the default)
+            
+        Returns:
+            (run keyword branch, semantic weight, keyword weight) as applied
+        """
+        if semantic_weight is not None or keyword_weight is not None or not self.query_routing:
+            if semantic_weight is None:
+                semantic_weight = DEFAULT_SEMANTIC_WEIGHT
+            if keyword_weight is None:
+                keyword_weight = DEFAULT_KEYWORD_WEIGHT
+            return keyword_weight > 0, semantic_weight, keyword_weight
+        
+        token_count = len(query.split())
+        if token_count >= 7 or "?" in query:
+            return False, DEFAULT_SEMANTIC_WEIGHT, 0.0
+        if 1 <= token_count <= 3:
+            return True, 0.4, 0.6
+        return True, DEFAULT_SEMANTIC_WEIGHT, DEFAULT_KEYWORD_WEIGHT
+    
+    
     def hybrid_search(
         self,
         db: Session,
         query: str,
         top_k: int = 5,
         document_id: Optional[str] = None,
-        semantic_weight: float = 0.7,
-        keyword_weight: float = 0.3,
-        min_similarity: float = 0.0
+        semantic_weight: Optional[float] = None,
+        keyword_weight: Optional[float] = None,
+        min_similarity: float = 0.0,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict]:
         """
         Perform hybrid search combining semantic and keyword search
         
+        The keyword branch runs on a worker thread (with its own session)
+        while the semantic branch runs on this one, so latency is the slower
+        branch rather than the sum of both. Weights are adjusted (and the
+        keyword branch possibly skipped) by route_query.
+        
         Args:
             db: Database session
             query: Search query text
             top_k: Number of results to return
             document_id: Optional filter by document
-            semantic_weight: Weight for semantic search (0.0 to 1.0)
-            keyword_weight: Weight for keyword search (0.0 to 1.0)
+            semantic_weight: Weight for semantic search (0.0 to 1.0; None
+                lets route_query pick it)
+            keyword_weight: Weight for keyword search (0.0 to 1.0; None
+                lets route_query pick it)
             min_similarity: Minimum similarity threshold for semantic results
+            query_embedding: Precomputed query embedding (skips the API call)
             
         Returns:
             List of search results ranked by combined score
         """
         try:
-            logger.info(f"Hybrid search: '{query}' (semantic_w={semantic_weight}, keyword_w={keyword_weight})")
-            
-            # Normalize weights
-            total_weight = semantic_weight + keyword_weight
-            if total_weight > 0:
-                semantic_weight = semantic_weight / total_weight
-                keyword_weight = keyword_weight / total_weight
-            
-            # Get semantic results
+            use_keyword, semantic_weight, keyword_weight = self.route_query(
+                query, semantic_weight, keyword_weight
+            )
+            logger.info("Hybrid search: '%s' (semantic_w=%s, keyword_w=%s)", query, semantic_weight, keyword_weight)
+            
+            # Start keyword results, then get semantic results meanwhile
+            keyword_future = None
+            if use_keyword:
+                keyword_future = _KEYWORD_EXECUTOR.submit(
+                    self._keyword_search_in_session,
+                    query=query,
+                    top_k=top_k * 2,
+                    document_id=document_id
+                )
             semantic_results = self.semantic_search(
                 db=db,
                 query=query,
                 top_k=top_k * 2,
                 document_id=document_id,
-                min_similarity=min_similarity
-            )
-            
-            # Get keyword results
-            keyword_results = self.keyword_search(
-                db=db,
-                query=query,
-                top_k=top_k * 2,
-                document_id=document_id
+                min_similarity=min_similarity,
+                query_embedding=query_embedding
             )
-            
-            # Combine results by chunk_id
-            combined_scores = {}
-            
-            # Add semantic scores
-            for result in semantic_results:
-                chunk_id = result["chunk_id"]
-                combined_scores[chunk_id] = {
-                    "result": result,
-                    "semantic_score": result["similarity_score"],
-                    "keyword_score": 0.0
-                }
-            
-            # Add/update with keyword scores
-            for result in keyword_results:
-                chunk_id = result["chunk_id"]
-                if chunk_id in combined_scores:
-                    combined_scores[chunk_id]["keyword_score"] = result["relevance_score"]
-                else:
-                    combined_scores[chunk_id] = {
-                        "result": result,
-                        "semantic_score": 0.0,
-                        "keyword_score": result["relevance_score"]
-                    }
-            
-            # Calculate combined scores
-            ranked_results = []
-            for chunk_id, data in combined_scores.items():
-                combined_score = (
-                    data["semantic_score"] * semantic_weight +
-                    data["keyword_score"] * keyword_weight
+            keyword_results = keyword_future.result() if keyword_future is not None else []
+            
+            with search_timings.measure("fusion_ms"):
+                final_results = self._combine_results(
+                    semantic_results,
+                    keyword_results,
+                    top_k,
+                    semantic_weight,
+                    keyword_weight
                 )
-                
-                result = data["result"].copy()
-                result["combined_score"] = round(combined_score, 4)
-                result["semantic_score"] = round(data["semantic_score"], 4)
-                result["keyword_score"] = round(data["keyword_score"], 4)
-                
-                # Remove individual scores if they were added
-                result.pop("similarity_score", None)
-                result.pop("relevance_score", None)
-                result.pop("match_count", None)
-                
-                ranked_results.append(result)
-            
-            # Sort by combined score
-            ranked_results.sort(key=lambda x: x["combined_score"], reverse=True)
-            
-            # Return top_k results
-            final_results = ranked_results[:top_k]
-            
-            logger.info(f"Hybrid search returned {len(final_results)} results")
+            
+            logger.info("Hybrid search returned %s results", len(final_results))
             return final_results
             
         except Exception as e:
@@ -272,6 +458,191 @@ class SearchService:
             raise
     
     
+    @staticmethod
+    def _combine_results(
+        semantic_results: List[Dict],
+        keyword_results: List[Dict],
+        top_k: int,
+        semantic_weight: float,
+        keyword_weight: float
+    ) -> List[Dict]:
+        """
+        Merge semantic and keyword results into one ranking by weighted score
+        
+        Args:
+            semantic_results: Results from semantic_search
+            keyword_results: Results from keyword_search
+            top_k: Number of results to return
+            semantic_weight: Weight for semantic scores
+            keyword_weight: Weight for keyword scores
+            
+        Returns:
+            Top top_k results ranked by combined score
+        """
+        # Normalize weights
+        total_weight = semantic_weight + keyword_weight
+        if total_weight > 0:
+            semantic_weight = semantic_weight / total_weight
+            keyword_weight = keyword_weight / total_weight
+        
+        if top_k <= 0:
+            return []
+        
+        # Align both score lists on one candidate index (semantic order first)
+        index_by_chunk: Dict[str, int] = {}
+        candidates: List[Dict] = []
+        for result in itertools.chain(semantic_results, keyword_results):
+            if result["chunk_id"] not in index_by_chunk:
+                index_by_chunk[result["chunk_id"]] = len(candidates)
+                candidates.append(result)
+        
+        semantic_scores = np.zeros(len(candidates))
+        keyword_scores = np.zeros(len(candidates))
+        for result in semantic_results:
+            semantic_scores[index_by_chunk[result["chunk_id"]]] = result["similarity_score"]
+        for result in keyword_results:
+            keyword_scores[index_by_chunk[result["chunk_id"]]] = result["relevance_score"]
+        
+        combined = semantic_scores * semantic_weight + keyword_scores * keyword_weight
+        # Rank on the reported (4 decimal) score so near-ties keep candidate order
+        rank_scores = np.round(combined, 4)
+        
+        # Select the top_k with a linear-time partition instead of sorting
+        # everything, then order just those; ties keep candidate order
+        winners = np.arange(len(candidates))
+        if len(candidates) > top_k:
+            cutoff = -np.partition(-rank_scores, top_k - 1)[top_k - 1]
+            above = np.flatnonzero(rank_scores > cutoff)
+            tied = np.flatnonzero(rank_scores == cutoff)[:top_k - len(above)]
+            winners = np.concatenate((above, tied))
+        winners = winners[np.lexsort((winners, -rank_scores[winners]))]
+        
+        # Build result dicts for the winners only
+        ranked_results = []
+        for i in winners.tolist():
+            result = candidates[i].copy()
+            result["combined_score"] = round(float(combined[i]), 4)
+            result["semantic_score"] = round(float(semantic_scores[i]), 4)
+            result["keyword_score"] = round(float(keyword_scores[i]), 4)
+            
+            # Remove individual scores if they were added
+            result.pop("similarity_score", None)
+            result.pop("relevance_score", None)
+            
+            ranked_results.append(result)
+        
+        return ranked_results
+    
+    
+    def _keyword_search_in_session(self, **kwargs) -> List[Dict]:
+        """
+        Run keyword_search on its own session
+        
+        Lets the keyword query run on another thread while the semantic
+        branch uses the caller's session (a Session isn't thread-safe).
+        """
+        with db_manager.get_session() as db:
+            return self.keyword_search(db=db, **kwargs)
+    
+    
+    async def _keyword_search_in_session_async(self, **kwargs) -> List[Dict]:
+        """
+        Run keyword_search_async on its own async session
+        
+        An AsyncSession can't run two queries at once, so the keyword branch
+        of a hybrid search gets a separate session (and connection).
+        """
+        async with db_manager.AsyncSessionLocal() as db:
+            return await self.keyword_search_async(db=db, **kwargs)
+    
+    
+    async def hybrid_search_async(
+        self,
+        db: AsyncSession,
+        query: str,
+        top_k: int = 5,
+        document_id: Optional[str] = None,
+        semantic_weight: Optional[float] = None,
+        keyword_weight: Optional[float] = None,
+        min_similarity: float = 0.0,
+        query_embedding: Optional[List[float]] = None,
+        rerank: bool = False
+    ) -> List[Dict]:
+        """
+        Hybrid search with the semantic and keyword branches run concurrently
+        
+        The keyword query starts immediately (on its own async session) while
+        the query is embedded and the vector search runs, so latency is the
+        slower branch rather than the sum of both. Weights are adjusted (and
+        the keyword branch possibly skipped) by route_query.
+        
+        Args:
+            db: Async database session (used by the semantic branch)
+            query: Search query text
+            top_k: Number of results to return
+            document_id: Optional filter by document
+            semantic_weight: Weight for semantic search (0.0 to 1.0; None
+                lets route_query pick it)
+            keyword_weight: Weight for keyword search (0.0 to 1.0; None
+                lets route_query pick it)
+            min_similarity: Minimum similarity threshold for semantic results
+            query_embedding: Precomputed query embedding (skips the API call)
+            rerank: Fetch rerank_candidates results and reorder them with the
+                cross-encoder before truncating to top_k
+            
+        Returns:
+            List of search results ranked by combined (or rerank) score
+        """
+        use_keyword, semantic_weight, keyword_weight = self.route_query(
+            query, semantic_weight, keyword_weight
+        )
+        logger.info("Hybrid search: '%s' (semantic_w=%s, keyword_w=%s)", query, semantic_weight, keyword_weight)
+        
+        final_k = top_k
+        if rerank:
+            top_k = max(top_k, self.reranker_service.candidates)
+        
+        semantic_search = self.semantic_search_async(
+            db=db,
+            query=query,
+            top_k=top_k * 2,
+            document_id=document_id,
+            min_similarity=min_similarity,
+            query_embedding=query_embedding
+        )
+        if use_keyword:
+            semantic_results, keyword_results = await asyncio.gather(
+                semantic_search,
+                self._keyword_search_in_session_async(
+                    query=query,
+                    top_k=top_k * 2,
+                    document_id=document_id
+                )
+            )
+        else:
+            semantic_results = await semantic_search
+            keyword_results = []
+        
+        with search_timings.measure("fusion_ms"):
+            final_results = self._combine_results(
+                semantic_results,
+                keyword_results,
+                top_k,
+                semantic_weight,
+                keyword_weight
+            )
+        
+        if rerank:
+            # Cross-encoder inference is CPU-bound; keep it off the event loop
+            with search_timings.measure("rerank_ms"):
+                final_results = await asyncio.to_thread(
+                    self.reranker_service.rerank, query, final_results, final_k
+                )
+        
+        logger.info("Hybrid search returned %s results", len(final_results))
+        return final_results
+    
+    
     def search_with_context(
         self,
         db: Session,
@@ -297,31 +668,40 @@ class SearchService:
             # Perform hybrid search
             results = self.hybrid_search(db=db, query=query, top_k=top_k, **kwargs)
             
-            # Add context for each result
-            for result in results:
-                document_id = result["document_id"]
-                chunk_index = result["chunk_index"]
-                
-                # Get surrounding chunks
-                context_chunks = []
-                
-                # Get all chunks for this document
-                all_chunks = ChunkCRUD.get_chunks_by_document(db, document_id)
-                
-                # Find chunks within context window
-                for chunk in all_chunks:
-                    if (chunk_index - context_window <= chunk.chunk_index <= chunk_index + context_window):
-                        if chunk.chunk_index != chunk_index:  # Don't include the main chunk
-                            context_chunks.append({
-                                "chunk_index": chunk.chunk_index,
-                                "text": chunk.chunk_text,
-                                "position": "before" if chunk.chunk_index < chunk_index else "after"
-                            })
-                
-                # Sort context chunks by index
-                context_chunks.sort(key=lambda x: x["chunk_index"])
-                result["context"] = context_chunks
+            self._attach_context(db, results, context_window)
+            return results
+            
+        except Exception as e:
+            logger.error(f"Search with context failed: {str(e)}")
+            raise
+    
+    
+    async def search_with_context_async(
+        self,
+        db: AsyncSession,
+        query: str,
+        top_k: int = 5,
+        context_window: int = 1,
+        **kwargs
+    ) -> List[Dict]:
+        """
+        search_with_context built on hybrid_search_async
+        
+        Args:
+            db: Async database session
+            query: Search query text
+            top_k: Number of results to return
+            context_window: Number of chunks before/after to include
+            **kwargs: Additional hybrid_search_async parameters
             
+        Returns:
+            List of search results with context chunks
+        """
+        try:
+            results = await self.hybrid_search_async(db=db, query=query, top_k=top_k, **kwargs)
+            ranges = self._context_ranges(results, context_window)
+            rows = await ChunkCRUD.get_chunk_texts_in_ranges_async(db, ranges)
+            self._assign_context(results, rows, context_window)
             return results
             
         except Exception as e:
@@ -329,9 +709,77 @@ class SearchService:
             raise
     
     
+    @staticmethod
+    def _attach_context(db: Session, results: List[Dict], context_window: int) -> None:
+        """
+        Add the surrounding chunks of each result under result["context"]
+        
+        Args:
+            db: Database session
+            results: Search results to update in place
+            context_window: Number of chunks before/after to include
+        """
+        ranges = SearchService._context_ranges(results, context_window)
+        rows = ChunkCRUD.get_chunk_texts_in_ranges(db, ranges)
+        SearchService._assign_context(results, rows, context_window)
+    
+    
+    @staticmethod
+    def _context_ranges(results: List[Dict], context_window: int) -> List[Tuple[str, int, int]]:
+        """
+        Collect the chunk_index range around each result, merging overlapping
+        ranges within a document, so they can be loaded in one query
+        """
+        spans: Dict[str, List[Tuple[int, int]]] = {}
+        for result in results:
+            spans.setdefault(result["document_id"], []).append((
+                max(result["chunk_index"] - context_window, 0),
+                result["chunk_index"] + context_window
+            ))
+        
+        ranges = []
+        for document_id, document_spans in spans.items():
+            document_spans.sort()
+            first, last = document_spans[0]
+            for next_first, next_last in document_spans[1:]:
+                if next_first > last + 1:
+                    ranges.append((document_id, first, last))
+                    first = next_first
+                last = max(last, next_last)
+            ranges.append((document_id, first, last))
+        return ranges
+    
+    
+    @staticmethod
+    def _assign_context(results: List[Dict], rows: List[tuple], context_window: int) -> None:
+        """
+        Set result["context"] from (document_id, chunk_index, chunk_text) rows
+        """
+        texts = {
+            (document_id, chunk_index): chunk_text
+            for document_id, chunk_index, chunk_text in rows
+        }
+        
+        for result in results:
+            document_id = result["document_id"]
+            chunk_index = result["chunk_index"]
+            
+            context_chunks = []
+            for index in range(chunk_index - context_window, chunk_index + context_window + 1):
+                text = texts.get((document_id, index))
+                if index != chunk_index and text is not None:
+                    context_chunks.append({
+                        "chunk_index": index,
+                        "text": text,
+                        "position": "before" if index < chunk_index else "after"
+                    })
+            
+            result["context"] = context_chunks
+    
+    
     def get_search_statistics(self, db: Session) -> Dict:
         """
-        Get statistics about searchable content
+        Get statistics about searchable content and search latency
         
         Args:
             db: Database session
@@ -357,7 +805,9 @@ class SearchService:
                 "average_chunks_per_document": round(
                     total_chunks / total_documents if total_documents > 0 else 0,
                     2
-                )
+                ),
+                # Per-stage latency percentiles (ms) over recent searches
+                "timings": search_timings.summary()
             }
             
             return stats
@@ -0,0 +1,256 @@
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Set
+import logging
+
+import numpy as np
+
+from config import get_settings
+from services.similarity import masked_similarities
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    In-process semantic cache mapping query embeddings to responses
+
+    Two tiers:
+    - Exact: SHA-256 of (namespace, query text) -> slot
+    - Semantic: cosine similarity of the query embedding against all cached
+      embeddings in the same namespace, hit when >= threshold
+
+    Embeddings live in a preallocated float32 matrix so a lookup is a single
+    pass over it (see services.similarity); namespaces are stored as integer
+    ids so the namespace filter runs inside that pass rather than in Python.
+    With SEMANTIC_CACHE_LSH_TABLES > 0, semantic lookups only score entries
+    sharing a random-projection LSH bucket with the query in at least one
+    table. When full, the least recently used slot is evicted.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        threshold: Optional[float] = None,
+        dimension: Optional[int] = None
+    ):
+        """
+        Initialize an empty cache (defaults come from settings)
+
+        Args:
+            max_size: Maximum number of cached entries
+            threshold: Minimum cosine similarity for a semantic hit
+            dimension: Embedding dimension
+        """
+        settings = get_settings()
+        max_size = max_size or settings.semantic_cache_size
+        self.max_size = max_size
+        self.threshold = threshold if threshold is not None else settings.semantic_cache_threshold
+        self.enabled = settings.semantic_cache_enabled
+        dimension = dimension or settings.embedding_dimension
+        self._embeddings = np.zeros((max_size, dimension), dtype=np.float32)
+        self._namespace_ids = np.full(max_size, -1, dtype=np.int64)
+        self._namespace_index: Dict[str, int] = {}
+        self._exact_keys: List[Optional[str]] = [None] * max_size
+        self._values: List[Any] = [None] * max_size
+        self._last_used = np.zeros(max_size, dtype=np.int64)
+        self._exact_index: Dict[str, int] = {}
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+
+        # LSH prefilter: L tables of K-bit sign signatures (fixed seed, so
+        # signatures are stable for the life of the process)
+        self._lsh_tables = settings.semantic_cache_lsh_tables
+        self._lsh_bits = settings.semantic_cache_lsh_bits
+        if self._lsh_tables > 0:
+            rng = np.random.default_rng(0)
+            self._lsh_planes = rng.standard_normal(
+                (self._lsh_tables * self._lsh_bits, dimension)
+            ).astype(np.float32)
+            self._lsh_weights = 1 << np.arange(self._lsh_bits, dtype=np.int64)
+            self._signatures = np.zeros((max_size, self._lsh_tables), dtype=np.int64)
+            self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(self._lsh_tables)]
+        logger.info(f"Semantic cache initialized (size={self.max_size}, threshold={self.threshold})")
+
+    @staticmethod
+    def make_namespace(*parts: Any) -> str:
+        """
+        Build a namespace key so entries only match under identical settings
+
+        Args:
+            *parts: Values that affect the response (model, prompt, parameters...)
+
+        Returns:
+            Hex digest identifying the namespace
+        """
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _exact_key(namespace: str, query: str) -> str:
+        return hashlib.sha256(f"{namespace}\x00{query}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _touch(self, slot: int) -> Any:
+        self._clock += 1
+        self._last_used[slot] = self._clock
+        return self._values[slot]
+
+    def _signature(self, vector: np.ndarray) -> np.ndarray:
+        bits = (self._lsh_planes @ vector > 0).reshape(self._lsh_tables, self._lsh_bits)
+        return bits @ self._lsh_weights
+
+    def _lsh_remove(self, slot: int) -> None:
+        for table, key in zip(self._buckets, self._signatures[slot].tolist()):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.discard(slot)
+                if not bucket:
+                    del table[key]
+
+    def _lsh_add(self, slot: int, vector: np.ndarray) -> None:
+        signature = self._signature(vector)
+        self._signatures[slot] = signature
+        for table, key in zip(self._buckets, signature.tolist()):
+            table.setdefault(key, set()).add(slot)
+
+    def _lsh_candidates(self, vector: np.ndarray) -> np.ndarray:
+        candidates: Set[int] = set()
+        for table, key in zip(self._buckets, self._signature(vector).tolist()):
+            candidates.update(table.get(key, ()))
+        return np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+
+    def _namespace_id(self, namespace: str) -> int:
+        # Ids of evicted namespaces are dropped once the index outgrows the
+        # cache, so it stays bounded no matter how many namespaces are seen
+        if namespace not in self._namespace_index and len(self._namespace_index) >= 2 * self.max_size:
+            names = {ns_id: ns for ns, ns_id in self._namespace_index.items()}
+            self._namespace_index = {}
+            for slot in range(self._size):
+                self._namespace_ids[slot] = self._namespace_index.setdefault(
+                    names[int(self._namespace_ids[slot])], len(self._namespace_index)
+                )
+        return self._namespace_index.setdefault(namespace, len(self._namespace_index))
+
+    def get_exact(self, namespace: str, query: str) -> Optional[Any]:
+        """
+        Look up a response by exact query text (no embedding needed)
+
+        Args:
+            namespace: Namespace key from make_namespace()
+            query: Query text
+
+        Returns:
+            Cached response or None
+        """
+        with self._lock:
+            slot = self._exact_index.get(self._exact_key(namespace, query))
+            return self._touch(slot) if slot is not None else None
+
+    def get_similar(self, namespace: str, embedding: List[float]) -> Optional[Any]:
+        """
+        Look up a response by embedding similarity
+
+        Args:
+            namespace: Namespace key from make_namespace()
+            embedding: Query embedding
+
+        Returns:
+            Cached response of the most similar entry above threshold, or None
+        """
+        query_vector = self._normalize(embedding)
+
+        with self._lock:
+            namespace_id = self._namespace_index.get(namespace)
+            if self._size == 0 or namespace_id is None:
+                return None
+
+            if self._lsh_tables > 0:
+                slots = self._lsh_candidates(query_vector)
+                if slots.size == 0:
+                    return None
+                similarities = masked_similarities(
+                    self._embeddings[slots],
+                    query_vector,
+                    self._namespace_ids[slots],
+                    namespace_id
+                )
+            else:
+                slots = None
+                similarities = masked_similarities(
+                    self._embeddings[:self._size],
+                    query_vector,
+                    self._namespace_ids[:self._size],
+                    namespace_id
+                )
+
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+
+            logger.info("Semantic cache hit (similarity=%.4f)", similarities[best])
+            return self._touch(int(slots[best]) if slots is not None else best)
+
+    def put(self, namespace: str, query: str, embedding: List[float], value: Any) -> None:
+        """
+        Store a response, evicting the least recently used entry when full
+
+        Args:
+            namespace: Namespace key from make_namespace()
+            query: Query text
+            embedding: Query embedding
+            value: Response to cache
+        """
+        exact_key = self._exact_key(namespace, query)
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            slot = self._exact_index.get(exact_key)
+            if slot is None:
+                if self._size < self.max_size:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self._exact_index.pop(self._exact_keys[slot], None)
+                    if self._lsh_tables > 0:
+                        self._lsh_remove(slot)
+            elif self._lsh_tables > 0:
+                self._lsh_remove(slot)
+
+            if self._lsh_tables > 0:
+                self._lsh_add(slot, vector)
+            self._embeddings[slot] = vector
+            self._namespace_ids[slot] = self._namespace_id(namespace)
+            self._exact_keys[slot] = exact_key
+            self._values[slot] = value
+            self._exact_index[exact_key] = slot
+            self._touch(slot)
+
+    def clear(self) -> None:
+        """
+        Drop all entries (e.g. after the document set changes)
+        """
+        with self._lock:
+            self._namespace_ids[:] = -1
+            self._namespace_index.clear()
+            self._exact_keys = [None] * self.max_size
+            self._values = [None] * self.max_size
+            self._last_used[:] = 0
+            self._exact_index.clear()
+            if self._lsh_tables > 0:
+                self._buckets = [{} for _ in range(self._lsh_tables)]
+            self._size = 0
+        logger.info("Semantic cache cleared")
+
+
+# Create singleton instances: RAG answers, and retrieval results (search
+# results and assembled RAG context) so near-duplicate queries skip the
+# embedding call and the vector search
+semantic_cache = SemanticCache()
+retrieval_cache = SemanticCache(max_size=get_settings().retrieval_cache_size)
@@ -0,0 +1,91 @@
+from typing import Optional
+import logging
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - numba is optional
+    njit = None
+    prange = range
+
+logger = logging.getLogger(__name__)
+
+
+def _masked_similarities_numpy(
+    matrix: np.ndarray,
+    query: np.ndarray,
+    labels: np.ndarray,
+    label: int
+) -> np.ndarray:
+    similarities = matrix @ query
+    similarities[labels != label] = -1.0
+    return similarities
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _masked_similarities_numba(matrix, query, labels, label):
+        n, d = matrix.shape
+        out = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            # Rows with another label are skipped rather than scored and masked
+            if labels[i] != label:
+                out[i] = -1.0
+                continue
+            s = np.float32(0.0)
+            for j in range(d):
+                s += matrix[i, j] * query[j]
+            out[i] = s
+        return out
+else:
+    _masked_similarities_numba = None
+
+
+def masked_similarities(
+    matrix: np.ndarray,
+    query: np.ndarray,
+    labels: np.ndarray,
+    label: int
+) -> np.ndarray:
+    """
+    Dot product of each row of matrix with query, restricted to one label
+
+    Uses a parallel Numba kernel when numba is installed (only rows carrying
+    the label are scored), otherwise a BLAS matrix-vector product plus mask.
+
+    Args:
+        matrix: float32 matrix of shape (n, d), rows L2-normalized
+        query: float32 vector of shape (d,), L2-normalized
+        labels: int64 label per row
+        label: Label whose rows are scored
+
+    Returns:
+        float32 similarities of shape (n,), -1.0 for rows with other labels
+    """
+    if _masked_similarities_numba is not None:
+        return _masked_similarities_numba(matrix, query, labels, label)
+    return _masked_similarities_numpy(matrix, query, labels, label)
+
+
+def warmup(dimension: Optional[int] = None) -> None:
+    """
+    Compile the Numba kernel ahead of the first request
+
+    With cache=True the compiled code is written next to this module, so
+    later processes load it instead of recompiling. No-op without numba.
+
+    Args:
+        dimension: Embedding dimension (any value compiles the same kernel)
+    """
+    if _masked_similarities_numba is None:
+        return
+
+    dimension = dimension or 8
+    _masked_similarities_numba(
+        np.zeros((2, dimension), dtype=np.float32),
+        np.zeros(dimension, dtype=np.float32),
+        np.zeros(2, dtype=np.int64),
+        0
+    )
+    logger.info("Similarity kernel compiled")
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class TimingRecorder:
+    """
+    Rolling per-stage latency samples for profiling the search pipeline
+
+    Each stage keeps its most recent max_samples durations (milliseconds);
+    summary() reports count and p50/p95/p99 per stage.
+    """
+
+    def __init__(self, max_samples: int = 1024):
+        """
+        Initialize an empty recorder
+
+        Args:
+            max_samples: Samples kept per stage (oldest dropped first)
+        """
+        self.max_samples = max_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, duration_ms: float) -> None:
+        """
+        Add one sample
+
+        Args:
+            stage: Stage name (e.g. "embed_ms")
+            duration_ms: Duration in milliseconds
+        """
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.max_samples)
+            samples.append(duration_ms)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """
+        Time the enclosed block (including any awaits inside it)
+
+        Usage:
+            with search_timings.measure("semantic_sql_ms"):
+                rows = await ChunkCRUD.search_similar_chunks_async(...)
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter_ns() - start) / 1e6)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Percentiles of the recorded samples
+
+        Returns:
+            Dictionary of stage -> {"count", "p50", "p95", "p99"} (milliseconds)
+        """
+        with self._lock:
+            snapshot = {stage: list(samples) for stage, samples in self._samples.items()}
+
+        result = {}
+        for stage, samples in snapshot.items():
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            result[stage] = {
+                "count": len(samples),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3)
+            }
+        return result
+
+    def clear(self) -> None:
+        """
+        Drop all samples
+        """
+        with self._lock:
+            self._samples.clear()
+
+
+# Create singleton instance
+search_timings = TimingRecorder()
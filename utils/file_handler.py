@@ -1,10 +1,11 @@
 import os
+import uuid
+import asyncio
 import hashlib
-import aiofiles
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import BinaryIO, Tuple, Optional
 from fastapi import UploadFile, HTTPException
-from config import settings
+from config import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,6 +17,7 @@ class FileHandler:
     """
     
     def __init__(self):
+        settings = get_settings()
         self.upload_dir = Path(settings.upload_dir)
         self.max_size = settings.max_upload_size
         self.allowed_extensions = settings.allowed_extensions
@@ -25,6 +27,26 @@ class FileHandler:
         logger.info(f"Upload directory: {self.upload_dir}")
     
     
+    @staticmethod
+    def get_extension(filename: str) -> str:
+        """
+        Get the lowercase extension of a filename, without building a Path
+        
+        Matches Path(filename).suffix.lower() (e.g. '.pdf', or '' if none).
+        
+        Args:
+            filename: Filename or path
+            
+        Returns:
+            Extension including the dot
+        """
+        name = filename.rsplit('/', 1)[-1]
+        dot = name.rfind('.')
+        if 0 < dot < len(name) - 1:
+            return name[dot:].lower()
+        return ''
+    
+    
     def validate_file(self, file: UploadFile) -> Tuple[bool, Optional[str]]:
         """
         Validate uploaded file
@@ -40,9 +62,9 @@ class FileHandler:
             return False, "No filename provided"
         
         # Check file extension
-        file_ext = Path(file.filename).suffix.lower()
+        file_ext = self.get_extension(file.filename)
         if file_ext not in self.allowed_extensions:
-            return False, f"File type {file_ext} not allowed. Allowed types: {', '.join(self.allowed_extensions)}"
+            return False, f"File type {file_ext} not allowed. Allowed types: {', '.join(sorted(self.allowed_extensions))}"
         
         # Check file size (if content_type is available)
         # Note: We'll check actual size during reading
@@ -63,6 +85,37 @@ class FileHandler:
         return hashlib.sha256(content).hexdigest()
     
     
+    def _stream_to_disk(self, source: BinaryIO, file_path: Path) -> Tuple[str, int]:
+        """
+        Copy a binary file object to disk in 1MB blocks, hashing as it goes
+        
+        Stops writing once the size limit is exceeded (the reported size is
+        then the full size of the source).
+        
+        Args:
+            source: Binary file object to read from
+            file_path: Destination path
+            
+        Returns:
+            Tuple of (file_hash, file_size)
+        """
+        hasher = hashlib.sha256()
+        file_size = 0
+        
+        source.seek(0)
+        with open(file_path, 'wb') as f:
+            while chunk := source.read(1024 * 1024):
+                file_size += len(chunk)
+                if file_size > self.max_size:
+                    source.seek(0, os.SEEK_END)
+                    file_size = source.tell()
+                    break
+                hasher.update(chunk)
+                f.write(chunk)
+        
+        return hasher.hexdigest(), file_size
+    
+    
     def get_safe_filename(self, filename: str, file_hash: str) -> str:
         """
         Generate a safe filename using hash and original extension
@@ -74,28 +127,31 @@ class FileHandler:
         Returns:
             Safe filename string
         """
-        ext = Path(filename).suffix.lower()
+        ext = self.get_extension(filename)
         # Use first 16 characters of hash + extension
         return f"{file_hash[:16]}{ext}"
     
     
-    async def save_file(self, file: UploadFile) -> Tuple[Path, str, int]:
+    async def stage_file(self, file: UploadFile) -> Tuple[Path, str, int]:
         """
-        Save uploaded file to disk
+        Write an uploaded file to a temp file in the upload dir, hashing as it goes
+        
+        Single pass over the upload. The caller can check the hash for a
+        duplicate before committing the temp file with commit_staged_file,
+        or drop it with discard_staged_file.
         
         Args:
             file: Uploaded file object
             
         Returns:
-            Tuple of (file_path, file_hash, file_size)
+            Tuple of (temp_path, file_hash, file_size)
             
         Raises:
             HTTPException: If file is too large or other errors occur
         """
+        temp_path = self.upload_dir / f".upload-{uuid.uuid4().hex}.part"
         try:
-            # Read file content
-            content = await file.read()
-            file_size = len(content)
+            file_hash, file_size = await asyncio.to_thread(self._stream_to_disk, file.file, temp_path)
             
             # Check file size
             if file_size > self.max_size:
@@ -106,22 +162,13 @@ class FileHandler:
                     detail=f"File too large. Max size: {max_mb:.2f}MB, Uploaded: {actual_mb:.2f}MB"
                 )
             
-            # Generate hash and safe filename
-            file_hash = self.generate_file_hash(content)
-            safe_filename = self.get_safe_filename(file.filename, file_hash)
-            file_path = self.upload_dir / safe_filename
-            
-            # Save file
-            async with aiofiles.open(file_path, 'wb') as f:
-                await f.write(content)
-            
-            logger.info(f"File saved: {safe_filename} ({file_size} bytes)")
-            
-            return file_path, file_hash, file_size
+            return temp_path, file_hash, file_size
             
         except HTTPException:
+            self.discard_staged_file(temp_path)
             raise
         except Exception as e:
+            self.discard_staged_file(temp_path)
             logger.error(f"Error saving file: {str(e)}")
             raise HTTPException(
                 status_code=500,
@@ -132,6 +179,35 @@ class FileHandler:
             await file.seek(0)
     
     
+    def commit_staged_file(self, temp_path: Path, filename: str, file_hash: str) -> Path:
+        """
+        Move a staged file into place under its content-addressed name
+        
+        Args:
+            temp_path: Path returned by stage_file
+            filename: Original filename (for the extension)
+            file_hash: Hash returned by stage_file
+            
+        Returns:
+            Final file path
+        """
+        safe_filename = self.get_safe_filename(filename, file_hash)
+        file_path = self.upload_dir / safe_filename
+        os.replace(temp_path, file_path)
+        logger.info(f"File saved: {safe_filename}")
+        return file_path
+    
+    
+    def discard_staged_file(self, temp_path: Path) -> None:
+        """
+        Delete a staged file that won't be committed (no-op if already moved)
+        
+        Args:
+            temp_path: Path returned by stage_file
+        """
+        temp_path.unlink(missing_ok=True)
+    
+    
     async def delete_file(self, file_path: Path) -> bool:
         """
         Delete a file from disk
@@ -1,5 +1,5 @@
-from typing import List
-from config import settings
+from typing import Iterator, List
+from config import get_settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,6 +23,7 @@ class TextChunker:
             chunk_size: Maximum characters per chunk
             chunk_overlap: Number of overlapping characters between chunks
         """
+        settings = get_settings()
         self.chunk_size = chunk_size or settings.chunk_size
         self.chunk_overlap = chunk_overlap or settings.chunk_overlap
         
@@ -40,56 +41,86 @@ class TextChunker:
         Returns:
             List of text chunks
         """
+        chunks = list(self.chunk_text_iter(text, preserve_paragraphs))
+        logger.info(f"Text chunked into {len(chunks)} pieces")
+        return chunks
+    
+    
+    def chunk_text_iter(self, text: str, preserve_paragraphs: bool = True) -> Iterator[str]:
+        """
+        Yield the chunks of chunk_text one at a time
+        
+        Lets callers process a large document window by window instead of
+        holding every chunk (and everything derived from them) at once.
+        
+        Args:
+            text: Text to chunk
+            preserve_paragraphs: Try to split at paragraph boundaries
+            
+        Yields:
+            Text chunks in document order
+        """
         if not text or len(text) == 0:
-            return []
+            return
         
         # If text is smaller than chunk size, return as single chunk
         if len(text) <= self.chunk_size:
-            return [text.strip()]
+            yield text.strip()
+            return
         
-        chunks = []
+        if not preserve_paragraphs:
+            # Simple character-based chunking
+            yield from self._iter_large_text(text)
+            return
         
-        if preserve_paragraphs:
-            # Split by paragraphs first
-            paragraphs = text.split('\n\n')
-            current_chunk = ""
+        current_chunk = ""
+        
+        for para in self._iter_paragraphs(text):
+            para = para.strip()
+            if not para:
+                continue
             
-            for para in paragraphs:
-                para = para.strip()
-                if not para:
-                    continue
+            # If adding this paragraph exceeds chunk size
+            if len(current_chunk) + len(para) + 2 > self.chunk_size:
+                if current_chunk:
+                    yield current_chunk.strip()
                 
-                # If adding this paragraph exceeds chunk size
-                if len(current_chunk) + len(para) + 2 > self.chunk_size:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                        # Add overlap from the end of current chunk
-                        current_chunk = current_chunk[-self.chunk_overlap:] if len(current_chunk) > self.chunk_overlap else ""
-                    
-                    # If paragraph itself is larger than chunk size
-                    if len(para) > self.chunk_size:
-                        # Split the large paragraph
-                        para_chunks = self._split_large_text(para)
-                        chunks.extend(para_chunks[:-1])
-                        current_chunk = para_chunks[-1] if para_chunks else ""
-                    else:
-                        current_chunk = para
+                # If paragraph itself is larger than chunk size
+                if len(para) > self.chunk_size:
+                    # Split the large paragraph, carrying its last piece over
+                    last_piece = None
+                    for piece in self._iter_large_text(para):
+                        if last_piece is not None:
+                            yield last_piece
+                        last_piece = piece
+                    current_chunk = last_piece or ""
                 else:
-                    # Add paragraph to current chunk
-                    if current_chunk:
-                        current_chunk += "\n\n" + para
-                    else:
-                        current_chunk = para
-            
-            # Add the last chunk
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-        else:
-            # Simple character-based chunking
-            chunks = self._split_large_text(text)
+                    current_chunk = para
+            else:
+                # Add paragraph to current chunk
+                if current_chunk:
+                    current_chunk += "\n\n" + para
+                else:
+                    current_chunk = para
         
-        logger.info(f"Text chunked into {len(chunks)} pieces")
-        return chunks
+        # Add the last chunk
+        if current_chunk:
+            yield current_chunk.strip()
+    
+    
+    @staticmethod
+    def _iter_paragraphs(text: str) -> Iterator[str]:
+        """
+        Yield the pieces of text.split('\n\n') without building the list
+        """
+        start = 0
+        while True:
+            end = text.find('\n\n', start)
+            if end == -1:
+                yield text[start:]
+                return
+            yield text[start:end]
+            start = end + 2
     
     
     def _split_large_text(self, text: str) -> List[str]:
@@ -102,7 +133,19 @@ class TextChunker:
         Returns:
             List of text chunks
         """
-        chunks = []
+        return list(self._iter_large_text(text))
+    
+    
+    def _iter_large_text(self, text: str) -> Iterator[str]:
+        """
+        Yield the chunks of _split_large_text one at a time
+        
+        Args:
+            text: Text to split
+            
+        Yields:
+            Text chunks
+        """
         start = 0
         text_length = len(text)
         
@@ -112,38 +155,39 @@ class TextChunker:
             
             # If this is the last chunk
             if end >= text_length:
-                chunks.append(text[start:].strip())
+                yield text[start:].strip()
                 break
             
-            # Try to find a sentence boundary (. ! ?) near the end
-            chunk = text[start:end]
+            # Boundaries are only accepted near the end of the window, so search
+            # just that tail of `text` in place rather than slicing out a copy
+            sentence_floor = start + max(0, self.chunk_size - 199)
+            space_floor = start + max(0, self.chunk_size - 99)
             
-            # Look for sentence endings in the last 100 characters
+            # Try to find a sentence boundary (. ! ?) near the end
             last_period = max(
-                chunk.rfind('. '),
-                chunk.rfind('! '),
-                chunk.rfind('? ')
+                text.rfind('. ', sentence_floor, end),
+                text.rfind('! ', sentence_floor, end),
+                text.rfind('? ', sentence_floor, end)
             )
             
-            if last_period > self.chunk_size - 200:  # If found in reasonable range
-                end = start + last_period + 1
+            if last_period != -1:
+                end = last_period + 1
             else:
                 # Look for newline
-                last_newline = chunk.rfind('\n')
-                if last_newline > self.chunk_size - 200:
-                    end = start + last_newline
+                last_newline = text.rfind('\n', sentence_floor, end)
+                if last_newline != -1:
+                    end = last_newline
                 else:
                     # Look for space
-                    last_space = chunk.rfind(' ')
-                    if last_space > self.chunk_size - 100:
-                        end = start + last_space
+                    last_space = text.rfind(' ', space_floor, end)
+                    if last_space != -1:
+                        end = last_space
             
-            chunks.append(text[start:end].strip())
+            yield text[start:end].strip()
             
-            # Move start position with overlap
-            start = end - self.chunk_overlap
-        
-        return chunks
+            # Move start position with overlap, always advancing so a large
+            # overlap (or a boundary close to start) cannot loop forever
+            start = max(end - self.chunk_overlap, start + 1)
     
     
     def chunk_with_metadata(self, text: str, metadata: dict = None) -> List[dict]: